@@ -18,6 +18,30 @@ asab.Config.add_defaults({
 		"bearer_realm": "asab",
 		"auth_code_timeout": "60 s",
 		"private_key": "",
+
+		# Private keys (PEM file paths separated by whitespace) that are no longer used for signing
+		# Tokens signed with them are still accepted and their public keys are published
+		# To rotate the signing key, move the current `private_key` here and set a new `private_key`
+		"retired_private_keys": "",
+
+		# Private key for ID tokens passed upstream by nginx introspection (leave empty to use `private_key`)
+		# Ed25519 keys (EdDSA) are cheaper to sign and verify with than P-256 keys (ES256)
+		# In provisioning mode, a missing key file is generated as an Ed25519 key
+		"introspection_private_key": "",
+
+		# Issue self-contained access tokens signed with the private key instead of opaque random values
+		# Their signature is verified in-process, they are accepted only while their session exists and has not expired
+		"signed_access_tokens": "no",
+
+		# Signed ID tokens passed on by introspection are reused while the session is unchanged
+		# Maximum number of cached ID tokens
+		"id_token_cache_size": "10000",
+		# Stop reusing an ID token this long before it expires
+		"id_token_reuse_margin": "60 s",
+
+		# Maximum number of verified bearer JWTs (ID tokens, signed access tokens) cached until their expiration
+		# Cached tokens skip signature verification (set to 0 to disable)
+		"jwt_cache_size": "10000",
 	},
 
 	"seacatauth:client": {
@@ -138,12 +162,76 @@ asab.Config.add_defaults({
 		#   Every time introspection happens, the expiration is postponed to CURRENT TIME + 20 minutes.
 		"touch_extension": "0.5",
 
+		# Session extensions are buffered in memory and written to the database in bulk in this interval
+		"touch_flush_interval": "5 s",
+
 		# Maximum session age, beyond which the session cannot be extended
 		"maximum_age": "7 d",
 
 		# Key used for sensitive field encryption
 		# MUST NOT BE EMPTY!
-		"aes_key": ""
+		"aes_key": "",
+
+		# In-process session cache for lookups by session ID, access token and cookie
+		# Maximum number of cached sessions (set to 0 to disable caching)
+		"cache_size": "10000",
+		# Maximum time a cached session object is used before it is re-read from the database
+		# Keep this short in multi-instance deployments, since other instances do not invalidate the cache
+		"cache_ttl": "10 s",
+
+		# Maximum number of sessions deleted in a single database request during expired session sweep
+		"sweep_batch_size": "1000",
+
+		# Session count metrics are maintained from the session creations and deletions of this instance,
+		# so they are only approximate when several instances share the database
+		# They are recounted when they differ from the database estimate by more than this ratio
+		"session_count_drift": "0.05",
+		# Recounting scans the whole session collection; it runs at most once per this interval
+		"session_recount_interval": "15 m",
+
+		# Role, role assignment and tenant changes are applied to the authorization of active sessions
+		# Maximum number of sessions updated in a single database request
+		"authz_propagation_batch_size": "1000",
+	},
+
+	"seacatauth:introspection": {
+		# In-process cache of successful cookie and OAuth nginx introspection responses (M2M responses are never cached)
+		# Concurrent identical introspections are always coalesced into one computation
+		# Maximum number of cached responses (set to 0 to disable caching)
+		"cache_size": "10000",
+		# How long a cached response is reused
+		"cache_ttl": "2 s",
+
+		# Upper bound of the max-age in the Cache-Control header of successful introspection responses
+		# The max-age never exceeds the session expiration
+		"max_age": "30 s",
+
+		# Maximum number of tokens in a single batch introspection request
+		"batch_max_size": "1000",
+
+		# In-process index of active access tokens used by the RFC 7662 introspection endpoint
+		# Entries are dropped on session update or termination
+		# Maximum number of indexed tokens (set to 0 to disable the index)
+		"token_index_size": "100000",
+		# How long an indexed token is trusted without looking up its session
+		# Only changes made by this instance drop the entries, sessions terminated by other instances
+		# stay active in the index for up to this long
+		"token_index_ttl": "5 s",
+	},
+
+	"seacatauth:authz": {
+		# Roles and resources are kept in memory and refreshed on every change made by this instance
+		# Changes made by other instances are detected by checking the collections in this interval
+		# (set to 0 in single-instance deployments to disable the check)
+		"registry_check_interval": "60 s",
+
+		# Authorization of credentials (resources per tenant) is materialized in memory
+		# and updated on role assignment and role changes made by this instance
+		# Maximum number of stored credentials-tenant entries (set to 0 to disable the store)
+		"authz_store_size": "100000",
+		# How long an entry is used before the role assignments are read again
+		# This bounds the delay of role assignments made by other instances
+		"authz_store_ttl": "60 s",
 	},
 
 	"seacatauth:password": {
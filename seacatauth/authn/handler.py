@@ -232,7 +232,6 @@ class AuthenticationHandler(object):
 					'ips': access_ips,
 				}
 			)
-
 			L.warning("Login failed: authentication failed", struct_data={
 				"lsid": lsid,
 				"ident": login_session.Ident,
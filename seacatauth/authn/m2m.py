@@ -138,6 +138,9 @@ class M2MIntrospectHandler(object):
 		else:
 			response = aiohttp.web.HTTPUnauthorized()
 
+		# The password is verified on every request, the result must not be reused
+		response.headers[aiohttp.hdrs.CACHE_CONTROL] = "no-store"
+
 		if response.status_code != 200:
 			response.headers["WWW-Authenticate"] = 'Basic realm="{}"'.format(self.BasicRealm)
 			return response
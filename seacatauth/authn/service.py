@@ -19,6 +19,8 @@ from ..session import (
 	login_descriptor_session_builder,
 	available_factors_session_builder,
 	external_login_session_builder, SessionAdapter,
+	totp_session_builder,
+	last_login_session_builder,
 )
 
 from ..events import EventTypes
@@ -316,6 +318,7 @@ class AuthenticationService(asab.Service):
 		scope = frozenset(["profile", "email", "phone"])
 
 		ext_login_svc = self.App.get_service("seacatauth.ExternalLoginService")
+		otp_service = self.App.get_service("seacatauth.OTPService")
 		session_builders = [
 			await credentials_session_builder(self.CredentialsService, login_session.CredentialsId, scope),
 			await authz_session_builder(
@@ -328,6 +331,9 @@ class AuthenticationService(asab.Service):
 			cookie_session_builder(),
 			await available_factors_session_builder(self, login_session.CredentialsId),
 			await external_login_session_builder(ext_login_svc, login_session.CredentialsId),
+			await totp_session_builder(otp_service, login_session.CredentialsId),
+			await last_login_session_builder(
+				self.AuditService, login_session.CredentialsId, is_login=True, from_info=from_info),
 		]
 
 		session = await self.SessionService.create_session(
@@ -358,9 +364,37 @@ class AuthenticationService(asab.Service):
 		# Delete login session
 		await self.delete_login_session(login_session.Id)
 
+		await self.refresh_last_login(
+			login_session.CredentialsId, from_info=from_info, exclude_session_id=session.SessionId)
+
 		return session
 
 
+	async def refresh_last_login(self, credentials_id: str, from_info: list = None, exclude_session_id=None):
+		"""
+		Update the last successful login in the last login snapshot of all the sessions of the credentials.
+
+		Failed logins do not update the sessions, so that a flood of failed login attempts does not cause a flood
+		of session writes. The last failed login is snapshotted from the audit at the next successful login.
+		"""
+		last_login = {"sat": datetime.datetime.now(datetime.timezone.utc)}
+		if from_info is not None:
+			last_login["sfi"] = from_info
+
+		query_filter = {
+			SessionAdapter.FN.Credentials.Id: credentials_id,
+			# Only update sessions that have the snapshot
+			SessionAdapter.FN.Authentication.LastLogin: {"$type": "object"},
+		}
+		if exclude_session_id is not None:
+			query_filter[SessionAdapter.FN.SessionId] = {"$ne": exclude_session_id}
+
+		await self.SessionService.update_sessions(query_filter, [[
+			("{}.{}".format(SessionAdapter.FN.Authentication.LastLogin, key), value)
+			for key, value in last_login.items()
+		]])
+
+
 	async def create_m2m_session(
 		self,
 		credentials_id: str,
@@ -455,6 +489,8 @@ class AuthenticationService(asab.Service):
 			cookie_session_builder(),
 			await available_factors_session_builder(self, target_cid),
 			await external_login_session_builder(ext_login_svc, target_cid),
+			await totp_session_builder(self.App.get_service("seacatauth.OTPService"), target_cid),
+			await last_login_session_builder(self.AuditService, target_cid),
 			(
 				(SessionAdapter.FN.Authentication.ImpersonatorCredentialsId, impersonator_cid),
 				(SessionAdapter.FN.Authentication.ImpersonatorSessionId, impersonator_session.SessionId)
@@ -0,0 +1,118 @@
+import typing
+
+#
+
+# Trie node key marking a wildcard grant (resource segments are always strings)
+_WILDCARD = None
+
+
+class ResourceSet(frozenset):
+	"""
+	Frozen set of granted resources which also honors hierarchical wildcard grants.
+
+	Resources are colon-separated paths. A grant ending with ":*" (e.g. `myapp:reports:*`) matches all the resources
+	below its prefix (`myapp:reports:daily`, `myapp:reports:daily:pdf`), but not the prefix itself.
+	Wildcard grants are compiled into a prefix trie, so a membership check costs one set lookup plus O(depth)
+	regardless of the number of granted resources.
+	Resources in the `authz:` namespace (superuser, impersonation, tenant access) are never matched by wildcards.
+	"""
+
+	__slots__ = ("_Trie",)
+
+	ExplicitOnlyPrefix = "authz:"
+
+	def __new__(cls, resources: typing.Iterable[str] = ()):
+		self = super().__new__(cls, resources)
+		self._Trie = None
+		for resource in self:
+			if not resource.endswith(":*"):
+				continue
+			node = self._Trie
+			if node is None:
+				node = self._Trie = {}
+			for segment in resource[:-2].split(":"):
+				node = node.setdefault(segment, {})
+			node[_WILDCARD] = True
+		return self
+
+
+	def __contains__(self, resource) -> bool:
+		if frozenset.__contains__(self, resource):
+			return True
+		if self._Trie is None or not isinstance(resource, str) or resource.startswith(self.ExplicitOnlyPrefix):
+			return False
+		node = self._Trie
+		start = 0
+		# Walk the parent segments, only those can carry a wildcard that covers the resource
+		while True:
+			end = resource.find(":", start)
+			if end < 0:
+				return False
+			node = node.get(resource[start:end])
+			if node is None:
+				return False
+			if _WILDCARD in node:
+				return True
+			start = end + 1
+
+
+	def __or__(self, other):
+		return compile_resources(frozenset.__or__(self, other))
+
+	__ror__ = __or__
+
+
+def compile_resources(resources: typing.Iterable[str]) -> frozenset:
+	"""
+	Build a ResourceSet if there are wildcard grants among the resources, or a plain frozenset,
+	which keeps exact checks at the native set speed.
+	"""
+	resources = frozenset(resources)
+	for resource in resources:
+		if resource.endswith(":*"):
+			return ResourceSet(resources)
+	return resources
+
+
+class CompiledAuthz:
+	"""
+	Read-only view of session authorization (tenant -> list of resources) optimized for access checks.
+
+	Resource lists are converted to resource sets (including the wildcard trie) once, when the session is loaded,
+	instead of being rebuilt for every access check.
+	"""
+
+	__slots__ = ("Tenants", "GlobalResources", "AllResources", "IsSuperuser", "CanAccessAllTenants", "_TenantResources")
+
+	def __init__(self, authz: typing.Optional[dict]):
+		# Tenant -> set of resources
+		self.Tenants = {
+			tenant: compile_resources(resources)
+			for tenant, resources in (authz or {}).items()
+		}
+		self.GlobalResources = self.Tenants.get("*", frozenset())
+		# Resources from all tenants (for soft-checks)
+		self.AllResources = compile_resources(frozenset().union(*self.Tenants.values()))
+		self.IsSuperuser = "authz:superuser" in self.GlobalResources
+		self.CanAccessAllTenants = self.IsSuperuser or "authz:tenant:access" in self.GlobalResources
+		# Tenant -> global resources plus the tenant resources, built on demand
+		self._TenantResources = {}
+
+
+	def __len__(self):
+		return len(self.Tenants)
+
+
+	def __contains__(self, tenant):
+		return tenant in self.Tenants
+
+
+	def tenant_resources(self, tenant: str) -> frozenset:
+		"""
+		Return the union of global resources and the resources of the tenant.
+		"""
+		resources = self._TenantResources.get(tenant)
+		if resources is None:
+			resources = self.GlobalResources | self.Tenants.get(tenant, frozenset())
+			self._TenantResources[tenant] = resources
+		return resources
@@ -38,7 +38,7 @@ class RBACHandler(object):
 		requested_resources = request.match_info["resources"].split('+')
 
 		try:
-			if self.RBACService.has_resource_access(request.Session.Authorization.Authz, tenant, requested_resources):
+			if self.RBACService.has_resource_access(request.Session.Authorization.CompiledAuthz, tenant, requested_resources):
 				return asab.web.rest.json_response(
 					request,
 					data={"result": "OK"},
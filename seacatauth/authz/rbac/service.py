@@ -4,6 +4,7 @@ import typing
 import asab
 
 from ...exceptions import TenantNotSpecifiedError
+from .compiled import CompiledAuthz
 
 #
 
@@ -18,47 +19,45 @@ class RBACService(asab.Service):
 		super().__init__(app, service_name)
 
 	@staticmethod
-	def is_superuser(authz: dict) -> bool:
-		global_resources = set(
-			resource
-			for resource in authz["*"]
-		)
-		return "authz:superuser" in global_resources
+	def compile_authz(authz: typing.Union[dict, CompiledAuthz]) -> CompiledAuthz:
+		"""
+		Return authz in the compiled form.
+		Prefer passing `session.Authorization.CompiledAuthz`, which is compiled only once per session.
+		"""
+		if isinstance(authz, CompiledAuthz):
+			return authz
+		return CompiledAuthz(authz)
 
 	@staticmethod
-	def can_access_all_tenants(authz: dict) -> bool:
-		global_resources = set(
-			resource
-			for resource in authz["*"]
-		)
-		return "authz:superuser" in global_resources or "authz:tenant:access" in global_resources
+	def is_superuser(authz: typing.Union[dict, CompiledAuthz]) -> bool:
+		return RBACService.compile_authz(authz).IsSuperuser
 
 	@staticmethod
-	def has_resource_access(authz: dict, tenant: typing.Union[str, None], requested_resources: list) -> bool:
+	def can_access_all_tenants(authz: typing.Union[dict, CompiledAuthz]) -> bool:
+		return RBACService.compile_authz(authz).CanAccessAllTenants
+
+	@staticmethod
+	def has_resource_access(
+		authz: typing.Union[dict, CompiledAuthz],
+		tenant: typing.Union[str, None],
+		requested_resources: typing.Iterable
+	) -> bool:
+		authz = RBACService.compile_authz(authz)
+
 		# Superuser passes without further checks
-		if RBACService.is_superuser(authz):
+		if authz.IsSuperuser:
 			return True
 
 		if tenant == "*":
 			# If the tenant is "*", we are performing a soft-check, i.e. checking if the resource is under ANY tenant
 			# Gather resources from all tenants
-			resources = set(
-				resource
-				for resources in authz.values()
-				for resource in resources
-			)
+			resources = authz.AllResources
 		elif tenant is None:
 			# If the tenant is None, we check only global roles
-			resources = set(
-				resource
-				for resource in authz["*"]
-			)
-		elif tenant in authz:
+			resources = authz.GlobalResources
+		elif tenant in authz.Tenants:
 			# We are checking resources under a specific tenant
-			resources = set(
-				resource
-				for resource in authz[tenant]
-			)
+			resources = authz.Tenants[tenant]
 		else:
 			# Inaccessible tenant
 			return False
@@ -0,0 +1,139 @@
+import copy
+import logging
+import time
+import typing
+
+import asab
+
+#
+
+L = logging.getLogger(__name__)
+
+#
+
+
+class ObjectRegistry:
+	"""
+	In-memory copy of a small, rarely changing collection (roles, resources).
+
+	The whole collection is loaded at startup and every write made through the owning service
+	refreshes the affected object. Writes made by other instances are detected by a periodic check
+	of the collection fingerprint (document count, version sum and last modification time),
+	which triggers a full reload.
+
+	The owning service reads the fingerprint before its write and passes it to `refresh()`.
+	If it differs from the last known one, other instances have written in the meantime
+	and the registry is reloaded instead.
+
+	Every change is announced with the `ObjectRegistry.changed!` PubSub message
+	(`obj_id` is None after a full reload).
+	"""
+
+	def __init__(self, app, storage_service, collection: str):
+		self.App = app
+		self.StorageService = storage_service
+		self.Collection = collection
+		self.CheckInterval = asab.Config.getseconds("seacatauth:authz", "registry_check_interval")
+
+		# Object ID -> object
+		self.Objects = {}
+		self.Fingerprint = None
+		self.LastCheck = 0
+
+		if self.CheckInterval > 0:
+			app.PubSub.subscribe("Application.tick/10!", self._on_tick)
+
+
+	def __len__(self):
+		return len(self.Objects)
+
+
+	def __contains__(self, obj_id):
+		return obj_id in self.Objects
+
+
+	def get(self, obj_id) -> dict:
+		"""
+		Return a copy of the object. Raise KeyError if it does not exist.
+		"""
+		return copy.deepcopy(self.Objects[obj_id])
+
+
+	def values(self) -> typing.Iterable[dict]:
+		"""
+		Iterate over the registered objects. The objects must not be modified.
+		"""
+		return self.Objects.values()
+
+
+	async def load(self):
+		"""
+		Replace the registry content with the current state of the collection.
+		"""
+		fingerprint = await self.get_fingerprint()
+		collection = self.StorageService.Database[self.Collection]
+		objects = {}
+		async for obj in collection.find({}):
+			objects[obj["_id"]] = obj
+		self.Objects = objects
+		self.Fingerprint = fingerprint
+		self.LastCheck = time.monotonic()
+		L.info("Object registry loaded", struct_data={"collection": self.Collection, "count": len(objects)})
+		self.App.PubSub.publish("ObjectRegistry.changed!", collection=self.Collection, obj_id=None)
+
+
+	async def refresh(self, obj_id, fingerprint: typing.Optional[tuple]):
+		"""
+		Re-read a single object after it has been created, updated or deleted.
+		`fingerprint` is the collection fingerprint read before the write.
+		"""
+		if fingerprint != self.Fingerprint:
+			# The collection has been modified elsewhere since the last check
+			await self.load()
+			return
+
+		collection = self.StorageService.Database[self.Collection]
+		obj = await collection.find_one({"_id": obj_id})
+		if obj is None:
+			self.Objects.pop(obj_id, None)
+		else:
+			self.Objects[obj_id] = obj
+		# Own writes must not trigger a full reload
+		self.Fingerprint = await self.get_fingerprint()
+		self.App.PubSub.publish("ObjectRegistry.changed!", collection=self.Collection, obj_id=obj_id)
+
+
+	async def check(self):
+		"""
+		Reload the registry if the collection has been modified elsewhere.
+		"""
+		self.LastCheck = time.monotonic()
+		fingerprint = await self.get_fingerprint()
+		if fingerprint != self.Fingerprint:
+			L.info("Collection modified externally, reloading object registry", struct_data={
+				"collection": self.Collection})
+			await self.load()
+
+
+	async def get_fingerprint(self) -> typing.Optional[tuple]:
+		"""
+		Return the collection fingerprint, to be read before writing to the collection.
+		"""
+		collection = self.StorageService.Database[self.Collection]
+		async for result in collection.aggregate([{"$group": {
+			"_id": None,
+			"n": {"$sum": 1},
+			"v": {"$sum": "$_v"},
+			"m": {"$max": "$_m"},
+		}}]):
+			return result["n"], result["v"], result["m"]
+		return None
+
+
+	async def _on_tick(self, message_type):
+		if time.monotonic() - self.LastCheck < self.CheckInterval:
+			return
+		try:
+			await self.check()
+		except Exception as e:
+			L.error("Object registry check failed: {}".format(e), struct_data={"collection": self.Collection})
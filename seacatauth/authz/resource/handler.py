@@ -51,6 +51,13 @@ class ResourceHandler(object):
 			description: Items per page
 			schema:
 				type: integer
+		-	name: c
+			in: query
+			description:
+				Pagination cursor returned in the previous page's response.
+				If present, the page number is ignored.
+			schema:
+				type: string
 		-	name: f
 			in: query
 			description: Filter string
@@ -72,6 +79,7 @@ class ResourceHandler(object):
 		limit = request.query.get("i", None)
 		if limit is not None:
 			limit = int(limit)
+		cursor = request.query.get("c")
 
 		# Filter by ID.startswith()
 		query_filter = {}
@@ -100,7 +108,7 @@ class ResourceHandler(object):
 				query_filter["_id"] = {}
 			query_filter["_id"]["$nin"] = list(self.ResourceService.GlobalOnlyResources)
 
-		resources = await self.ResourceService.list(page, limit, query_filter)
+		resources = await self.ResourceService.list(page, limit, query_filter, cursor=cursor)
 		return asab.web.rest.json_response(request, resources)
 
 
@@ -6,6 +6,8 @@ import asab
 import asab.exceptions
 
 from ...events import EventTypes
+from ..registry import ObjectRegistry
+from ...pagination import CreatedAtSort, apply_pagination, next_cursor
 
 #
 
@@ -18,7 +20,8 @@ class ResourceService(asab.Service):
 
 	ResourceCollection = "rs"
 	# Resource name format: "{module}:{submodule}:..."
-	ResourceNamePattern = r"[a-z][a-z0-9:._-]{0,128}[a-z0-9]"
+	# Wildcard resources "{module}:{submodule}:*" grant all the resources below the prefix
+	ResourceNamePattern = r"[a-z][a-z0-9:._-]{0,128}[a-z0-9](:\*)?"
 
 	# TODO: gather these system resources automatically
 	_BuiltinResources = {
@@ -95,10 +98,18 @@ class ResourceService(asab.Service):
 		super().__init__(app, service_name)
 		self.StorageService = app.get_service("asab.StorageService")
 		self.ResourceIdRegex = re.compile("^{}$".format(self.ResourceNamePattern))
+		# Resources are read from memory, the database is only queried for listings
+		self.Registry = ObjectRegistry(app, self.StorageService, self.ResourceCollection)
 
 
 	async def initialize(self, app):
 		await super().initialize(app)
+		collection = await self.StorageService.collection(self.ResourceCollection)
+		try:
+			await collection.create_index(list(CreatedAtSort))
+		except Exception as e:
+			L.error("Failed to create index (creation time): {}".format(e))
+		await self.Registry.load()
 		await self._ensure_builtin_resources()
 
 
@@ -110,6 +121,10 @@ class ResourceService(asab.Service):
 		return resource_id in self.GlobalOnlyResources
 
 
+	def is_wildcard_resource(self, resource_id):
+		return resource_id.endswith(":*")
+
+
 	async def _ensure_builtin_resources(self):
 		"""
 		Check if all builtin resources exist. Create them if they don't.
@@ -130,35 +145,41 @@ class ResourceService(asab.Service):
 				await self._update(resource_id, description)
 
 
-	async def list(self, page: int = 0, limit: int = None, query_filter: dict = None):
+	async def list(self, page: int = 0, limit: int = None, query_filter: dict = None, cursor: str = None):
 		collection = self.StorageService.Database[self.ResourceCollection]
 
 		if query_filter is None:
 			query_filter = {}
-		cursor = collection.find(query_filter)
+		page_filter, skip = apply_pagination(query_filter, page, limit, cursor)
+		db_cursor = collection.find(page_filter)
 
-		cursor.sort("_c", -1)
+		db_cursor.sort(list(CreatedAtSort))
+		if skip > 0:
+			db_cursor.skip(skip)
 		if limit is not None:
-			cursor.skip(limit * page)
-			cursor.limit(limit)
+			db_cursor.limit(limit)
 
 		resources = []
 		count = await collection.count_documents(query_filter)
-		async for resource_dict in cursor:
+		async for resource_dict in db_cursor:
 			if self.is_builtin_resource(resource_dict["_id"]):
 				resource_dict["editable"] = False
 			if self.is_global_only_resource(resource_dict["_id"]):
 				resource_dict["global_only"] = True
 			resources.append(resource_dict)
 
-		return {
+		result = {
 			"data": resources,
 			"count": count,
 		}
+		next_page = next_cursor(resources, limit)
+		if next_page is not None:
+			result["cursor"] = next_page
+		return result
 
 
 	async def get(self, resource_id: str):
-		data = await self.StorageService.get(self.ResourceCollection, resource_id)
+		data = self.Registry.get(resource_id)
 		if self.is_builtin_resource(data["_id"]):
 			data["editable"] = False
 		if self.is_global_only_resource(data["_id"]):
@@ -170,15 +191,21 @@ class ResourceService(asab.Service):
 		if self.ResourceIdRegex.match(resource_id) is None:
 			raise asab.exceptions.ValidationError(
 				"Resource ID must consist only of characters 'a-z0-9.:_-', "
-				"start with a letter, end with a letter or digit, "
+				"start with a letter, end with a letter or digit or with ':*' (wildcard), "
 				"and be between 2 and 128 characters long.")
+		if self.is_wildcard_resource(resource_id):
+			prefix = resource_id[:-1]
+			if any(builtin_id.startswith(prefix) for builtin_id in self._BuiltinResources):
+				raise asab.exceptions.ValidationError("Wildcard resource must not cover built-in resources.")
 		upsertor = self.StorageService.upsertor(self.ResourceCollection, obj_id=resource_id)
 
 		if description is not None:
 			upsertor.set("description", description)
 
+		fingerprint = await self.Registry.get_fingerprint()
 		try:
 			await upsertor.execute(event_type=EventTypes.RESOURCE_CREATED)
+			await self.Registry.refresh(resource_id, fingerprint)
 		except asab.storage.exceptions.DuplicateError as e:
 			if e.KeyValue is not None:
 				key, value = e.KeyValue
@@ -202,7 +229,9 @@ class ResourceService(asab.Service):
 		else:
 			upsertor.set("description", description)
 
+		fingerprint = await self.Registry.get_fingerprint()
 		await upsertor.execute(event_type=EventTypes.RESOURCE_UPDATED)
+		await self.Registry.refresh(resource_id, fingerprint)
 		L.log(asab.LOG_NOTICE, "Resource updated", struct_data={"resource": resource_id})
 
 
@@ -229,8 +258,10 @@ class ResourceService(asab.Service):
 				"n_roles": roles["count"],
 			})
 
+		fingerprint = await self.Registry.get_fingerprint()
 		if hard_delete:
 			await self.StorageService.delete(self.ResourceCollection, resource_id)
+			await self.Registry.refresh(resource_id, fingerprint)
 			L.warning("Resource deleted", struct_data={
 				"resource": resource_id,
 			})
@@ -242,6 +273,7 @@ class ResourceService(asab.Service):
 			)
 			upsertor.set("deleted", True)
 			await upsertor.execute(event_type=EventTypes.RESOURCE_DELETED)
+			await self.Registry.refresh(resource_id, fingerprint)
 			L.log(asab.LOG_NOTICE, "Resource soft-deleted", struct_data={
 				"resource": resource_id,
 			})
@@ -258,7 +290,9 @@ class ResourceService(asab.Service):
 			version=resource["_v"]
 		)
 		upsertor.unset("deleted")
+		fingerprint = await self.Registry.get_fingerprint()
 		await upsertor.execute(event_type=EventTypes.RESOURCE_UNDELETED)
+		await self.Registry.refresh(resource_id, fingerprint)
 		L.log(asab.LOG_NOTICE, "Resource undeleted", struct_data={
 			"resource": resource_id,
 		})
@@ -285,7 +319,9 @@ class ResourceService(asab.Service):
 					resources_to_remove=[resource_id],
 					resources_to_add=[new_resource_id])
 
+		fingerprint = await self.Registry.get_fingerprint()
 		await self.StorageService.delete(self.ResourceCollection, resource_id)
+		await self.Registry.refresh(resource_id, fingerprint)
 		L.log(asab.LOG_NOTICE, "Resource renamed", struct_data={
 			"old_resource": resource_id,
 			"new_resource": resource_id,
@@ -51,6 +51,13 @@ class RoleHandler(object):
 			description: Items per page
 			schema:
 				type: integer
+		-	name: c
+			in: query
+			description:
+				Pagination cursor returned in the previous page's response.
+				If present, the page number is ignored.
+			schema:
+				type: string
 		-	name: resource
 			in: query
 			description: Show only roles that contain the specified resource
@@ -76,6 +83,13 @@ class RoleHandler(object):
 			description: Items per page
 			schema:
 				type: integer
+		-	name: c
+			in: query
+			description:
+				Pagination cursor returned in the previous page's response.
+				If present, the page number is ignored.
+			schema:
+				type: string
 		-	name: resource
 			in: query
 			description: Show only roles that contain the specified resource.
@@ -96,10 +110,12 @@ class RoleHandler(object):
 		limit = request.query.get("i")
 		if limit is not None:
 			limit = int(limit)
+		cursor = request.query.get("c")
 		resource = request.query.get("resource")
 		exclude_global = request.query.get("exclude_global", "false") == "true"
 
-		result = await self.RoleService.list(tenant, page, limit, resource=resource, exclude_global=exclude_global)
+		result = await self.RoleService.list(
+			tenant, page, limit, resource=resource, exclude_global=exclude_global, cursor=cursor)
 		return asab.web.rest.json_response(request, result)
 
 
@@ -118,7 +118,7 @@ class RolesHandler(object):
 		role_id = "{}/{}".format(tenant, request.match_info["role_name"])
 		if tenant == "*":
 			# Assigning global roles requires superuser
-			if not self.RBACService.is_superuser(request.Session.Authorization.Authz):
+			if not self.RBACService.is_superuser(request.Session.Authorization.CompiledAuthz):
 				message = "Missing permissions to un/assign global role"
 				L.warning(message, struct_data={
 					"agent_cid": request.Session.Credentials.Id,
@@ -149,7 +149,7 @@ class RolesHandler(object):
 		role_id = "{}/{}".format(tenant, request.match_info["role_name"])
 		if tenant == "*":
 			# Unassigning global roles requires superuser
-			if not self.RBACService.is_superuser(request.Session.Authorization.Authz):
+			if not self.RBACService.is_superuser(request.Session.Authorization.CompiledAuthz):
 				message = "Missing permissions to un/assign global role"
 				L.warning(message, struct_data={
 					"agent_cid": request.Session.Credentials.Id,
@@ -5,8 +5,11 @@ from typing import Optional
 import asab.storage.exceptions
 import asab.exceptions
 from ... import exceptions
+from ...pagination import CreatedAtSort, apply_pagination, next_cursor
 
 from ...events import EventTypes
+from ..registry import ObjectRegistry
+from ..store import CredentialsAuthzStore
 
 #
 
@@ -37,6 +40,9 @@ class RoleService(asab.Service):
 		self.ResourceService = app.get_service("seacatauth.ResourceService")
 		self.TenantService = app.get_service("seacatauth.TenantService")
 		self.RBACService = self.App.get_service("seacatauth.RBACService")
+		# Roles are read from memory, the database is only queried for listings
+		self.Registry = ObjectRegistry(app, self.StorageService, self.RoleCollection)
+		self.AuthzStore = CredentialsAuthzStore(app, self)
 		# The format is always {tenant or "*"}/{role_name}!
 		# Tenant name is always validated by tenant service
 		self.RoleIdRegex = re.compile(r"^([^/]+)/({role})$".format(
@@ -44,11 +50,21 @@ class RoleService(asab.Service):
 		))
 
 
+	async def initialize(self, app):
+		collection = await self.StorageService.collection(self.RoleCollection)
+		try:
+			await collection.create_index(list(CreatedAtSort))
+		except Exception as e:
+			L.error("Failed to create index (creation time): {}".format(e))
+		await self.Registry.load()
+
+
 	async def list(
 		self, tenant: Optional[str] = None, page: int = 0, limit: int = None, *,
 		resource: str = None,
 		active_only: bool = False,
 		exclude_global: bool = False,
+		cursor: str = None,
 	):
 		collection = self.StorageService.Database[self.RoleCollection]
 		query_filter = {}
@@ -62,31 +78,36 @@ class RoleService(asab.Service):
 		if active_only is True:
 			query_filter["deleted"] = {"$in": [False, None]}
 
-		cursor = collection.find(query_filter)
+		page_filter, skip = apply_pagination(query_filter, page, limit, cursor)
+		db_cursor = collection.find(page_filter)
 
-		cursor.sort("_c", -1)
+		db_cursor.sort(list(CreatedAtSort))
+		if skip > 0:
+			db_cursor.skip(skip)
 		if limit is not None:
-			cursor.skip(limit * page)
-			cursor.limit(limit)
+			db_cursor.limit(limit)
 
 		roles = []
 		count = await collection.count_documents(query_filter)
-		async for role_dict in cursor:
+		async for role_dict in db_cursor:
 			roles.append(role_dict)
 
-		return {
+		result = {
 			"result": "OK",
 			"count": count,
 			"data": roles,
 		}
+		next_page = next_cursor(roles, limit)
+		if next_page is not None:
+			result["cursor"] = next_page
+		return result
 
 
 	async def get(self, role_id: str):
 		try:
-			result = await self.StorageService.get(self.RoleCollection, role_id)
+			return self.Registry.get(role_id)
 		except KeyError:
 			raise exceptions.RoleNotFoundError(role_id)
-		return result
 
 
 	async def get_role_resources(self, role_id: str):
@@ -109,6 +130,7 @@ class RoleService(asab.Service):
 			tenant, _ = role_id.split("/", 1)
 			raise KeyError("Tenant {!r} not found.".format(tenant))
 
+		fingerprint = await self.Registry.get_fingerprint()
 		upsertor = self.StorageService.upsertor(
 			self.RoleCollection,
 			role_id
@@ -118,6 +140,7 @@ class RoleService(asab.Service):
 			upsertor.set("tenant", tenant)
 		try:
 			role_id = await upsertor.execute(event_type=EventTypes.ROLE_CREATED)
+			await self.Registry.refresh(role_id, fingerprint)
 			L.log(asab.LOG_NOTICE, "Role created", struct_data={"role_id": role_id})
 		except asab.storage.exceptions.DuplicateError:
 			raise asab.exceptions.Conflict(key="role", value=role_id)
@@ -133,7 +156,9 @@ class RoleService(asab.Service):
 		await self.delete_role_assignments(role_id)
 
 		# Delete the role
+		fingerprint = await self.Registry.get_fingerprint()
 		await self.StorageService.delete(self.RoleCollection, role_id)
+		await self.Registry.refresh(role_id, fingerprint)
 		L.log(asab.LOG_NOTICE, "Role deleted", struct_data={'role_id': role_id})
 		return "OK"
 
@@ -210,7 +235,9 @@ class RoleService(asab.Service):
 			upsertor.set("description", description)
 			log_data["description"] = description
 
+		fingerprint = await self.Registry.get_fingerprint()
 		await upsertor.execute(event_type=EventTypes.ROLE_UPDATED)
+		await self.Registry.refresh(role_id, fingerprint)
 		L.log(asab.LOG_NOTICE, "Role updated", struct_data=log_data)
 		return "OK"
 
@@ -230,6 +257,23 @@ class RoleService(asab.Service):
 		return result
 
 
+	async def get_roles_by_credentials_per_tenant(self, credentials_id: str, tenants: list = None) -> dict:
+		"""
+		Return the roles assigned to the given `credentials_id` in the given tenants plus global roles,
+		grouped by tenant ("*" for global roles), using a single query.
+		"""
+		result = {"*": []}
+		for tenant in tenants or []:
+			result[tenant] = []
+		coll = self.StorageService.Database[self.CredentialsRolesCollection]
+		async for obj in coll.find(
+			{"c": credentials_id, "t": {"$in": [None, *(tenants or [])]}},
+			projection={"r": 1, "t": 1}
+		):
+			result[obj.get("t") or "*"].append(obj["r"])
+		return result
+
+
 	async def set_roles(self, credentials_id: str, roles: list, tenant: str = "*", include_global: bool = False):
 		"""
 		Assign a list of roles to given credentials and unassign all their current roles that are not listed
@@ -366,6 +410,7 @@ class RoleService(asab.Service):
 			"cid": credentials_id,
 			"role": role_id,
 		})
+		self.App.PubSub.publish("Role.assigned!", credentials_id=credentials_id, role_id=role_id)
 
 
 	async def unassign_role(self, credentials_id: str, role_id: str):
@@ -375,6 +420,7 @@ class RoleService(asab.Service):
 			"cid": credentials_id,
 			"role": role_id,
 		})
+		self.App.PubSub.publish("Role.unassigned!", credentials_id=credentials_id, role_id=role_id)
 
 
 	async def delete_role_assignments(self, role_id):
@@ -383,11 +429,14 @@ class RoleService(asab.Service):
 		"""
 		collection = await self.StorageService.collection(self.CredentialsRolesCollection)
 
+		credentials_ids = await collection.distinct("c", {"r": role_id})
 		result = await collection.delete_many({'r': role_id})
 		L.log(asab.LOG_NOTICE, "Role unassigned", struct_data={
 			"role_id": role_id,
 			"deleted_count": result.deleted_count
 		})
+		for credentials_id in credentials_ids:
+			self.App.PubSub.publish("Role.unassigned!", credentials_id=credentials_id, role_id=role_id)
 
 
 	async def get_role_tenant(self, role_id):
@@ -0,0 +1,150 @@
+import collections
+import logging
+import time
+import typing
+
+import asab
+
+#
+
+L = logging.getLogger(__name__)
+
+#
+
+
+class CredentialsAuthzStore:
+	"""
+	Materialized authorization of credentials, keyed by credentials ID and tenant ("*" for global roles).
+
+	Each entry holds the roles assigned to the credentials in the tenant and the union of their resources.
+	Missing entries are built with a single role assignment query, role resources come from the role registry.
+	Entries are updated incrementally: role (un)assignments (`Role.assigned!`, `Role.unassigned!`) drop the entries
+	of the affected credentials and tenant, role definition changes recompute the resources of the entries
+	that contain the role.
+	Tenant (un)assignments reach the store through the role unassignments they cause.
+
+	Role assignments made by other instances are picked up when the entry expires.
+	"""
+
+	def __init__(self, app, role_service):
+		self.RoleService = role_service
+		self.RoleRegistry = role_service.Registry
+		self.MaxSize = asab.Config.getint("seacatauth:authz", "authz_store_size")
+		self.TTL = asab.Config.getseconds("seacatauth:authz", "authz_store_ttl")
+
+		# (credentials ID, tenant) -> (valid until (monotonic), roles, resources)
+		self.Entries = collections.OrderedDict()
+		# Role ID -> set of entry keys
+		self.RoleKeys = {}
+		# Incremented on every invalidation, so that results of concurrent lookups are not stored stale
+		self.Generation = 0
+
+		app.PubSub.subscribe("ObjectRegistry.changed!", self._on_registry_changed)
+		app.PubSub.subscribe("Role.assigned!", self._on_role_assignment_changed)
+		app.PubSub.subscribe("Role.unassigned!", self._on_role_assignment_changed)
+
+
+	def __len__(self):
+		return len(self.Entries)
+
+
+	async def get(self, credentials_id: str, tenants: typing.Sequence[str]) -> dict:
+		"""
+		Return the authz dict of the credentials for the given tenants, global resources under "*".
+		Global resources are included in every tenant.
+		"""
+		now = time.monotonic()
+		resources = {}
+		missing = []
+		for tenant in ["*", *tenants]:
+			entry = self.Entries.get((credentials_id, tenant))
+			if entry is None or now >= entry[0]:
+				missing.append(tenant)
+			else:
+				self.Entries.move_to_end((credentials_id, tenant))
+				resources[tenant] = entry[2]
+
+		if len(missing) > 0:
+			generation = self.Generation
+			roles_by_tenant = await self.RoleService.get_roles_by_credentials_per_tenant(
+				credentials_id, [tenant for tenant in missing if tenant != "*"])
+			for tenant in missing:
+				roles = frozenset(roles_by_tenant.get(tenant, ()))
+				resources[tenant] = self._collect_resources(credentials_id, roles)
+				if generation == self.Generation:
+					self._put((credentials_id, tenant), roles, resources[tenant])
+
+		global_resources = resources["*"]
+		authz = {"*": list(global_resources)}
+		for tenant in tenants:
+			authz[tenant] = list(global_resources | resources[tenant])
+		return authz
+
+
+	def invalidate(self, credentials_id: str, tenant: str = None):
+		"""
+		Drop the entry of the credentials in the tenant ("*" for global roles) or all their entries.
+		"""
+		self.Generation += 1
+		if tenant is not None:
+			self._drop((credentials_id, tenant))
+			return
+		for key in [key for key in self.Entries if key[0] == credentials_id]:
+			self._drop(key)
+
+
+	def _collect_resources(self, credentials_id, roles) -> frozenset:
+		resources = set()
+		for role_id in roles:
+			role = self.RoleRegistry.Objects.get(role_id)
+			if role is None:
+				L.warning("Assigned role not found", struct_data={"cid": credentials_id, "role": role_id})
+				continue
+			resources.update(role.get("resources", ()))
+		return frozenset(resources)
+
+
+	def _put(self, key, roles, resources):
+		if self.MaxSize <= 0 or self.TTL <= 0:
+			return
+		self._drop(key)
+		self.Entries[key] = (time.monotonic() + self.TTL, roles, resources)
+		for role_id in roles:
+			self.RoleKeys.setdefault(role_id, set()).add(key)
+		while len(self.Entries) > self.MaxSize:
+			self._drop(next(iter(self.Entries)))
+
+
+	def _drop(self, key):
+		entry = self.Entries.pop(key, None)
+		if entry is None:
+			return
+		for role_id in entry[1]:
+			keys = self.RoleKeys.get(role_id)
+			if keys is not None:
+				keys.discard(key)
+				if len(keys) == 0:
+					del self.RoleKeys[role_id]
+
+
+	def _recompute(self, key):
+		valid_until, roles, _ = self.Entries[key]
+		self.Entries[key] = (valid_until, roles, self._collect_resources(key[0], roles))
+
+
+	def _on_registry_changed(self, message_type, collection, obj_id=None, **kwargs):
+		if collection != self.RoleRegistry.Collection:
+			return
+		self.Generation += 1
+		if obj_id is None:
+			# The whole registry has been reloaded
+			keys = list(self.Entries)
+		else:
+			keys = list(self.RoleKeys.get(obj_id, ()))
+		for key in keys:
+			self._recompute(key)
+
+
+	def _on_role_assignment_changed(self, message_type, credentials_id, role_id, **kwargs):
+		tenant, _ = role_id.split("/", 1)
+		self.invalidate(credentials_id, tenant)
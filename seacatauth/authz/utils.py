@@ -1,3 +1,12 @@
+import logging
+
+#
+
+L = logging.getLogger(__name__)
+
+#
+
+
 async def build_credentials_authz(tenant_service, role_service, credentials_id, tenants=None):
 	"""
 	Creates a nested 'authz' dict with tenant:resource structure:
@@ -6,22 +15,14 @@ async def build_credentials_authz(tenant_service, role_service, credentials_id,
 		'tenantA': ['resourceA', 'resourceB', 'resourceC'],
 		'tenantB': ['resourceA', 'resourceB', 'resourceE', 'resourceD'],
 	}
-	"""
 
-	# Add global roles and resources under "*"
-	authz = {}
-	tenant = "*"
-	authz[tenant] = set()
-	for role in await role_service.get_roles_by_credentials(credentials_id, [tenant]):
-		authz[tenant].update(await role_service.get_role_resources(role))
-	authz[tenant] = list(authz[tenant])
-
-	# Add tenant-specific roles and resources
+	Global resources are included in every tenant.
+	The authz is read from the materialized credentials authz store, which queries the role assignments
+	only for the tenants it does not hold yet.
+	"""
 	if tenant_service.is_enabled() and tenants is not None:
-		for tenant in tenants:
-			authz[tenant] = set()
-			for role in await role_service.get_roles_by_credentials(credentials_id, [tenant]):
-				authz[tenant].update(await role_service.get_role_resources(role))
-			authz[tenant] = list(authz[tenant])
+		tenants = [tenant for tenant in tenants if tenant != "*"]
+	else:
+		tenants = []
 
-	return authz
+	return await role_service.AuthzStore.get(credentials_id, tenants)
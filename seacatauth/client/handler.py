@@ -5,6 +5,7 @@ import asab.web.rest
 import asab.exceptions
 
 from seacatauth.decorators import access_control
+from seacatauth.pagination import next_cursor
 from .service import REGISTER_CLIENT_SCHEMA, UPDATE_CLIENT_SCHEMA, CLIENT_TEMPLATES
 
 #
@@ -57,25 +58,38 @@ class ClientHandler(object):
 			description: Filter
 			schema:
 				type: string
+		-	name: c
+			in: query
+			description:
+				Pagination cursor returned in the previous page's response.
+				If present, the page number is ignored.
+			schema:
+				type: string
 		"""
 		page = int(request.query.get("p", 1)) - 1
 		limit = request.query.get("i", None)
 		if limit is not None:
 			limit = int(limit)
+		cursor = request.query.get("c")
 
 		# Filter by ID.startswith()
 		query_filter = request.query.get("f")
 
-		data = []
-		async for client in self.ClientService.iterate(page, limit, query_filter):
-			data.append(self._rest_normalize(client))
+		clients = []
+		async for client in self.ClientService.iterate(page, limit, query_filter, cursor):
+			clients.append(client)
+		next_page = next_cursor(clients, limit)
+		data = [self._rest_normalize(client) for client in clients]
 
 		count = await self.ClientService.count(query_filter)
 
-		return asab.web.rest.json_response(request, {
+		result = {
 			"data": data,
 			"count": count,
-		})
+		}
+		if next_page is not None:
+			result["cursor"] = next_page
+		return asab.web.rest.json_response(request, result)
 
 
 	@access_control("seacat:client:access")
@@ -11,6 +11,7 @@ from seacatauth.client import exceptions
 from asab.utils import convert_to_seconds
 
 from ..events import EventTypes
+from ..pagination import CreatedAtSort, apply_pagination
 
 #
 
@@ -240,6 +241,11 @@ class ClientService(asab.Service):
 
 	async def initialize(self, app):
 		self.OIDCService = app.get_service("seacatauth.OpenIdConnectService")
+		collection = await self.StorageService.collection(self.ClientCollection)
+		try:
+			await collection.create_index(list(CreatedAtSort))
+		except Exception as e:
+			L.error("Failed to create index (creation time): {}".format(e))
 
 
 	def build_filter(self, match_string):
@@ -249,21 +255,23 @@ class ClientService(asab.Service):
 		]}
 
 
-	async def iterate(self, page: int = 0, limit: int = None, query_filter: str = None):
+	async def iterate(self, page: int = 0, limit: int = None, query_filter: str = None, cursor: str = None):
 		collection = self.StorageService.Database[self.ClientCollection]
 
 		if query_filter is None:
 			query_filter = {}
 		else:
 			query_filter = self.build_filter(query_filter)
-		cursor = collection.find(query_filter)
+		query_filter, skip = apply_pagination(query_filter, page, limit, cursor)
+		db_cursor = collection.find(query_filter)
 
-		cursor.sort("_c", -1)
+		db_cursor.sort(list(CreatedAtSort))
+		if skip > 0:
+			db_cursor.skip(skip)
 		if limit is not None:
-			cursor.skip(limit * page)
-			cursor.limit(limit)
+			db_cursor.limit(limit)
 
-		async for client in cursor:
+		async for client in db_cursor:
 			if "__client_secret" in client:
 				client.pop("__client_secret")
 			yield client
@@ -7,6 +7,7 @@ import asab.web.rest
 
 from .. import exceptions
 from ..generic import nginx_introspection, get_bearer_token_value
+from ..introspection_cache import IntrospectionCache
 from .utils import set_cookie, delete_cookie
 from ..openidconnect.utils import TokenRequestErrorResponseCode
 
@@ -86,6 +87,7 @@ class CookieHandler(object):
 		self.SessionService = session_svc
 		self.CredentialsService = credentials_svc
 		self.RBACService = app.get_service("seacatauth.RBACService")
+		self.IntrospectionCache = IntrospectionCache(app)
 
 		web_app = app.WebContainer.WebApp
 		web_app.router.add_post("/cookie/nginx", self.nginx)
@@ -151,19 +153,23 @@ class CookieHandler(object):
 
 		# TODO: Also check query for scope and validate it
 
-		session = await self._authenticate_request(request, client_id)
-		if session is None:
-			response = aiohttp.web.HTTPUnauthorized()
-		elif session.Authentication.IsAnonymous:
-			L.warning("Regular cookie introspection does not allow anonymous user access.", struct_data={
-				"client_id": client_id, "cid": session.Credentials.Id})
-			response = aiohttp.web.HTTPUnauthorized()
-		else:
+		async def introspect():
+			session = await self._authenticate_request(request, client_id)
+			if session is None:
+				return aiohttp.web.HTTPUnauthorized(), None
+			if session.Authentication.IsAnonymous:
+				L.warning("Regular cookie introspection does not allow anonymous user access.", struct_data={
+					"client_id": client_id, "cid": session.Credentials.Id})
+				return aiohttp.web.HTTPUnauthorized(), session
 			try:
-				response = await nginx_introspection(request, session, self.App)
+				return await nginx_introspection(request, session, self.App), session
 			except Exception as e:
 				L.warning("Request authorization failed: {}".format(e), exc_info=True)
-				response = aiohttp.web.HTTPUnauthorized()
+				return aiohttp.web.HTTPUnauthorized(), session
+
+		cache_key = self.IntrospectionCache.build_key(
+			request, self.CookieService.get_session_cookie_value(request, client_id))
+		response = await self.IntrospectionCache.introspect(request, cache_key, introspect)
 
 		if response.status_code != 200:
 			delete_cookie(self.App, response)
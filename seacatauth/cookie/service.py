@@ -178,6 +178,12 @@ class CookieService(asab.Service):
 				(SessionAdapter.FN.Authentication.AvailableFactors, root_session.Authentication.AvailableFactors),
 			])
 
+		# Take over the TOTP status and last login snapshot
+		session_builders.append([
+			(SessionAdapter.FN.Authentication.TOTPSet, root_session.Authentication.TOTPSet),
+			(SessionAdapter.FN.Authentication.LastLogin, root_session.Authentication.LastLogin),
+		])
+
 		if root_session.TrackId is not None:
 			session_builders.append(((SessionAdapter.FN.Session.TrackId, root_session.TrackId),))
 
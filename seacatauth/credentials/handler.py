@@ -193,7 +193,7 @@ class CredentialsHandler(object):
 				# Check if the user has admin access to the role's tenant
 				tenant = filtr.split("/")[0]
 				if not rbac_svc.has_resource_access(
-					request.Session.Authorization.Authz, tenant, ["seacat:role:access"]
+					request.Session.Authorization.CompiledAuthz, tenant, ["seacat:role:access"]
 				):
 					return asab.web.rest.json_response(request, {
 						"result": "NOT-AUTHORIZED"
@@ -205,7 +205,7 @@ class CredentialsHandler(object):
 				# Check if the user has admin access to the requested tenant
 				tenant = filtr
 				if not rbac_svc.has_resource_access(
-					request.Session.Authorization.Authz, tenant, ["seacat:tenant:access"]
+					request.Session.Authorization.CompiledAuthz, tenant, ["seacat:tenant:access"]
 				):
 					return asab.web.rest.json_response(request, {
 						"result": "NOT-AUTHORIZED"
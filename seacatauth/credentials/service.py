@@ -392,7 +392,7 @@ class CredentialsService(asab.Service):
 
 		# Check credentials policy
 		if session is not None:
-			authz = session.Authorization.Authz
+			authz = session.Authorization.CompiledAuthz
 		else:
 			authz = None
 		validated_data = self.Policy.validate_update_data(update_dict, authz)
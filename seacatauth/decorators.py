@@ -128,14 +128,14 @@ async def _authorize_tenant(request):
 	Extract and authorize the requested tenant
 	If there's no tenant in the request or if the tenant is "*", no tenant-authorization happens
 	"""
-	# Gather resources from all global roles
-	available_resources = set(request.Session.Authorization.Authz.get("*"))
+	authz = request.Session.Authorization.CompiledAuthz
 
 	# Check for tenant access
 	requested_tenant = request.match_info.get("tenant")
 	if requested_tenant in (None, "*"):
 		# Global space is accessible to anyone
-		pass
+		# Gather resources from all global roles
+		available_resources = authz.GlobalResources
 	else:
 		# Check if tenant exists
 		tenant_service = request.App.get_service("seacatauth.TenantService")
@@ -144,13 +144,13 @@ async def _authorize_tenant(request):
 		except KeyError as e:
 			raise aiohttp.web.HTTPForbidden() from e
 
-		if requested_tenant in request.Session.Authorization.Authz:
+		if requested_tenant in authz:
 			# Tenant accessible
-			# Add resources from all roles under the requested_tenant
-			available_resources = available_resources.union(request.Session.Authorization.Authz.get(requested_tenant))
-		elif "authz:superuser" in available_resources:
+			# Add resources from all roles under the requested_tenant to the global resources
+			available_resources = authz.tenant_resources(requested_tenant)
+		elif authz.IsSuperuser:
 			# Bypassing tenant-access check as superuser
-			pass
+			available_resources = authz.GlobalResources
 		else:
 			# Tenant access denied
 			L.warning("Unauthorized access", struct_data={
@@ -26,6 +26,25 @@ def get_bearer_token_value(request):
 		return None
 
 
+class BearerTokenType:
+	# JWS compact serialization (ID tokens, signed access tokens)
+	JWT = "jwt"
+	# Opaque base64url-encoded access token
+	Opaque = "opaque"
+
+
+def get_bearer_token_type(token_value: str) -> str:
+	"""
+	Classify bearer token value without parsing it.
+
+	JWS compact serialization consists of three base64url segments separated by dots (RFC 7515),
+	while opaque access tokens never contain a dot.
+	"""
+	if token_value.count(".") == 2:
+		return BearerTokenType.JWT
+	return BearerTokenType.Opaque
+
+
 async def add_to_header(headers, attributes_to_add, session, requested_tenant=None):
 	"""
 	Prepare a common header with:
@@ -85,6 +104,8 @@ async def nginx_introspection(
 	Authenticates the introspection request and responds with 200 if successful or with 401 if not.
 	Optionally checks for resources. Missing resource access results in 403 response.
 	Optionally adds session attributes (username, tenants etc.) to X-headers.
+	Adds the session ID token to the Authorization header unless "noidtoken" is in the query.
+	The ID token can be limited to the userinfo claims listed in "claim" query parameters.
 	"""
 
 	# TODO: Optionally, validate the request URI (in request.headers["X-Request-Uri"])
@@ -98,12 +119,20 @@ async def nginx_introspection(
 	attributes_to_verify = request.query.getall("verify", [])
 	requested_resources = set(request.query.getall("resource", []))
 
+	# Introspection profile
+	# Upstreams that only read X-headers can skip the ID token with "noidtoken",
+	# others can limit the ID token to selected userinfo claims with "claim"
+	include_id_token = request.query.get("noidtoken") is None
+	id_token_claims = request.query.getall("claim", None)
+	if id_token_claims is not None:
+		id_token_claims = frozenset(id_token_claims)
+
 	requested_tenant = None
 	if "tenant" in attributes_to_verify:
 		raise NotImplementedError("Tenant check not implemented in introspection")
 
 	if len(requested_resources) > 0:
-		if not rbac_service.has_resource_access(session.Authorization.Authz, requested_tenant, requested_resources):
+		if not rbac_service.has_resource_access(session.Authorization.CompiledAuthz, requested_tenant, requested_resources):
 			L.warning("Credentials not authorized for tenant or resource.", struct_data={
 				"cid": session.Credentials.Id,
 				"tenant": requested_tenant,
@@ -114,18 +143,14 @@ async def nginx_introspection(
 	# Extend session expiration
 	session = await session_service.touch(session)
 
-	id_token = await oidc_service.build_id_token(session)
+	headers = {}
 
 	# Set the authorization header
-	headers = {
-		aiohttp.hdrs.AUTHORIZATION: "Bearer {}".format(id_token)
-	}
+	if include_id_token:
+		id_token = await oidc_service.get_id_token(session, claims=id_token_claims)
+		headers[aiohttp.hdrs.AUTHORIZATION] = "Bearer {}".format(id_token)
 
-	# Delete SeaCat cookie from header unless "keepcookie" param is passed in query
-	cookie_string = request.headers.get(aiohttp.hdrs.COOKIE, "")
-	if request.query.get("keepcookie") is None:
-		cookie_string = cookie_service.CookiePattern.sub("", cookie_string)
-	headers[aiohttp.hdrs.COOKIE] = cookie_string
+	headers[aiohttp.hdrs.COOKIE] = introspection_cookie_header(request, cookie_service)
 
 	# Add headers
 	headers = await add_to_header(
@@ -139,6 +164,17 @@ async def nginx_introspection(
 	return response
 
 
+def introspection_cookie_header(request: aiohttp.web.Request, cookie_service) -> str:
+	"""
+	Return the request Cookie header for the introspection response.
+	Delete SeaCat cookie from header unless "keepcookie" param is passed in query.
+	"""
+	cookie_string = request.headers.get(aiohttp.hdrs.COOKIE, "")
+	if request.query.get("keepcookie") is None:
+		cookie_string = cookie_service.CookiePattern.sub("", cookie_string)
+	return cookie_string
+
+
 def urlparse(url: str):
 	"""
 	Parse the URL into a dictionary.
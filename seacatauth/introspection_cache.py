@@ -0,0 +1,170 @@
+import asyncio
+import collections
+import datetime
+import hashlib
+import logging
+import time
+import typing
+
+import aiohttp.web
+import asab
+
+from .generic import introspection_cookie_header
+
+#
+
+L = logging.getLogger(__name__)
+
+#
+
+
+class IntrospectionCache:
+	"""
+	Short-lived in-process cache of successful nginx introspection responses.
+
+	Concurrent introspections with the same key (e.g. a burst of requests with the same cookie) are coalesced
+	into a single computation. Cached responses are dropped when their session is updated or terminated.
+
+	All responses get a Cache-Control header: successful responses may be cached until the session expires
+	(at most `max_age` seconds), others must not be cached.
+	"""
+
+	def __init__(self, app):
+		self.App = app
+		self.CookieService = app.get_service("seacatauth.CookieService")
+		self.MaxSize = asab.Config.getint("seacatauth:introspection", "cache_size")
+		self.TTL = asab.Config.getseconds("seacatauth:introspection", "cache_ttl")
+		self.MaxAge = asab.Config.getseconds("seacatauth:introspection", "max_age")
+
+		# Key -> (valid until, session ID, session expiration, response headers)
+		self.Responses = collections.OrderedDict()
+		# Session ID -> set of keys
+		self.SessionKeys = {}
+		# Key -> future of the introspection in progress
+		self.Pending = {}
+
+		app.PubSub.subscribe("Session.deleted!", self._on_session_changed)
+		app.PubSub.subscribe("Session.updated!", self._on_session_changed)
+
+
+	@staticmethod
+	def build_key(request: aiohttp.web.Request, credentials: typing.Optional[bytes]):
+		"""
+		Build cache key from the request path, query and the presented credentials (cookie, token etc.).
+		Credentials are hashed so that they are not kept in memory.
+		"""
+		if credentials is None:
+			return None
+		return (
+			request.path,
+			hashlib.sha256(credentials).digest(),
+			tuple(sorted(request.query.items())),
+		)
+
+
+	async def introspect(self, request: aiohttp.web.Request, key, introspect: typing.Callable):
+		"""
+		Return cached introspection response or compute a new one.
+
+		`introspect` is a coroutine function returning a tuple of the response and the introspected session.
+		"""
+		if key is None:
+			response, session = await introspect()
+			return self._set_cache_control(response, session.Session.Expiration if session else None)
+
+		entry = self._get(key)
+		if entry is not None:
+			return self._build_response(request, entry)
+
+		pending = self.Pending.get(key)
+		if pending is not None:
+			# The same introspection is already in progress, wait for its result
+			entry = await asyncio.shield(pending)
+			if entry is not None:
+				return self._build_response(request, entry)
+			# The introspection was not successful, do it again for this request
+			response, session = await introspect()
+			return self._set_cache_control(response, session.Session.Expiration if session else None)
+
+		pending = asyncio.get_running_loop().create_future()
+		self.Pending[key] = pending
+		entry = None
+		try:
+			response, session = await introspect()
+			if response.status_code == 200 and session is not None:
+				entry = self._put(key, session, response.headers)
+			return self._set_cache_control(response, session.Session.Expiration if session else None)
+		finally:
+			del self.Pending[key]
+			pending.set_result(entry)
+
+
+	def _get(self, key):
+		entry = self.Responses.get(key)
+		if entry is None:
+			return None
+		if time.monotonic() >= entry[0]:
+			self._drop(key)
+			return None
+		self.Responses.move_to_end(key)
+		return entry
+
+
+	def _put(self, key, session, headers):
+		# Cookie header is specific to each request, cache headers are computed when the response is served
+		headers = {
+			name: value
+			for name, value in headers.items()
+			if name.lower() not in ("cookie", "cache-control", "expires")
+		}
+		entry = (time.monotonic() + self.TTL, session.SessionId, session.Session.Expiration, headers)
+		if self.MaxSize <= 0 or self.TTL <= 0:
+			# Caching is disabled, the entry is only passed on to the coalesced requests
+			return entry
+
+		self._drop(key)
+		self.Responses[key] = entry
+		self.SessionKeys.setdefault(session.SessionId, set()).add(key)
+		while len(self.Responses) > self.MaxSize:
+			self._drop(next(iter(self.Responses)))
+		return entry
+
+
+	def _drop(self, key):
+		entry = self.Responses.pop(key, None)
+		if entry is None:
+			return
+		keys = self.SessionKeys.get(entry[1])
+		if keys is not None:
+			keys.discard(key)
+			if len(keys) == 0:
+				del self.SessionKeys[entry[1]]
+
+
+	def _on_session_changed(self, message_type, session_id, **kwargs):
+		for key in list(self.SessionKeys.get(session_id, ())):
+			self._drop(key)
+
+
+	def _build_response(self, request, entry):
+		_, _, expiration, headers = entry
+		response = aiohttp.web.HTTPOk(headers=headers)
+		response.headers[aiohttp.hdrs.COOKIE] = introspection_cookie_header(request, self.CookieService)
+		return self._set_cache_control(response, expiration)
+
+
+	def _set_cache_control(self, response, expiration: typing.Optional[datetime.datetime]):
+		if response.status_code != 200 or expiration is None:
+			response.headers[aiohttp.hdrs.CACHE_CONTROL] = "no-store"
+			return response
+
+		now = datetime.datetime.now(datetime.timezone.utc)
+		max_age = int(min(self.MaxAge, (expiration - now).total_seconds()))
+		if max_age <= 0:
+			response.headers[aiohttp.hdrs.CACHE_CONTROL] = "no-store"
+			return response
+
+		response.headers[aiohttp.hdrs.CACHE_CONTROL] = "private, max-age={}".format(max_age)
+		response.headers[aiohttp.hdrs.EXPIRES] = (now + datetime.timedelta(seconds=max_age)).strftime(
+			"%a, %d %b %Y %H:%M:%S GMT")
+		return response
@@ -2,7 +2,7 @@ import aiohttp.web
 import asab
 import logging
 
-from .generic import get_bearer_token_value
+from .generic import get_bearer_token_value, get_bearer_token_type, BearerTokenType
 
 #
 
@@ -47,25 +47,30 @@ def private_auth_middleware_factory(app):
 		request.Session = None
 		token_value = get_bearer_token_value(request)
 		if token_value is not None:
-			try:
+			if get_bearer_token_type(token_value) == BearerTokenType.JWT:
 				request.Session = await oidc_service.get_session_by_id_token(token_value)
-			except ValueError:
-				# If the token cannot be parsed as ID token, it may be an Access token
-				if _allow_access_token_auth:
+				if request.Session is None and _allow_access_token_auth:
+					# Signed access token
 					request.Session = await oidc_service.get_session_by_access_token(token_value)
-				else:
-					L.info("Invalid Bearer token")
+			elif _allow_access_token_auth:
+				request.Session = await oidc_service.get_session_by_access_token(token_value)
+			else:
+				L.info("Invalid Bearer token")
 
 		def has_resource_access(tenant: str, resource: str) -> bool:
 			if request.Session is None:
 				return False
-			return rbac_svc.has_resource_access(request.Session.Authorization.Authz, tenant, [resource])
+			return rbac_svc.has_resource_access(request.Session.Authorization.CompiledAuthz, tenant, [resource])
 
 		request.has_resource_access = has_resource_access
-		request.is_superuser = rbac_svc.is_superuser(request.Session.Authorization.Authz) \
-			if request.Session is not None else False
-		request.can_access_all_tenants = rbac_svc.can_access_all_tenants(request.Session.Authorization.Authz) \
-			if request.Session is not None else False
+		if request.Session is not None:
+			authz = request.Session.Authorization.CompiledAuthz
+			request.is_superuser = authz.IsSuperuser
+			request.can_access_all_tenants = authz.CanAccessAllTenants
+		else:
+			authz = None
+			request.is_superuser = False
+			request.can_access_all_tenants = False
 
 		if require_authentication is False:
 			return await handler(request)
@@ -76,16 +81,11 @@ def private_auth_middleware_factory(app):
 				return await handler(request)
 			# Resource authorization is required: scan ALL THE RESOURCES
 			#   for `authorization_resource` or "authz:superuser"
-			resources = set(
-				resource
-				for resources in request.Session.Authorization.Authz.values()
-				for resource in resources
-			)
 			# Grant access to superuser
-			if "authz:superuser" in resources:
+			if "authz:superuser" in authz.AllResources:
 				return await handler(request)
 			# Grant access to the bearer of `authorization_resource`
-			if authorization_resource in resources:
+			if authorization_resource in authz.AllResources:
 				return await handler(request)
 
 		# TODO authorization should be demanded on the handler level based on @accesscontrol
@@ -119,19 +119,20 @@ def public_auth_middleware_factory(app):
 		# If Bearer token exists, authorize using Bearer token and ignore cookie
 		token_value = get_bearer_token_value(request)
 		if token_value is not None:
-			try:
+			if get_bearer_token_type(token_value) == BearerTokenType.JWT:
 				request.Session = await oidc_service.get_session_by_id_token(token_value)
-			except ValueError:
-				# If the token cannot be parsed as ID token, it may be an Access token
-				# OIDC endpoints allow authorization via Access token
-				if request.path.startswith("/openidconnect/"):
-					request.Session = await oidc_service.get_session_by_access_token(token_value)
-				# Allow authorization via Access token on all public endpoints if enabled in config
-				elif _allow_access_token_auth:
+				if request.Session is None and (request.path.startswith("/openidconnect/") or _allow_access_token_auth):
+					# Signed access token
 					request.Session = await oidc_service.get_session_by_access_token(token_value)
-				else:
-					L.info("Invalid Bearer token")
-					raise aiohttp.web.HTTPUnauthorized()
+			# OIDC endpoints allow authorization via Access token
+			elif request.path.startswith("/openidconnect/"):
+				request.Session = await oidc_service.get_session_by_access_token(token_value)
+			# Allow authorization via Access token on all public endpoints if enabled in config
+			elif _allow_access_token_auth:
+				request.Session = await oidc_service.get_session_by_access_token(token_value)
+			else:
+				L.info("Invalid Bearer token")
+				raise aiohttp.web.HTTPUnauthorized()
 		else:
 			# No Bearer token exists, authorize using cookie
 			request.Session = await cookie_service.get_session_by_request_cookie(request)
@@ -384,7 +384,7 @@ class AuthorizeHandler(object):
 			# Authorize access to tenants requested in scope
 			try:
 				tenants = await self.authorize_tenants_by_scope(
-					scope, root_session.Authorization.Authz, root_session.Credentials.Id, client_id)
+					scope, root_session.Authorization.CompiledAuthz, root_session.Credentials.Id, client_id)
 			except exceptions.AccessDeniedError:
 				raise OAuthAuthorizeError(
 					AuthErrorResponseCode.AccessDenied, client_id,
@@ -418,7 +418,7 @@ class AuthorizeHandler(object):
 				# Authorize access to tenants requested in scope
 				try:
 					tenants = await self.authorize_tenants_by_scope(
-						scope, root_session.Authorization.Authz, root_session.Credentials.Id, client_id)
+						scope, root_session.Authorization.CompiledAuthz, root_session.Credentials.Id, client_id)
 				except exceptions.AccessDeniedError:
 					raise OAuthAuthorizeError(
 						AuthErrorResponseCode.AccessDenied, client_id,
@@ -836,10 +836,7 @@ class AuthorizeHandler(object):
 
 
 	async def authorize_tenants_by_scope(self, scope, authz, credentials_id, client_id):
-		has_access_to_all_tenants = self.OpenIdConnectService.RBACService.has_resource_access(
-			authz, tenant=None, requested_resources=["authz:superuser"]) \
-			or self.OpenIdConnectService.RBACService.has_resource_access(
-			authz, tenant=None, requested_resources=["authz:tenant:access"])
+		has_access_to_all_tenants = self.OpenIdConnectService.RBACService.can_access_all_tenants(authz)
 		try:
 			tenants = await self.OpenIdConnectService.TenantService.get_tenants_by_scope(
 				scope, credentials_id, has_access_to_all_tenants)
@@ -1,11 +1,21 @@
+import base64
+import datetime
 import urllib
 import logging
 import aiohttp.web
 
 import asab
+import asab.exceptions
 import asab.web.rest
+import bson
+import jwcrypto.common
 
-from ...generic import nginx_introspection, get_bearer_token_value
+from ...generic import nginx_introspection, get_bearer_token_value, get_bearer_token_type, BearerTokenType
+from ...introspection_cache import IntrospectionCache
+from ...session import SessionAdapter
+from ..service import authz_digest
+from ..token_index import ActiveTokenIndex
+from ..utils import TokenRequestErrorResponseCode
 
 #
 
@@ -29,14 +39,19 @@ class TokenIntrospectionHandler(object):
 		self.OpenIdConnectService = oidc_svc
 		self.SessionService = app.get_service("seacatauth.SessionService")
 		self.RBACService = app.get_service("seacatauth.RBACService")
+		self.IntrospectionCache = IntrospectionCache(app)
+		self.TokenIndex = ActiveTokenIndex(app)
+		self.BatchMaxSize = asab.Config.getint("seacatauth:introspection", "batch_max_size")
 
 		web_app = app.WebContainer.WebApp
 		web_app.router.add_post("/openidconnect/introspect", self.introspect)
 		web_app.router.add_post("/openidconnect/introspect/nginx", self.introspect_nginx)
+		web_app.router.add_post("/openidconnect/introspect/batch", self.introspect_batch)
 
 		# Public endpoints
+		# RFC 7662 and batch introspection reveal session data to unauthenticated callers,
+		# so they are only served privately
 		web_app_public = app.PublicWebContainer.WebApp
-		web_app_public.router.add_post("/openidconnect/introspect", self.introspect)
 		web_app_public.router.add_post("/openidconnect/introspect/nginx", self.introspect_nginx)
 
 
@@ -51,26 +66,55 @@ class TokenIntrospectionHandler(object):
 		Content-Type: application/x-www-form-urlencoded
 
 		token=2YotnFZFEjr1zCsicMWpAA&token_type_hint=access_token
+
+		Served on the private web container only, since the caller is not authenticated.
+		Active tokens are answered from the in-process token index if possible.
 		"""
 
 		data = await request.text()
 		qs_data = dict(urllib.parse.parse_qsl(data))
 
-		if qs_data.get('token_type_hint', 'access_token') != 'access_token':
-			raise RuntimeError("Token type is not 'access_token' but '{}'".format(
-				qs_data.get('token_type_hint', '<not provided>'))
-			)
-
-		token = qs_data.get('token')
+		token = qs_data.get("token")
 		if token is None:
-			raise KeyError("Token not found")
+			L.warning("Token not provided")
+			return asab.web.rest.json_response(
+				request, {"error": TokenRequestErrorResponseCode.InvalidRequest}, status=400)
+
+		# Only access tokens can be introspected, other token type hints are ignored (RFC7662 chapter 2.1)
+		digest = self.TokenIndex.digest(token)
+		response = self.TokenIndex.get(digest)
+		if response is not None:
+			return asab.web.rest.json_response(request, response)
+
+		session = await self.OpenIdConnectService.get_session_by_access_token(token)
+		if session is None or session.Session.Expiration <= datetime.datetime.now(datetime.timezone.utc):
+			return asab.web.rest.json_response(request, {"active": False})
+
+		response = self._build_introspection_response(session)
+		self.TokenIndex.put(digest, session.SessionId, response)
+		return asab.web.rest.json_response(request, response)
 
-		# TODO: Implement a token validation
 
+	def _build_introspection_response(self, session) -> dict:
 		response = {
 			"active": True,
+			"token_type": "Bearer",
+			"iss": self.OpenIdConnectService.Issuer,
+			"sub": session.Credentials.Id,
+			"exp": int(session.Session.Expiration.timestamp()),
+			"iat": int(session.Session.CreatedAt.timestamp()),
 		}
-		return asab.web.rest.json_response(request, response)
+		if session.OAuth2.ClientId is not None:
+			response["client_id"] = session.OAuth2.ClientId
+		if session.OAuth2.Scope:
+			response["scope"] = " ".join(session.OAuth2.Scope)
+		if session.Credentials.Username is not None:
+			response["username"] = session.Credentials.Username
+		if session.Authorization.Tenants:
+			response["tenant"] = " ".join(session.Authorization.Tenants)
+		# Resource servers compare it with the `azd` claim of signed access tokens to detect authorization changes
+		response["azd"] = authz_digest(session.Authorization.Authz)
+		return response
 
 
 	async def authenticate_request(self, request):
@@ -128,19 +172,137 @@ class TokenIntrospectionHandler(object):
 		}
 		"""
 
-		session = await self.authenticate_request(request)
-
-		if session is not None:
+		async def introspect():
+			session = await self.authenticate_request(request)
+			if session is None:
+				return aiohttp.web.HTTPUnauthorized(), None
 			try:
-				response = await nginx_introspection(request, session, self.OpenIdConnectService.App)
+				return await nginx_introspection(request, session, self.OpenIdConnectService.App), session
 			except Exception as e:
 				L.warning("Request authorization failed: {}".format(e), exc_info=True)
-				response = aiohttp.web.HTTPUnauthorized()
-		else:
-			response = aiohttp.web.HTTPUnauthorized()
+				return aiohttp.web.HTTPUnauthorized(), session
+
+		token_value = get_bearer_token_value(request)
+		cache_key = self.IntrospectionCache.build_key(
+			request, token_value.encode("utf-8") if token_value is not None else None)
+		response = await self.IntrospectionCache.introspect(request, cache_key, introspect)
 
 		if response.status_code != 200:
 			response.headers["WWW-Authenticate"] = 'Bearer realm="{}"'.format(self.OpenIdConnectService.BearerRealm)
 			return response
 
 		return response
+
+
+	@asab.web.rest.json_schema_handler({
+		"type": "object",
+		"required": ["tokens"],
+		"additionalProperties": False,
+		"properties": {
+			"tokens": {
+				"type": "array",
+				"description": "Tokens to introspect.",
+				"items": {
+					"type": "object",
+					"required": ["token"],
+					"additionalProperties": False,
+					"properties": {
+						"token": {"type": "string"},
+						"type": {
+							"type": "string",
+							"enum": ["access_token", "id_token", "cookie"],
+							"description": "Token type. Defaults to 'access_token'."},
+					}}},
+			"resource": {
+				"type": "array",
+				"description": "Resources that the sessions must have access to.",
+				"items": {"type": "string"}},
+			"id_token": {
+				"type": "boolean",
+				"description": "Include an ID token for every active session."},
+		},
+		"example": {
+			"tokens": [
+				{"token": "2YotnFZFEjr1zCsicMWpAA", "type": "access_token"},
+				{"token": "eyJhbGciOiJFUzI1NiIsInR5cCI6IkpXVCJ9...", "type": "id_token"},
+				{"token": "N2JnM3pteXphc2RpY3M3d2R6cGZwZzRv", "type": "cookie"}],
+			"resource": ["my-app:access"],
+			"id_token": True}
+	})
+	async def introspect_batch(self, request, *, json_data):
+		"""
+		Batch token introspection
+
+		Resolve many access tokens, ID tokens or cookie values with a single session query.
+		The response contains one item per requested token, in the same order.
+		The item status is 200 if the token is valid, 401 if it is not
+		and 403 if the session is not authorized for the requested resources.
+
+		Served on the private web container only, since the caller is not authenticated.
+		"""
+		tokens = json_data["tokens"]
+		if len(tokens) > self.BatchMaxSize:
+			raise asab.exceptions.ValidationError(
+				"Too many tokens in batch (maximum is {}).".format(self.BatchMaxSize))
+		requested_resources = set(json_data.get("resource", []))
+		include_id_token = json_data.get("id_token", False)
+
+		lookups = [self._batch_lookup(token.get("type", "access_token"), token["token"]) for token in tokens]
+		sessions = await self.SessionService.get_many_by([lookup for lookup in lookups if lookup is not None])
+
+		data = []
+		for lookup in lookups:
+			session = sessions.get(lookup) if lookup is not None else None
+			if session is None:
+				data.append({"status": 401})
+				continue
+
+			if len(requested_resources) > 0 and not self.RBACService.has_resource_access(
+				session.Authorization.CompiledAuthz, None, requested_resources
+			):
+				data.append({"status": 403, "sid": str(session.SessionId)})
+				continue
+
+			session = await self.SessionService.touch(session)
+			item = {
+				"status": 200,
+				"sid": str(session.SessionId),
+				"cid": session.Credentials.Id,
+				"exp": session.Session.Expiration,
+				"authz": session.Authorization.Authz,
+			}
+			if include_id_token:
+				item["id_token"] = await self.OpenIdConnectService.get_id_token(session)
+			data.append(item)
+
+		return asab.web.rest.json_response(request, {"result": "OK", "data": data})
+
+
+	def _batch_lookup(self, token_type: str, token_value: str):
+		"""
+		Translate a token into a session lookup (field, value) or None if the token is invalid.
+		"""
+		if get_bearer_token_type(token_value) == BearerTokenType.JWT:
+			if token_type == "cookie":
+				return None
+			try:
+				session_id = self.OpenIdConnectService.get_session_id_by_jwt(
+					token_value, access_token=(token_type == "access_token"))
+			except (ValueError, jwcrypto.common.JWException):
+				return None
+			if session_id is None:
+				return None
+			try:
+				return SessionAdapter.FN.SessionId, bson.ObjectId(session_id)
+			except bson.errors.InvalidId:
+				return None
+
+		if token_type == "id_token":
+			return None
+		try:
+			raw_value = base64.urlsafe_b64decode(token_value.encode("ascii"))
+		except ValueError:
+			return None
+		if token_type == "cookie":
+			return SessionAdapter.FN.Cookie.Id, raw_value
+		return SessionAdapter.FN.OAuth2.AccessToken, raw_value
@@ -2,6 +2,8 @@ import logging
 
 import asab.web.rest
 
+from ..service import signing_algorithm
+
 #
 
 L = logging.getLogger(__name__)
@@ -44,19 +46,21 @@ class PublicKeysHandler(object):
 				type: boolean
 				enum: ["pem", "jwk"]
 		"""
-		# TODO: Multiple key support
-		public_key = self.OpenIdConnectService.PrivateKey.public()
+		# Signing keys and retired keys whose tokens are still accepted
+		public_keys = [key.public() for key in self.OpenIdConnectService.KeySet]
 		key_format = request.query.get("format", "jwk")
 
 		if key_format == "jwk":
 			# Export as JWK object
 			data = {"keys": [
-				public_key.export_public(as_dict=True)
+				dict(public_key.export_public(as_dict=True), alg=signing_algorithm(public_key), use="sig")
+				for public_key in public_keys
 			]}
 		elif key_format == "pem":
 			# Export as PEM
 			data = {
 				public_key.get("kid"): public_key.export_to_pem().decode("ascii")
+				for public_key in public_keys
 			}
 		else:
 			return asab.web.rest.json_response(
@@ -2,7 +2,7 @@ import logging
 import aiohttp
 import aiohttp.web
 
-from ...generic import get_bearer_token_value
+from ...generic import get_bearer_token_value, get_bearer_token_type, BearerTokenType
 
 #
 
@@ -42,9 +42,12 @@ class SessionHandler(object):
 			L.warning("Invalid or missing Bearer token")
 			return aiohttp.web.HTTPBadRequest()
 
-		try:
+		if get_bearer_token_type(token_value) == BearerTokenType.JWT:
 			session = await self.OpenIdConnectService.get_session_by_id_token(token_value)
-		except ValueError:
+			if session is None:
+				# Signed access token
+				session = await self.OpenIdConnectService.get_session_by_access_token(token_value)
+		else:
 			session = await self.OpenIdConnectService.get_session_by_access_token(token_value)
 		if session is None:
 			return aiohttp.web.HTTPNotFound()
@@ -192,11 +192,16 @@ class TokenHandler(object):
 
 		id_token = await self.OpenIdConnectService.build_id_token(new_session)
 
+		if self.OpenIdConnectService.SignedAccessTokens:
+			access_token = self.OpenIdConnectService.build_access_token(new_session)
+		else:
+			access_token = new_session.OAuth2.AccessToken
+
 		# 3.1.3.3.  Successful Token Response
 		body = {
 			"token_type": "Bearer",
 			"scope": " ".join(new_session.OAuth2.Scope),
-			"access_token": new_session.OAuth2.AccessToken,
+			"access_token": access_token,
 			"refresh_token": new_session.OAuth2.RefreshToken,
 			"id_token": id_token,
 			"expires_in": expires_in,
@@ -354,12 +359,12 @@ class TokenHandler(object):
 			raise asab.exceptions.ValidationError("No ID token found in request body or Authorization header.")
 
 		try:
-			token = jwcrypto.jwt.JWT(jwt=token_string, key=self.OpenIdConnectService.PrivateKey)
+			token = jwcrypto.jwt.JWT(jwt=token_string, key=self.OpenIdConnectService.KeySet)
 		except ValueError as e:
 			return asab.web.rest.json_response(request, {"error": str(e)}, status=400)
 		except jwcrypto.jwt.JWTExpired:
 			return asab.web.rest.json_response(request, {"error": "ID token expired"}, status=401)
-		except jwcrypto.jws.InvalidJWSSignature:
+		except (jwcrypto.jws.InvalidJWSSignature, jwcrypto.jwt.JWTMissingKey):
 			return asab.web.rest.json_response(request, {"error": "Invalid ID token signature"}, status=401)
 
 		try:
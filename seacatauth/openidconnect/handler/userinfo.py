@@ -48,7 +48,7 @@ class UserInfoHandler(object):
 
 		# # if authorized get provider for this identity
 
-		userinfo = await self.OpenIdConnectService.build_userinfo(session)
+		userinfo = await self.OpenIdConnectService.build_userinfo(session, fresh=True)
 
 		return asab.web.rest.json_response(request, userinfo)
 
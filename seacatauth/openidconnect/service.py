@@ -1,9 +1,13 @@
+import collections
 import datetime
+import hashlib
 import json
 import os.path
 import base64
 import secrets
 import logging
+import time
+import typing
 import uuid
 
 import asab
@@ -14,8 +18,9 @@ import urllib.parse
 import jwcrypto.jwt
 import jwcrypto.jwk
 import jwcrypto.jws
+import jwcrypto.common
 
-from ..generic import add_params_to_url_query
+from ..generic import add_params_to_url_query, get_bearer_token_type, BearerTokenType
 from ..session import SessionAdapter
 from ..session import (
 	credentials_session_builder,
@@ -37,7 +42,44 @@ L = logging.getLogger(__name__)
 
 #
 
-# TODO: Use JWA algorithms?
+# JWS algorithm for each supported signing key type and curve
+SigningAlgorithms = {
+	("EC", "P-256"): "ES256",
+	("EC", "P-384"): "ES384",
+	("EC", "P-521"): "ES512",
+	("OKP", "Ed25519"): "EdDSA",
+}
+
+
+def signing_algorithm(key: jwcrypto.jwk.JWK) -> str:
+	"""
+	Return the JWS algorithm for the key or raise ValueError if the key type is not supported
+	"""
+	try:
+		return SigningAlgorithms[(key.key_type, key.get("crv"))]
+	except KeyError:
+		raise ValueError("Unsupported signing key type: {} {}".format(key.key_type, key.get("crv")))
+
+
+def load_retired_keys(paths: typing.Iterable[str]) -> list:
+	"""
+	Load retired private keys that are only used for token verification.
+	Keys that cannot be read or used are logged and skipped.
+	"""
+	keys = []
+	for path in paths:
+		if not os.path.isfile(path):
+			L.error("Retired private key file does not exist", struct_data={"path": path})
+			continue
+		try:
+			with open(path, "rb") as f:
+				key = jwcrypto.jwk.JWK.from_pem(f.read())
+			signing_algorithm(key)
+		except (OSError, ValueError, TypeError) as e:
+			L.error("Cannot load retired private key: {}".format(e), struct_data={"path": path})
+			continue
+		keys.append(key)
+	return keys
 
 
 class OpenIdConnectService(asab.Service):
@@ -47,6 +89,10 @@ class OpenIdConnectService(asab.Service):
 	# Chapter 2.1. Authorization Request Header Field
 	AuthorizationCodeCollection = "ac"
 	AuthorizePath = "/openidconnect/authorize"
+	# JWT type of signed access tokens (RFC 9068)
+	AccessTokenType = "at+jwt"
+	# ID token claims that are kept when only selected userinfo claims are requested
+	MandatoryIdTokenClaims = frozenset(["iss", "sub", "aud", "azp", "exp", "iat", "sid", "psid"])
 
 	def __init__(self, app, service_name="seacatauth.OpenIdConnectService"):
 		super().__init__(app, service_name)
@@ -77,24 +123,63 @@ class OpenIdConnectService(asab.Service):
 		else:
 			self.PublicApiBaseUrl = public_api_base_url
 
-		self.PrivateKey = self._load_private_key()
+		self._load_keys()
 
 		self.JSONDumper = asab.web.rest.json.JSONDumper(pretty=False)
 
+		self.SignedAccessTokens = asab.Config.getboolean("openidconnect", "signed_access_tokens")
+		# IDs of terminated sessions whose signed access tokens must be rejected
+		# (session ID -> UNIX time when the last token issued for the session expires)
+		self.RevokedSessions = {}
+
+		# Signed ID tokens for introspection
+		# (session ID -> {selected claims -> (session version, expiration timestamp, ID token)})
+		self.IdTokenCache = collections.OrderedDict()
+		self.IdTokenCacheSize = asab.Config.getint("openidconnect", "id_token_cache_size")
+		self.IdTokenReuseMargin = asab.Config.getseconds("openidconnect", "id_token_reuse_margin")
+
+		# Verified JWT bearer tokens (token digest -> (expiration timestamp, token type, claims))
+		self.VerifiedJWTCache = collections.OrderedDict()
+		self.VerifiedJWTCacheSize = asab.Config.getint("openidconnect", "jwt_cache_size")
+		self.JWTCacheCounter = app.get_service("asab.MetricsService").create_counter(
+			"jwt_verification_cache",
+			tags={"help": "Counts JWT verification cache hits and misses."},
+			init_values={"hit": 0, "miss": 0}
+		)
+
 		self.App.PubSub.subscribe("Application.tick/60!", self._on_tick)
+		self.App.PubSub.subscribe("Session.deleted!", self._on_session_deleted)
 
 
 	async def _on_tick(self, event_name):
 		await self.delete_expired_authorization_codes()
+		self._prune_revoked_sessions()
+
+
+	def _on_session_deleted(self, message_type, session_id, max_expiration=None):
+		self.IdTokenCache.pop(session_id, None)
+		if not self.SignedAccessTokens:
+			return
+		if max_expiration is not None:
+			revoked_until = max_expiration.timestamp()
+		else:
+			revoked_until = time.time() + self.SessionService.MaximumAge.total_seconds()
+		self.RevokedSessions[str(session_id)] = revoked_until
 
 
-	def _load_private_key(self):
+	def _prune_revoked_sessions(self):
+		now = time.time()
+		expired = [sid for sid, revoked_until in self.RevokedSessions.items() if revoked_until < now]
+		for sid in expired:
+			del self.RevokedSessions[sid]
+
+
+	def _load_keys(self):
 		"""
-		Load private key from file.
-		If it does not exist, generate a new one and write to file.
+		Load the main signing key, the introspection signing key and retired keys.
+		All of them are used for token verification.
 		"""
 		# TODO: Add encryption option
-		# TODO: Multiple key support
 		private_key_path = asab.Config.get("openidconnect", "private_key")
 		if len(private_key_path) == 0:
 			# Use config folder
@@ -106,7 +191,27 @@ class OpenIdConnectService(asab.Service):
 				asab.LOG_NOTICE,
 				"OpenIDConnect private key file not specified. Defaulting to '{}'.".format(private_key_path)
 			)
+		self.PrivateKey = self._load_private_key(private_key_path, "EC")
+
+		introspection_key_path = asab.Config.get("openidconnect", "introspection_private_key")
+		if len(introspection_key_path) > 0:
+			self.IntrospectionKey = self._load_private_key(introspection_key_path, "Ed25519")
+		else:
+			self.IntrospectionKey = self.PrivateKey
+
+		self.KeySet = jwcrypto.jwk.JWKSet()
+		self.KeySet.add(self.PrivateKey)
+		if self.IntrospectionKey is not self.PrivateKey:
+			self.KeySet.add(self.IntrospectionKey)
+		for retired_key in load_retired_keys(asab.Config.get("openidconnect", "retired_private_keys").split()):
+			self.KeySet.add(retired_key)
 
+
+	def _load_private_key(self, private_key_path, key_type):
+		"""
+		Load private key from file.
+		If it does not exist and the app runs in provisioning mode, generate a new one and write it to the file.
+		"""
 		if os.path.isfile(private_key_path):
 			with open(private_key_path, "rb") as f:
 				private_key = jwcrypto.jwk.JWK.from_pem(f.read())
@@ -115,29 +220,32 @@ class OpenIdConnectService(asab.Service):
 			L.warning(
 				"OpenIDConnect private key file does not exist. Generating a new one."
 			)
-			private_key = self._generate_private_key(private_key_path)
+			private_key = self._generate_private_key(private_key_path, key_type)
 		else:
 			raise FileNotFoundError(
 				"Private key file '{}' does not exist. "
 				"Run the app in provisioning mode to generate a new private key.".format(private_key_path)
 			)
 
-		assert private_key.key_type == "EC"
-		assert private_key.key_curve == "P-256"
+		# Make sure the key can be used for signing
+		signing_algorithm(private_key)
 		return private_key
 
 
-	def _generate_private_key(self, private_key_path):
+	def _generate_private_key(self, private_key_path, key_type="EC"):
 		assert not os.path.isfile(private_key_path)
 
 		import cryptography.hazmat.backends
 		import cryptography.hazmat.primitives.serialization
 		import cryptography.hazmat.primitives.asymmetric.ec
-		import cryptography.hazmat.primitives.ciphers.algorithms
-		_private_key = cryptography.hazmat.primitives.asymmetric.ec.generate_private_key(
-			cryptography.hazmat.primitives.asymmetric.ec.SECP256R1(),
-			cryptography.hazmat.backends.default_backend()
-		)
+		import cryptography.hazmat.primitives.asymmetric.ed25519
+		if key_type == "Ed25519":
+			_private_key = cryptography.hazmat.primitives.asymmetric.ed25519.Ed25519PrivateKey.generate()
+		else:
+			_private_key = cryptography.hazmat.primitives.asymmetric.ec.generate_private_key(
+				cryptography.hazmat.primitives.asymmetric.ec.SECP256R1(),
+				cryptography.hazmat.backends.default_backend()
+			)
 		# Serialize into PEM
 		private_pem = _private_key.private_bytes(
 			encoding=cryptography.hazmat.primitives.serialization.Encoding.PEM,
@@ -192,6 +300,17 @@ class OpenIdConnectService(asab.Service):
 
 
 	async def get_session_by_access_token(self, token_value):
+		if get_bearer_token_type(token_value) == BearerTokenType.JWT:
+			if not self.SignedAccessTokens:
+				L.info("Signed access tokens are disabled")
+				return None
+			try:
+				session_id = self.get_session_id_by_jwt(token_value, access_token=True)
+			except (ValueError, jwcrypto.common.JWException):
+				L.info("Invalid access token")
+				return None
+			return await self._get_session_by_signed_access_token(session_id)
+
 		# Decode the access token
 		try:
 			access_token = base64.urlsafe_b64decode(token_value)
@@ -211,33 +330,171 @@ class OpenIdConnectService(asab.Service):
 
 	async def get_session_by_id_token(self, token_value):
 		try:
-			token = jwcrypto.jwt.JWT(jwt=token_value, key=self.PrivateKey)
-		except jwcrypto.jwt.JWTExpired:
-			L.warning("ID token expired")
+			session_id = self.get_session_id_by_jwt(token_value)
+		except (ValueError, jwcrypto.common.JWException):
+			L.info("Invalid ID token")
 			return None
-		except jwcrypto.jws.InvalidJWSSignature:
-			L.warning("Invalid ID token signature")
+		if session_id is None:
 			return None
 
 		try:
-			data_dict = json.loads(token.claims)
-			session_id = data_dict["sid"]
-		except ValueError:
-			L.warning("Cannot read ID token claims")
+			session = await self.SessionService.get(session_id)
+		except (KeyError, ValueError):
+			L.warning("Session not found")
 			return None
-		except KeyError:
+
+		return session
+
+
+	def get_session_id_by_jwt(self, token_value: str, access_token: bool = False):
+		"""
+		Verify signed ID token (or signed access token if `access_token` is set) and return the session ID
+		from its claims.
+		Return None if the token is expired, has invalid signature, is of the other type or is revoked.
+		Raise ValueError if the value cannot be parsed as a JWT.
+
+		Verified tokens are cached until they expire, so that repeated requests skip the signature verification.
+		"""
+		digest = hashlib.sha256(token_value.encode("utf-8")).digest()
+		entry = self._get_verified_jwt(digest)
+		if entry is not None:
+			token_type, claims = entry
+		else:
+			try:
+				token = jwcrypto.jwt.JWT(jwt=token_value, key=self.KeySet)
+			except jwcrypto.jwt.JWTExpired:
+				L.warning("Token expired")
+				return None
+			except (jwcrypto.jws.InvalidJWSSignature, jwcrypto.jwt.JWTMissingKey):
+				L.warning("Invalid token signature")
+				return None
+
+			token_type = token.token.jose_header.get("typ")
+			try:
+				claims = json.loads(token.claims)
+			except ValueError:
+				L.warning("Cannot read token claims")
+				return None
+			self._put_verified_jwt(digest, token_type, claims)
+
+		if access_token:
+			if not self.SignedAccessTokens:
+				L.info("Signed access tokens are disabled")
+				return None
+			if token_type != self.AccessTokenType:
+				L.info("Token is not an access token")
+				return None
+			session_id = claims.get("sid")
+			if session_id is None:
+				L.warning("Access token claims do not contain 'sid'")
+				return None
+			if session_id in self.RevokedSessions:
+				L.info("Access token revoked", struct_data={"sid": session_id})
+				return None
+			return session_id
+
+		if token_type == self.AccessTokenType:
+			# Access tokens must not pass where ID tokens are expected,
+			# access token authentication may be disabled
+			L.info("Access token cannot be used in place of ID token")
+			return None
+
+		session_id = claims.get("sid")
+		if session_id is None:
 			L.warning("ID token claims do not contain 'sid'")
 			return None
+		return session_id
+
+
+	def _get_verified_jwt(self, digest: bytes):
+		entry = self.VerifiedJWTCache.get(digest)
+		if entry is None:
+			self.JWTCacheCounter.add("miss", 1)
+			return None
+		expires_at, token_type, claims = entry
+		if time.time() >= expires_at:
+			del self.VerifiedJWTCache[digest]
+			self.JWTCacheCounter.add("miss", 1)
+			return None
+		self.VerifiedJWTCache.move_to_end(digest)
+		self.JWTCacheCounter.add("hit", 1)
+		return token_type, claims
+
+
+	def _put_verified_jwt(self, digest: bytes, token_type: str, claims: dict):
+		if self.VerifiedJWTCacheSize <= 0 or not isinstance(claims, dict):
+			return
+		expires_at = claims.get("exp")
+		if not isinstance(expires_at, (int, float)):
+			return
+		self.VerifiedJWTCache[digest] = (expires_at, token_type, claims)
+		while len(self.VerifiedJWTCache) > self.VerifiedJWTCacheSize:
+			self.VerifiedJWTCache.popitem(last=False)
+
+
+	async def _get_session_by_signed_access_token(self, session_id: typing.Optional[str]):
+		"""
+		Locate the session of a verified signed access token.
+
+		The session store is the revocation source shared by all instances: the token is valid only while
+		its session exists and has not expired. Tokens of sessions terminated by this instance are rejected
+		earlier, without database access.
+		"""
+		if session_id is None:
+			return None
 
 		try:
 			session = await self.SessionService.get(session_id)
-		except ValueError:
-			L.warning("Session not found")
+		except (KeyError, ValueError):
+			L.info("Session not found by access token", struct_data={"sid": session_id})
+			return None
+
+		if session.Session.Expiration <= datetime.datetime.now(datetime.timezone.utc):
+			L.info("Session of access token expired", struct_data={"sid": session_id})
 			return None
 
 		return session
 
 
+	def build_access_token(self, session) -> str:
+		"""
+		Wrap session ID, expiration and authorization digest in a signed JWT access token (RFC 9068)
+		"""
+		# The token may be used as long as the session can be extended,
+		# validation checks that the session still exists and has not expired
+		expiration = session.Session.MaxExpiration or session.Session.Expiration
+		payload = {
+			"iss": self.Issuer,
+			"sub": session.Credentials.Id,
+			"sid": str(session.SessionId),
+			"exp": int(expiration.timestamp()),
+			"iat": int(time.time()),
+			"jti": secrets.token_urlsafe(16),
+			"azd": authz_digest(session.Authorization.Authz),
+		}
+		if session.OAuth2.ClientId is not None:
+			payload["client_id"] = session.OAuth2.ClientId
+
+		return self.sign_jwt(payload, self.PrivateKey, token_type=self.AccessTokenType)
+
+
+	def sign_jwt(self, payload: dict, key: jwcrypto.jwk.JWK, token_type: str = "JWT") -> str:
+		"""
+		Sign the payload with the key, using the JWS algorithm that corresponds to the key type
+		"""
+		header = {
+			"alg": signing_algorithm(key),
+			"typ": token_type,
+			"kid": key.key_id,
+		}
+		token = jwcrypto.jwt.JWT(
+			header=header,
+			claims=self.JSONDumper(payload)
+		)
+		token.make_signed_token(key)
+		return token.serialize()
+
+
 	def refresh_token(self, refresh_token, client_id, client_secret, scope):
 		# TODO: this is not implemented
 		L.error("refresh_token is not implemented", struct_data=[refresh_token, client_id, client_secret, scope])
@@ -283,6 +540,12 @@ class OpenIdConnectService(asab.Service):
 				),
 			])
 
+		# Take over the TOTP status and last login snapshot
+		session_builders.append([
+			(SessionAdapter.FN.Authentication.TOTPSet, root_session.Authentication.TOTPSet),
+			(SessionAdapter.FN.Authentication.LastLogin, root_session.Authentication.LastLogin),
+		])
+
 		# TODO: if 'openid' in scope
 		oauth2_data = {
 			"scope": scope,
@@ -386,13 +649,16 @@ class OpenIdConnectService(asab.Service):
 		return session
 
 
-	async def build_userinfo(self, session):
+	async def build_userinfo(self, session, fresh: bool = False):
+		"""
+		Build userinfo from session data.
+		TOTP status and last login times are taken from the snapshot stored in the session,
+		unless `fresh` is set, in which case they are fetched from the database.
+		"""
 		# TODO: Session object should only serve as a cache
 		#   After the cache has expired, update session object with fresh credential, authn and authz data
 		#   and rebuild the userinfo
 
-		otp_service = self.App.get_service("seacatauth.OTPService")
-
 		userinfo = {
 			"iss": self.Issuer,
 			"sub": session.Credentials.Id,  # The sub (subject) Claim MUST always be returned in the UserInfo Response.
@@ -443,7 +709,12 @@ class OpenIdConnectService(asab.Service):
 			userinfo["impersonator_sid"] = session.Authentication.ImpersonatorSessionId
 			userinfo["impersonator_cid"] = session.Authentication.ImpersonatorCredentialsId
 
-		if await otp_service.has_activated_totp(session.Credentials.Id):
+		if fresh:
+			otp_service = self.App.get_service("seacatauth.OTPService")
+			totp_set = await otp_service.has_activated_totp(session.Credentials.Id)
+		else:
+			totp_set = session.Authentication.TOTPSet
+		if totp_set:
 			userinfo["totp_set"] = True
 
 		if session.Authentication.AvailableFactors is not None:
@@ -474,12 +745,14 @@ class OpenIdConnectService(asab.Service):
 		# TODO: Last password change
 
 		# Get last successful and failed login times
-		# TODO: Store last login in session
-		try:
-			last_login = await self.AuditService.get_last_logins(session.Credentials.Id)
-		except Exception as e:
-			last_login = None
-			L.warning("Could not fetch last logins: {}".format(e))
+		if fresh:
+			try:
+				last_login = await self.AuditService.get_last_logins(session.Credentials.Id)
+			except Exception as e:
+				last_login = None
+				L.warning("Could not fetch last logins: {}".format(e))
+		else:
+			last_login = session.Authentication.LastLogin
 
 		if last_login is not None:
 			if "fat" in last_login:
@@ -496,35 +769,59 @@ class OpenIdConnectService(asab.Service):
 		return userinfo
 
 
-	async def build_id_token(self, session):
+	async def build_id_token(self, session, claims: typing.Optional[frozenset] = None, key: jwcrypto.jwk.JWK = None):
 		"""
 		Wrap authentication data and userinfo in a JWT token
-		"""
-		header = {
-			"alg": "ES256",  # TODO: This should be mapped from key_type and key_curve
-			"typ": "JWT",
-			"kid": self.PrivateKey.key_id,
-		}
 
+		If `claims` is specified, the token contains only the selected userinfo claims
+		in addition to the claims that identify the token and the session.
+		The token is signed with the main private key unless another `key` is specified.
+		"""
 		# TODO: ID token should always contain info about "what happened during authentication"
 		#   User info is optional and its parts should be included (or not) based on SCOPE
 		payload = await self.build_userinfo(session)
+		if claims is not None:
+			payload = {
+				claim: value
+				for claim, value in payload.items()
+				if claim in claims or claim in self.MandatoryIdTokenClaims
+			}
+
+		return self.sign_jwt(payload, key or self.PrivateKey)
 
-		token = jwcrypto.jwt.JWT(
-			header=header,
-			claims=self.JSONDumper(payload)
-		)
-		token.make_signed_token(self.PrivateKey)
-		id_token = token.serialize()
 
+	async def get_id_token(self, session, claims: typing.Optional[frozenset] = None):
+		"""
+		Return signed ID token for the session, optionally with a selected set of userinfo claims.
+		The token is signed with the introspection key and reused until the session changes
+		or until the token is about to expire.
+		"""
+		if self.IdTokenCacheSize <= 0:
+			return await self.build_id_token(session, claims, key=self.IntrospectionKey)
+
+		session_tokens = self.IdTokenCache.get(session.SessionId)
+		if session_tokens is not None:
+			self.IdTokenCache.move_to_end(session.SessionId)
+			entry = session_tokens.get(claims)
+			if entry is not None:
+				version, expires_at, id_token = entry
+				if version != session.Version:
+					# The session has changed, none of its tokens can be reused
+					session_tokens.clear()
+				elif time.time() < expires_at - self.IdTokenReuseMargin:
+					return id_token
+		else:
+			session_tokens = self.IdTokenCache[session.SessionId] = {}
+			while len(self.IdTokenCache) > self.IdTokenCacheSize:
+				self.IdTokenCache.popitem(last=False)
+
+		id_token = await self.build_id_token(session, claims, key=self.IntrospectionKey)
+		session_tokens[claims] = (session.Version, session.Session.Expiration.timestamp(), id_token)
 		return id_token
 
 
 	async def authorize_tenants_by_scope(self, scope, session, client_id):
-		has_access_to_all_tenants = self.RBACService.has_resource_access(
-			session.Authorization.Authz, tenant=None, requested_resources=["authz:superuser"]) \
-			or self.RBACService.has_resource_access(
-			session.Authorization.Authz, tenant=None, requested_resources=["authz:tenant:access"])
+		has_access_to_all_tenants = self.RBACService.can_access_all_tenants(session.Authorization.CompiledAuthz)
 		try:
 			tenants = await self.TenantService.get_tenants_by_scope(
 				scope, session.Credentials.Id, has_access_to_all_tenants)
@@ -587,3 +884,18 @@ class OpenIdConnectService(asab.Service):
 		if authorize_uri is None:
 			authorize_uri = "{}{}".format(self.PublicApiBaseUrl, self.AuthorizePath)
 		return add_params_to_url_query(authorize_uri, **query_params)
+
+
+def authz_digest(authz: dict) -> str:
+	"""
+	Compact fingerprint of session authorization (tenants and resources).
+	Resource servers can use it to tell whether the authorization has changed.
+	"""
+	canonical = json.dumps(
+		{tenant: sorted(resources) for tenant, resources in (authz or {}).items()},
+		sort_keys=True,
+		separators=(",", ":"),
+	)
+	return base64.urlsafe_b64encode(
+		hashlib.sha256(canonical.encode("utf-8")).digest()[:12]
+	).decode("ascii")
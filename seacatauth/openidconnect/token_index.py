@@ -0,0 +1,86 @@
+import collections
+import hashlib
+import logging
+import time
+import typing
+
+import asab
+
+#
+
+L = logging.getLogger(__name__)
+
+#
+
+
+class ActiveTokenIndex:
+	"""
+	In-process index of active access tokens for RFC 7662 token introspection.
+
+	Maps the token digest to a prebuilt introspection response, so that repeated introspections of the same token
+	need neither the database nor session deserialization. Entries are dropped when their session is updated
+	or terminated, and they never outlive the token expiration known at the time of indexing.
+	"""
+
+	def __init__(self, app):
+		self.MaxSize = asab.Config.getint("seacatauth:introspection", "token_index_size")
+		self.TTL = asab.Config.getseconds("seacatauth:introspection", "token_index_ttl")
+
+		# Token digest -> (valid until (monotonic), expiration (UNIX time), session ID, introspection response)
+		self.Tokens = collections.OrderedDict()
+		# Session ID -> set of token digests
+		self.SessionTokens = {}
+
+		app.PubSub.subscribe("Session.deleted!", self._on_session_changed)
+		app.PubSub.subscribe("Session.updated!", self._on_session_changed)
+
+
+	def __len__(self):
+		return len(self.Tokens)
+
+
+	@staticmethod
+	def digest(token_value: str) -> bytes:
+		return hashlib.sha256(token_value.encode("utf-8")).digest()
+
+
+	def get(self, digest: bytes) -> typing.Optional[dict]:
+		"""
+		Return the introspection response of an indexed active token or None.
+		"""
+		entry = self.Tokens.get(digest)
+		if entry is None:
+			return None
+		valid_until, expiration, _, response = entry
+		if time.monotonic() >= valid_until or time.time() >= expiration:
+			# The session may have been extended in the meantime, let the caller look it up again
+			self._drop(digest)
+			return None
+		self.Tokens.move_to_end(digest)
+		return response
+
+
+	def put(self, digest: bytes, session_id, response: dict):
+		if self.MaxSize <= 0 or self.TTL <= 0:
+			return
+		self._drop(digest)
+		self.Tokens[digest] = (time.monotonic() + self.TTL, response["exp"], session_id, response)
+		self.SessionTokens.setdefault(session_id, set()).add(digest)
+		while len(self.Tokens) > self.MaxSize:
+			self._drop(next(iter(self.Tokens)))
+
+
+	def _drop(self, digest: bytes):
+		entry = self.Tokens.pop(digest, None)
+		if entry is None:
+			return
+		digests = self.SessionTokens.get(entry[2])
+		if digests is not None:
+			digests.discard(digest)
+			if len(digests) == 0:
+				del self.SessionTokens[entry[2]]
+
+
+	def _on_session_changed(self, message_type, session_id, **kwargs):
+		for digest in list(self.SessionTokens.get(session_id, ())):
+			self._drop(digest)
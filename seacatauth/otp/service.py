@@ -10,6 +10,7 @@ import asab.storage
 from typing import Optional
 from ..exceptions import TOTPNotActiveError
 from ..events import EventTypes
+from ..session import SessionAdapter
 
 #
 
@@ -26,6 +27,7 @@ class OTPService(asab.Service):
 		super().__init__(app, service_name)
 		self.StorageService = app.get_service("asab.StorageService")
 		self.CredentialsService = app.get_service("seacatauth.CredentialsService")
+		self.SessionService = app.get_service("seacatauth.SessionService")
 		self.Issuer = asab.Config.get("seacatauth:otp", "issuer")
 		if len(self.Issuer) == 0:
 			auth_webui_base_url = asab.Config.get("general", "auth_webui_base_url")
@@ -58,6 +60,7 @@ class OTPService(asab.Service):
 		await provider.update(credential_id, {
 			"__totp": None
 		})
+		await self._update_session_totp_status(credential_id, False)
 
 
 	async def prepare_totp(self, session, credentials_id: str) -> dict:
@@ -106,10 +109,21 @@ class OTPService(asab.Service):
 		L.log(asab.LOG_NOTICE, "TOTP secret registered", struct_data={"cid": credentials_id})
 
 		await self._delete_prepared_totp_secret(session.SessionId)
+		await self._update_session_totp_status(credentials_id, True)
 
 		return {"result": "OK"}
 
 
+	async def _update_session_totp_status(self, credentials_id: str, totp_set: bool):
+		"""
+		Update the TOTP status snapshot in all the sessions of the credentials.
+		"""
+		await self.SessionService.update_sessions(
+			{SessionAdapter.FN.Credentials.Id: credentials_id},
+			[((SessionAdapter.FN.Authentication.TOTPSet, totp_set),)]
+		)
+
+
 	async def _create_totp_secret(self, session_id: str) -> str:
 		"""
 		Create TOTP secret and save it into `PreparedTOTPCollection`. Delete it if already exists.
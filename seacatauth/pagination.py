@@ -0,0 +1,103 @@
+import base64
+import logging
+import typing
+
+import asab.exceptions
+import bson
+import pymongo
+
+#
+
+L = logging.getLogger(__name__)
+
+#
+
+# Default sort order of listings: newest first, document ID as the tie-breaker
+CreatedAtSort = (("_c", pymongo.DESCENDING), ("_id", pymongo.DESCENDING))
+
+
+def encode_cursor(document: dict, sort: typing.Sequence = CreatedAtSort) -> str:
+	"""
+	Build an opaque pagination cursor pointing right after the given document.
+	The cursor contains the document's values of the sort keys.
+	"""
+	values = [document.get(field) for field, _ in sort]
+	return base64.urlsafe_b64encode(bson.encode({"k": values})).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: typing.Sequence = CreatedAtSort) -> list:
+	"""
+	Extract the sort key values from pagination cursor.
+	Raise ValidationError if the cursor is malformed.
+	"""
+	try:
+		raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+		values = bson.decode(raw, codec_options=bson.CodecOptions(tz_aware=True))["k"]
+	except Exception as e:
+		raise asab.exceptions.ValidationError("Invalid pagination cursor.") from e
+	if not isinstance(values, list) or len(values) != len(sort):
+		raise asab.exceptions.ValidationError("Invalid pagination cursor.")
+	return values
+
+
+def cursor_filter(cursor: str, sort: typing.Sequence = CreatedAtSort) -> dict:
+	"""
+	Build a MongoDB filter matching the documents that follow the cursor in the given sort order.
+
+	For sort keys (a DESC, b DESC) and cursor values (A, B), the filter is
+	`{"$or": [{"a": {"$lt": A}}, {"a": A, "b": {"$lt": B}}]}`
+
+	Documents that lack a sort key (e.g. `_c` in documents created before it was introduced) sort before
+	all the others, but comparison operators never match them. They are matched by an explicit null condition,
+	and when the cursor itself points at such a document, the following documents are ordered by the remaining keys.
+	"""
+	values = decode_cursor(cursor, sort)
+	conditions = []
+	for i, (field, direction) in enumerate(sort):
+		prefix = {
+			prev_field: prev_value
+			for (prev_field, _), prev_value in zip(sort[:i], values[:i])
+		}
+		value = values[i]
+		if direction == pymongo.DESCENDING:
+			if value is not None:
+				conditions.append({**prefix, field: {"$lt": value}})
+				if field != "_id":
+					# Missing and null values follow all the others
+					conditions.append({**prefix, field: None})
+		else:
+			if value is not None:
+				conditions.append({**prefix, field: {"$gt": value}})
+			elif field != "_id":
+				# Missing and null values precede all the others
+				conditions.append({**prefix, field: {"$ne": None}})
+	return {"$or": conditions}
+
+
+def apply_pagination(
+	query_filter: dict,
+	page: int = 0,
+	limit: int = None,
+	cursor: str = None,
+	sort: typing.Sequence = CreatedAtSort,
+):
+	"""
+	Return query filter and the number of documents to skip for either page-based
+	or cursor-based (keyset) pagination.
+
+	Cursor-based pagination costs the same regardless of page depth.
+	"""
+	if cursor is not None:
+		return {"$and": [query_filter, cursor_filter(cursor, sort)]}, 0
+	if limit is not None:
+		return query_filter, limit * page
+	return query_filter, 0
+
+
+def next_cursor(items: list, limit: int = None, sort: typing.Sequence = CreatedAtSort) -> typing.Optional[str]:
+	"""
+	Return the cursor of the next page or None if this is the last page.
+	"""
+	if limit is None or len(items) < limit or len(items) == 0:
+		return None
+	return encode_cursor(items[-1], sort)
@@ -8,6 +8,8 @@ from .builders import cookie_session_builder
 from .builders import login_descriptor_session_builder
 from .builders import available_factors_session_builder
 from .builders import external_login_session_builder
+from .builders import totp_session_builder
+from .builders import last_login_session_builder
 
 __all__ = [
 	"SessionService",
@@ -19,4 +21,6 @@ __all__ = [
 	"login_descriptor_session_builder",
 	"available_factors_session_builder",
 	"external_login_session_builder",
+	"totp_session_builder",
+	"last_login_session_builder",
 ]
@@ -4,6 +4,8 @@ import base64
 import datetime
 import typing
 
+from ..authz.rbac.compiled import CompiledAuthz
+
 #
 
 L = logging.getLogger(__name__)
@@ -13,6 +15,19 @@ L = logging.getLogger(__name__)
 
 @dataclasses.dataclass
 class SessionData:
+	__slots__ = (
+		"Id",
+		"CreatedAt",
+		"ModifiedAt",
+		"Version",
+		"ParentSessionId",
+		"Type",
+		"Expiration",
+		"MaxExpiration",
+		"ExpirationExtension",
+		"TrackId",
+	)
+
 	Id: str
 	CreatedAt: datetime.datetime
 	ModifiedAt: datetime.datetime
@@ -27,6 +42,8 @@ class SessionData:
 
 @dataclasses.dataclass
 class CredentialsData:
+	__slots__ = ("Id", "CreatedAt", "ModifiedAt", "Username", "Email", "Phone", "CustomData")
+
 	Id: str
 	CreatedAt: typing.Optional[datetime.datetime]
 	ModifiedAt: typing.Optional[datetime.datetime]
@@ -38,6 +55,17 @@ class CredentialsData:
 
 @dataclasses.dataclass
 class AuthenticationData:
+	__slots__ = (
+		"TOTPSet",
+		"ExternalLoginOptions",
+		"LoginDescriptor",
+		"AvailableFactors",
+		"LastLogin",
+		"IsAnonymous",
+		"ImpersonatorCredentialsId",
+		"ImpersonatorSessionId",
+	)
+
 	TOTPSet: str
 	ExternalLoginOptions: typing.Optional[list]
 	LoginDescriptor: typing.Optional[dict]
@@ -50,12 +78,28 @@ class AuthenticationData:
 
 @dataclasses.dataclass
 class AuthorizationData:
+	__slots__ = ("Authz", "Tenants", "_Compiled")
+
 	Authz: dict
 	Tenants: list
 
+	def __post_init__(self):
+		self._Compiled = None
+
+	@property
+	def CompiledAuthz(self) -> CompiledAuthz:
+		"""
+		Authz precompiled for access checks, built on first use
+		"""
+		if self._Compiled is None:
+			self._Compiled = CompiledAuthz(self.Authz)
+		return self._Compiled
+
 
 @dataclasses.dataclass
 class OAuth2Data:
+	__slots__ = ("AccessToken", "RefreshToken", "IDToken", "ClientId", "Scope", "PKCE")
+
 	AccessToken: typing.Optional[str]
 	RefreshToken: typing.Optional[str]
 	IDToken: typing.Optional[str]
@@ -66,13 +110,49 @@ class OAuth2Data:
 
 @dataclasses.dataclass
 class CookieData:
+	__slots__ = ("Id", "Domain")
+
 	Id: typing.Optional[str]
 	Domain: typing.Optional[str]
 
 
+# Marks a session section that has not been deserialized yet
+_NOT_LOADED = object()
+
+
+class _LazySection:
+	"""
+	Session attribute that is deserialized from its raw section on first access
+	"""
+
+	def __init__(self, prefix, deserializer):
+		self.Prefix = prefix
+		self.Deserializer = deserializer
+		self.Slot = None
+
+	def __set_name__(self, owner, name):
+		# Member descriptor of the instance slot that holds the deserialized value
+		self.Slot = owner.__dict__["_{}".format(name)]
+
+	def __get__(self, instance, owner=None):
+		if instance is None:
+			return self
+		value = self.Slot.__get__(instance)
+		if value is _NOT_LOADED:
+			value = instance._load_section(self.Prefix, self.Deserializer)
+			self.Slot.__set__(instance, value)
+		return value
+
+	def __set__(self, instance, value):
+		self.Slot.__set__(instance, value)
+
+
 class SessionAdapter:
 	"""
 	Light object that represent a momentary view on the persisted session
+
+	Session sections (credentials, authorization, OAuth2 etc.) are decrypted and deserialized
+	only when they are first accessed.
 	"""
 
 	class FN:
@@ -125,6 +205,7 @@ class SessionAdapter:
 			_prefix = "oa"
 			IdToken = "oa_it"
 			AccessToken = "oa_at"
+			AccessTokenDigest = "oa_atd"
 			RefreshToken = "oa_rt"
 			Scope = "oa_sc"
 			ClientId = "oa_cl"
@@ -133,6 +214,7 @@ class SessionAdapter:
 		class Cookie:
 			_prefix = "ck"
 			Id = "ck_sci"
+			IdDigest = "ck_scid"
 			Domain = "ck_d"
 
 	# Fields that are stored encrypted
@@ -146,27 +228,119 @@ class SessionAdapter:
 
 	EncryptedPrefix = b"$aescbc$"
 
-	def __init__(self, session_svc, session_dict):
-		self._decrypt_sensitive_fields(session_dict, session_svc)
+	# Lookup fields that are indexed by their keyed digest (field -> digest field)
+	LookupDigestFields = {
+		FN.OAuth2.AccessToken: FN.OAuth2.AccessTokenDigest,
+		FN.Cookie.Id: FN.Cookie.IdDigest,
+	}
 
-		self.Session = self._deserialize_session_data(session_dict)
-		self.Id = self.Session.Id
-		self.SessionId = self.Session.Id
-		self.Version = self.Session.Version
-		self.CreatedAt = self.Session.CreatedAt
-		self.ModifiedAt = self.Session.ModifiedAt
-		self.TrackId = self.Session.TrackId
+	# Field name prefixes of lazily deserialized sections
+	# BACK COMPAT: Legacy field names are mapped explicitly
+	SectionPrefixes = {
+		"_": "s",
+		"s": "s",
+		"c": "c",
+		"Cid": "c",
+		"an": "an",
+		"TS": "an",
+		"LD": "an",
+		"AF": "an",
+		"az": "az",
+		"Authz": "az",
+		"Tn": "az",
+		"oa": "oa",
+		"ck": "ck",
+		"SCI": "ck",
+	}
+	# Field name -> section, filled on the go
+	_FieldSections = {}
+	# Sections that contain encrypted fields
+	EncryptedSections = frozenset(["oa", "ck"])
 
-		self.Credentials = self._deserialize_credentials_data(session_dict)
-		self.Authentication = self._deserialize_authentication_data(session_dict)
-		self.Authorization = self._deserialize_authorization_data(session_dict)
-		self.Cookie = self._deserialize_cookie_data(session_dict)
-		self.OAuth2 = self._deserialize_oauth2_data(session_dict)
+	__slots__ = (
+		"_SessionService", "_Sections",
+		"_Session", "_Credentials", "_Authentication", "_Authorization", "_OAuth2", "_Cookie",
+	)
 
-		if len(session_dict) > 0:
-			self.Data = session_dict
-		else:
-			self.Data = None
+	def __init__(self, session_svc, session_dict):
+		self._SessionService = session_svc
+		self._Credentials = _NOT_LOADED
+		self._Authentication = _NOT_LOADED
+		self._Authorization = _NOT_LOADED
+		self._OAuth2 = _NOT_LOADED
+		self._Cookie = _NOT_LOADED
+
+		# Split the raw session dict into sections, which are decrypted and deserialized on first access
+		# Fields that belong to no section are dropped
+		sections = {}
+		field_sections = self._FieldSections
+		for key, value in session_dict.items():
+			try:
+				section = field_sections[key]
+			except KeyError:
+				section = self.SectionPrefixes.get(key) or self.SectionPrefixes.get(key.split("_", 1)[0] or "_")
+				field_sections[key] = section
+			if section is not None:
+				try:
+					sections[section][key] = value
+				except KeyError:
+					sections[section] = {key: value}
+		self._Sections = sections
+
+		# Session section is always needed, deserialize it right away to validate the object
+		self._Session = self._deserialize_session_data(self._Sections.pop("s", {}))
+
+
+	Session = _LazySection("s", "_deserialize_session_data")
+	Credentials = _LazySection("c", "_deserialize_credentials_data")
+	Authentication = _LazySection("an", "_deserialize_authentication_data")
+	Authorization = _LazySection("az", "_deserialize_authorization_data")
+	OAuth2 = _LazySection("oa", "_deserialize_oauth2_data")
+	Cookie = _LazySection("ck", "_deserialize_cookie_data")
+
+	@property
+	def Id(self):
+		return self.Session.Id
+
+	@property
+	def SessionId(self):
+		return self.Session.Id
+
+	@property
+	def Version(self):
+		return self.Session.Version
+
+	@property
+	def CreatedAt(self):
+		return self.Session.CreatedAt
+
+	@property
+	def ModifiedAt(self):
+		return self.Session.ModifiedAt
+
+	@property
+	def TrackId(self):
+		return self.Session.TrackId
+
+
+	def _load_section(self, prefix, deserializer):
+		section_dict = self._Sections.pop(prefix, {})
+		if prefix in self.EncryptedSections:
+			self._decrypt_sensitive_fields(section_dict, self._SessionService)
+		if len(self._Sections) == 0:
+			# Everything is deserialized, the service is no longer needed
+			self._SessionService = None
+		return getattr(self, deserializer)(section_dict)
+
+
+	def __copy__(self):
+		# Sections that are not deserialized yet stay lazy in both objects
+		# Loading a section consumes its raw dict, so each object gets its own shallow copy of the raw data
+		clone = self.__class__.__new__(self.__class__)
+		for slot in self.__slots__:
+			setattr(clone, slot, getattr(self, slot))
+		clone._Sections = {prefix: dict(section_dict) for prefix, section_dict in self._Sections.items()}
+		return clone
 
 
 	def __repr__(self):
@@ -183,60 +357,68 @@ class SessionAdapter:
 		))
 
 	def serialize(self):
+		# Access each section only once
+		session_data = self.Session
+		credentials = self.Credentials
+		authentication = self.Authentication
+		authorization = self.Authorization
+		cookie = self.Cookie
+		oauth2 = self.OAuth2
+
 		session_dict = {
-			self.FN.SessionId: self.Session.Id,
-			self.FN.CreatedAt: self.Session.CreatedAt,
-			self.FN.ModifiedAt: self.Session.ModifiedAt,
-			self.FN.Version: self.Session.Version,
-			self.FN.Session.Type: self.Session.Type,
-			self.FN.Session.ParentSessionId: self.Session.ParentSessionId,
-			self.FN.Session.Expiration: self.Session.Expiration,
-			self.FN.Session.MaxExpiration: self.Session.MaxExpiration,
-			self.FN.Session.ExpirationExtension: self.Session.ExpirationExtension,
-			self.FN.Session.TrackId: self.Session.TrackId,
+			self.FN.SessionId: session_data.Id,
+			self.FN.CreatedAt: session_data.CreatedAt,
+			self.FN.ModifiedAt: session_data.ModifiedAt,
+			self.FN.Version: session_data.Version,
+			self.FN.Session.Type: session_data.Type,
+			self.FN.Session.ParentSessionId: session_data.ParentSessionId,
+			self.FN.Session.Expiration: session_data.Expiration,
+			self.FN.Session.MaxExpiration: session_data.MaxExpiration,
+			self.FN.Session.ExpirationExtension: session_data.ExpirationExtension,
+			self.FN.Session.TrackId: session_data.TrackId,
 		}
 
-		if self.Credentials is not None:
+		if credentials is not None:
 			session_dict.update({
-				self.FN.Credentials.Id: self.Credentials.Id,
-				self.FN.Credentials.Email: self.Credentials.Email,
-				self.FN.Credentials.Phone: self.Credentials.Phone,
-				self.FN.Credentials.Username: self.Credentials.Username,
-				self.FN.Credentials.CustomData: self.Credentials.CustomData,
-				self.FN.Credentials.CreatedAt: self.Credentials.CreatedAt,
-				self.FN.Credentials.ModifiedAt: self.Credentials.ModifiedAt,
+				self.FN.Credentials.Id: credentials.Id,
+				self.FN.Credentials.Email: credentials.Email,
+				self.FN.Credentials.Phone: credentials.Phone,
+				self.FN.Credentials.Username: credentials.Username,
+				self.FN.Credentials.CustomData: credentials.CustomData,
+				self.FN.Credentials.CreatedAt: credentials.CreatedAt,
+				self.FN.Credentials.ModifiedAt: credentials.ModifiedAt,
 			})
 
-		if self.Authentication is not None:
+		if authentication is not None:
 			session_dict.update({
-				self.FN.Authentication.LastLogin: self.Authentication.LastLogin,
-				self.FN.Authentication.LoginDescriptor: self.Authentication.LoginDescriptor,
-				self.FN.Authentication.AvailableFactors: self.Authentication.AvailableFactors,
-				self.FN.Authentication.TOTPSet: self.Authentication.TOTPSet,
-				self.FN.Authentication.IsAnonymous: self.Authentication.IsAnonymous,
-				self.FN.Authentication.ImpersonatorCredentialsId: self.Authentication.ImpersonatorCredentialsId,
-				self.FN.Authentication.ImpersonatorSessionId: self.Authentication.ImpersonatorSessionId,
+				self.FN.Authentication.LastLogin: authentication.LastLogin,
+				self.FN.Authentication.LoginDescriptor: authentication.LoginDescriptor,
+				self.FN.Authentication.AvailableFactors: authentication.AvailableFactors,
+				self.FN.Authentication.TOTPSet: authentication.TOTPSet,
+				self.FN.Authentication.IsAnonymous: authentication.IsAnonymous,
+				self.FN.Authentication.ImpersonatorCredentialsId: authentication.ImpersonatorCredentialsId,
+				self.FN.Authentication.ImpersonatorSessionId: authentication.ImpersonatorSessionId,
 			})
 
-		if self.Authorization is not None:
+		if authorization is not None:
 			session_dict.update({
-				self.FN.Authorization.Authz: self.Authorization.Authz,
-				self.FN.Authorization.Tenants: self.Authorization.Tenants,
+				self.FN.Authorization.Authz: authorization.Authz,
+				self.FN.Authorization.Tenants: authorization.Tenants,
 			})
 
-		if self.Cookie is not None:
+		if cookie is not None:
 			session_dict.update({
-				self.FN.Cookie.Id: self.Cookie.Id,
+				self.FN.Cookie.Id: cookie.Id,
 			})
 
-		if self.OAuth2 is not None:
+		if oauth2 is not None:
 			session_dict.update({
-				self.FN.OAuth2.IdToken: self.OAuth2.IDToken,
-				self.FN.OAuth2.AccessToken: self.OAuth2.AccessToken,
-				self.FN.OAuth2.RefreshToken: self.OAuth2.RefreshToken,
-				self.FN.OAuth2.ClientId: self.OAuth2.ClientId,
-				self.FN.OAuth2.Scope: self.OAuth2.Scope,
-				self.FN.OAuth2.PKCE: self.OAuth2.PKCE,
+				self.FN.OAuth2.IdToken: oauth2.IDToken,
+				self.FN.OAuth2.AccessToken: oauth2.AccessToken,
+				self.FN.OAuth2.RefreshToken: oauth2.RefreshToken,
+				self.FN.OAuth2.ClientId: oauth2.ClientId,
+				self.FN.OAuth2.Scope: oauth2.Scope,
+				self.FN.OAuth2.PKCE: oauth2.PKCE,
 			})
 
 		# TODO: encrypt sensitive fields
@@ -332,6 +514,7 @@ class SessionAdapter:
 				# Probably old ID token, encoded differently
 				L.warning("Cannot deserialize ID token", struct_data={"id_token": id_token})
 
+		session_dict.pop(cls.FN.OAuth2.AccessTokenDigest, None)
 		access_token = session_dict.pop(cls.FN.OAuth2.AccessToken, None) or oa2_data.pop("Ta", None)
 		if access_token is not None:
 			# Base64-encode the tokens for OIDC service convenience
@@ -354,6 +537,7 @@ class SessionAdapter:
 
 	@classmethod
 	def _deserialize_cookie_data(cls, session_dict):
+		session_dict.pop(cls.FN.Cookie.IdDigest, None)
 		sci = session_dict.pop(cls.FN.Cookie.Id, None) or session_dict.pop("SCI", None)
 		if sci is None:
 			return None
@@ -0,0 +1,269 @@
+import asyncio
+import datetime
+import logging
+
+import asab
+import pymongo
+
+from .adapter import SessionAdapter
+from ..authz import build_credentials_authz
+from ..events import EventTypes
+
+#
+
+L = logging.getLogger(__name__)
+
+#
+
+
+class AuthzPropagator:
+	"""
+	Background job that applies changes of roles, role assignments and tenants to the authorization
+	of active sessions, so that permission changes take effect without the users logging in again.
+
+	Changes are collected from PubSub messages and coalesced until the next run.
+	Affected sessions are found through the credentials ID and tenant (`az_t`) indexes
+	and their `az_az` and `az_t` fields are rewritten with bulk updates in bounded batches.
+	A session that has been changed in the meantime is skipped and retried in the next run.
+
+	Only changes made by this instance are propagated, the other instances propagate their own.
+	Tenant deletion is not deferred: the tenant is removed from the sessions before the deletion completes,
+	so that the pending work cannot be lost and a re-created tenant of the same name inherits no grants.
+	"""
+
+	Projection = {
+		SessionAdapter.FN.Version: 1,
+		SessionAdapter.FN.Credentials.Id: 1,
+		SessionAdapter.FN.Authorization.Authz: 1,
+		SessionAdapter.FN.Authorization.Tenants: 1,
+	}
+
+	# How many times a deleted tenant is removed from sessions changed concurrently before they are terminated
+	TenantRemovalAttempts = 3
+
+	def __init__(self, app, session_service):
+		self.App = app
+		self.SessionService = session_service
+		self.BatchSize = asab.Config.getint("seacatauth:session", "authz_propagation_batch_size")
+		self.Lock = asyncio.Lock()
+
+		# Credentials whose authz has to be rebuilt
+		self.PendingCredentials = set()
+		# Roles whose bearers have to be found and their authz rebuilt
+		self.PendingRoles = set()
+		# (tenant, credentials ID) to be removed from sessions
+		self.PendingTenantRemovals = set()
+		# (tenant, credentials ID) to be added to the session tenant list
+		self.PendingTenantAdditions = set()
+
+		app.PubSub.subscribe("Role.assigned!", self._on_credentials_changed)
+		app.PubSub.subscribe("Role.unassigned!", self._on_credentials_changed)
+		app.PubSub.subscribe("ObjectRegistry.changed!", self._on_registry_changed)
+		app.PubSub.subscribe("Tenant.assigned!", self._on_tenant_assigned)
+		app.PubSub.subscribe("Tenant.unassigned!", self._on_tenant_unassigned)
+		app.PubSub.subscribe("Application.tick!", self._on_tick)
+
+
+	def is_pending(self) -> bool:
+		return (
+			len(self.PendingCredentials) > 0
+			or len(self.PendingRoles) > 0
+			or len(self.PendingTenantRemovals) > 0
+			or len(self.PendingTenantAdditions) > 0
+		)
+
+
+	def _on_credentials_changed(self, message_type, credentials_id, **kwargs):
+		self.PendingCredentials.add(credentials_id)
+
+
+	def _on_registry_changed(self, message_type, collection, obj_id=None, **kwargs):
+		# Full reloads are caused by other instances, which propagate their changes themselves
+		if collection == "r" and obj_id is not None:
+			self.PendingRoles.add(obj_id)
+
+
+	def _on_tenant_assigned(self, message_type, credentials_id, tenant, **kwargs):
+		self.PendingTenantAdditions.add((tenant, credentials_id))
+
+
+	def _on_tenant_unassigned(self, message_type, credentials_id, tenant, **kwargs):
+		self.PendingTenantRemovals.add((tenant, credentials_id))
+
+
+	async def _on_tick(self, message_type):
+		if not self.is_pending() or self.Lock.locked():
+			return
+		try:
+			await self.propagate()
+		except Exception as e:
+			L.exception("Session authorization propagation failed: {}".format(e))
+
+
+	async def propagate(self):
+		"""
+		Apply all pending changes to the affected sessions.
+		"""
+		async with self.Lock:
+			removals, self.PendingTenantRemovals = self.PendingTenantRemovals, set()
+			additions, self.PendingTenantAdditions = self.PendingTenantAdditions, set()
+			credentials, self.PendingCredentials = self.PendingCredentials, set()
+			roles, self.PendingRoles = self.PendingRoles, set()
+
+			updated = 0
+
+			# Removed tenants go first so that rebuilt authz does not bring them back
+			for tenant, credentials_id in removals:
+				n, conflict = await self._rewrite({
+					SessionAdapter.FN.Credentials.Id: credentials_id,
+					SessionAdapter.FN.Authorization.Tenants: tenant,
+				}, _remove_tenant(tenant))
+				updated += n
+				if conflict:
+					self.PendingTenantRemovals.add((tenant, credentials_id))
+
+			for tenant, credentials_id in additions:
+				n, conflict = await self._rewrite({
+					SessionAdapter.FN.Credentials.Id: credentials_id,
+					SessionAdapter.FN.Authorization.Tenants: {"$ne": tenant},
+				}, _add_tenant(tenant))
+				updated += n
+				if conflict:
+					self.PendingTenantAdditions.add((tenant, credentials_id))
+
+			role_service = self.App.get_service("seacatauth.RoleService")
+			for role_id in roles:
+				assignments = await role_service.list_role_assignments(role_id)
+				credentials.update(assignment["c"] for assignment in assignments["data"])
+
+			credentials = list(credentials)
+			for i in range(0, len(credentials), self.BatchSize):
+				chunk = credentials[i:i + self.BatchSize]
+				n, conflict = await self._rewrite(
+					{SessionAdapter.FN.Credentials.Id: {"$in": chunk}},
+					self._rebuild_authz()
+				)
+				updated += n
+				if conflict:
+					self.PendingCredentials.update(chunk)
+
+			L.log(asab.LOG_NOTICE, "Session authorization propagated", struct_data={
+				"tenants_removed": len(removals),
+				"tenants_added": len(additions),
+				"roles": len(roles),
+				"credentials": len(credentials),
+				"updated": updated,
+			})
+
+
+	async def remove_tenant(self, tenant: str):
+		"""
+		Remove a deleted tenant from all sessions immediately.
+		Sessions that keep changing concurrently are terminated instead.
+		"""
+		query_filter = {SessionAdapter.FN.Authorization.Tenants: tenant}
+		async with self.Lock:
+			updated = 0
+			for _ in range(self.TenantRemovalAttempts):
+				n, conflict = await self._rewrite(query_filter, _remove_tenant(tenant))
+				updated += n
+				if not conflict:
+					break
+			else:
+				L.warning("Terminating sessions that cannot be updated", struct_data={"tenant": tenant})
+				await self.SessionService.delete_sessions_by_tenant_in_scope(tenant)
+		L.log(asab.LOG_NOTICE, "Deleted tenant removed from sessions", struct_data={
+			"tenant": tenant,
+			"updated": updated,
+		})
+
+
+	def _rebuild_authz(self):
+		tenant_service = self.App.get_service("seacatauth.TenantService")
+		role_service = self.App.get_service("seacatauth.RoleService")
+		# (credentials ID, tenants) -> authz
+		built = {}
+
+		async def rebuild(authz, tenants, credentials_id):
+			authz_tenants = tuple(sorted(tenant for tenant in authz if tenant != "*"))
+			new_authz = built.get((credentials_id, authz_tenants))
+			if new_authz is None:
+				new_authz = await build_credentials_authz(
+					tenant_service, role_service, credentials_id, list(authz_tenants))
+				built[(credentials_id, authz_tenants)] = new_authz
+			# Keep the tenants that the authz builder does not handle (e.g. when tenants are disabled)
+			new_authz = {**authz, **new_authz}
+			return new_authz, tenants
+
+		return rebuild
+
+
+	async def _rewrite(self, query_filter: dict, transform) -> tuple:
+		"""
+		Apply the transformation to the authz and tenants of all matching sessions in bounded bulk batches.
+		A session is updated only if it has not been changed since it was read.
+
+		Return the number of updated sessions and whether some sessions were changed in the meantime.
+		"""
+		collection = self.SessionService.StorageService.Database[self.SessionService.SessionCollection]
+		query_filter = {**query_filter, SessionAdapter.FN.Authorization.Authz: {"$exists": True}}
+		updated = 0
+		conflict = False
+		batch = []
+
+		async def flush():
+			nonlocal updated, conflict
+			result = await collection.bulk_write([request for _, _, _, request in batch], ordered=False)
+			updated += result.modified_count
+			if result.modified_count < len(batch):
+				conflict = True
+			for session_id, version, to_set, _ in batch:
+				self.SessionService.Cache.invalidate(session_id)
+				self.SessionService._publish_session_updated(session_id)
+				await self.SessionService.send_session_webhook(EventTypes.SESSION_UPDATED, session_id, version, to_set)
+			batch.clear()
+
+		async for session_dict in collection.find(query_filter, projection=self.Projection):
+			authz = session_dict[SessionAdapter.FN.Authorization.Authz]
+			tenants = session_dict.get(SessionAdapter.FN.Authorization.Tenants) or []
+			new_authz, new_tenants = await transform(authz, tenants, session_dict.get(SessionAdapter.FN.Credentials.Id))
+			if _same_authz(authz, new_authz) and new_tenants == tenants:
+				continue
+			session_id = session_dict[SessionAdapter.FN.SessionId]
+			version = session_dict[SessionAdapter.FN.Version]
+			to_set = {
+				SessionAdapter.FN.Authorization.Authz: new_authz,
+				SessionAdapter.FN.Authorization.Tenants: new_tenants,
+				SessionAdapter.FN.ModifiedAt: datetime.datetime.now(datetime.timezone.utc),
+			}
+			batch.append((session_id, version, to_set, pymongo.UpdateOne(
+				{SessionAdapter.FN.SessionId: session_id, SessionAdapter.FN.Version: version},
+				{"$set": to_set, "$inc": {SessionAdapter.FN.Version: 1}}
+			)))
+			if len(batch) >= self.BatchSize:
+				await flush()
+
+		if len(batch) > 0:
+			await flush()
+		return updated, conflict
+
+
+def _remove_tenant(tenant):
+	async def transform(authz, tenants, credentials_id):
+		new_authz = {t: resources for t, resources in authz.items() if t != tenant}
+		return new_authz, [t for t in tenants if t != tenant]
+	return transform
+
+
+def _add_tenant(tenant):
+	async def transform(authz, tenants, credentials_id):
+		if tenant in tenants:
+			return authz, tenants
+		return authz, [*tenants, tenant]
+	return transform
+
+
+def _same_authz(authz: dict, new_authz: dict) -> bool:
+	if authz.keys() != new_authz.keys():
+		return False
+	return all(set(resources) == set(new_authz[tenant]) for tenant, resources in authz.items())
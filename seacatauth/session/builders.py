@@ -1,3 +1,4 @@
+import datetime
 import logging
 import secrets
 
@@ -36,6 +37,30 @@ async def credentials_session_builder(credentials_service, credentials_id, scope
 	return data
 
 
+async def totp_session_builder(otp_service, credentials_id):
+	totp_set = await otp_service.has_activated_totp(credentials_id)
+	return ((SessionAdapter.FN.Authentication.TOTPSet, totp_set),)
+
+
+async def last_login_session_builder(audit_service, credentials_id, is_login=False, from_info=None):
+	"""
+	Snapshot the times of the last successful and the last failed login.
+	If `is_login` is set, the session is being created by a successful login that has not been audited yet.
+	"""
+	try:
+		last_login = await audit_service.get_last_logins(credentials_id)
+	except Exception as e:
+		L.warning("Could not fetch last logins: {}".format(e))
+		last_login = {}
+	if is_login:
+		last_login["sat"] = datetime.datetime.now(datetime.timezone.utc)
+		if from_info is not None:
+			last_login["sfi"] = from_info
+		else:
+			last_login.pop("sfi", None)
+	return ((SessionAdapter.FN.Authentication.LastLogin, last_login),)
+
+
 async def external_login_session_builder(external_login_service, credentials_id):
 	external_logins = {}
 	for result in await external_login_service.list(credentials_id):
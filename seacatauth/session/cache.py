@@ -0,0 +1,113 @@
+import collections
+import datetime
+import logging
+import time
+import typing
+
+#
+
+L = logging.getLogger(__name__)
+
+#
+
+
+class SessionCache:
+	"""
+	Bounded in-process cache of session objects with LRU eviction and time-to-live.
+
+	Sessions are stored under their session ID and can be additionally indexed by arbitrary lookup keys,
+	such as (field name, access token) or (field name, cookie ID).
+	No entry outlives the expiration of the cached session.
+	"""
+
+	def __init__(self, max_size: int, ttl: float):
+		self.MaxSize = max_size
+		self.TTL = ttl
+		# Session ID -> (valid until, session object, set of lookup keys)
+		self.Sessions = collections.OrderedDict()
+		# Lookup key -> Session ID
+		self.Keys = {}
+
+
+	def __len__(self):
+		return len(self.Sessions)
+
+
+	def is_enabled(self) -> bool:
+		return self.MaxSize > 0 and self.TTL > 0
+
+
+	def get(self, session_id) -> typing.Optional[object]:
+		"""
+		Return cached session object or None if it is not cached or if the entry is stale.
+		"""
+		entry = self.Sessions.get(session_id)
+		if entry is None:
+			return None
+		valid_until, session, _ = entry
+		if time.monotonic() >= valid_until:
+			self.invalidate(session_id)
+			return None
+		self.Sessions.move_to_end(session_id)
+		return session
+
+
+	def get_by_key(self, key) -> typing.Optional[object]:
+		session_id = self.Keys.get(key)
+		if session_id is None:
+			return None
+		return self.get(session_id)
+
+
+	def put(self, session, *keys):
+		"""
+		Store session object under its session ID and, optionally, under additional lookup keys.
+		"""
+		if not self.is_enabled():
+			return
+
+		ttl = self.TTL
+		if session.Session.Expiration is not None:
+			ttl = min(
+				ttl,
+				(session.Session.Expiration - datetime.datetime.now(datetime.timezone.utc)).total_seconds()
+			)
+		if ttl <= 0:
+			return
+
+		session_id = session.SessionId
+		entry = self.Sessions.pop(session_id, None)
+		lookup_keys = set(keys)
+		if entry is not None:
+			# Keep the lookup keys from previous entry
+			lookup_keys.update(entry[2])
+
+		self.Sessions[session_id] = (time.monotonic() + ttl, session, lookup_keys)
+		for key in lookup_keys:
+			self.Keys[key] = session_id
+
+		while len(self.Sessions) > self.MaxSize:
+			evicted_id, (_, _, evicted_keys) = self.Sessions.popitem(last=False)
+			self._drop_keys(evicted_id, evicted_keys)
+
+
+	def invalidate(self, session_id):
+		"""
+		Remove session and all its lookup keys from the cache.
+		"""
+		entry = self.Sessions.pop(session_id, None)
+		if entry is None:
+			return
+		self._drop_keys(session_id, entry[2])
+
+
+	def clear(self):
+		self.Sessions.clear()
+		self.Keys.clear()
+
+
+	def _drop_keys(self, session_id, keys):
+		for key in keys:
+			# The key may have been reassigned to another session in the meantime
+			if self.Keys.get(key) == session_id:
+				del self.Keys[key]
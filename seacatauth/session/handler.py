@@ -57,10 +57,18 @@ class SessionHandler(object):
 			description: Items per page
 			schema:
 				type: integer
+		-	name: c
+			in: query
+			description:
+				Pagination cursor returned in the previous page's response.
+				If present, the page number is ignored.
+			schema:
+				type: string
 		"""
 		page = int(request.query.get("p", 1)) - 1
 		limit = int(request.query.get("i", 10))
-		data = await self.SessionService.recursive_list(page, limit)
+		cursor = request.query.get("c")
+		data = await self.SessionService.recursive_list(page, limit, cursor=cursor)
 		return asab.web.rest.json_response(request, data)
 
 
@@ -121,13 +129,21 @@ class SessionHandler(object):
 			description: Items per page
 			schema:
 				type: integer
+		-	name: c
+			in: query
+			description:
+				Pagination cursor returned in the previous page's response.
+				If present, the page number is ignored.
+			schema:
+				type: string
 		"""
 		credentials_id = request.match_info.get("credentials_id")
 		page = int(request.query.get("p", 1)) - 1
 		limit = int(request.query.get("i", 10))
+		cursor = request.query.get("c")
 		sessions = await self.SessionService.list(page, limit, query_filter={
 			SessionAdapter.FN.Credentials.Id: credentials_id
-		})
+		}, cursor=cursor)
 		return asab.web.rest.json_response(request, sessions)
 
 
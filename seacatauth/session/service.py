@@ -1,11 +1,18 @@
+import asyncio
+import collections
+import copy
+import dataclasses
 import datetime
 import logging
+import math
 import secrets
+import time
 import uuid
 
 import bson
 
 import hashlib
+import hmac
 import cryptography.hazmat.primitives.ciphers
 import cryptography.hazmat.primitives.ciphers.algorithms
 import cryptography.hazmat.primitives.ciphers.modes
@@ -16,6 +23,9 @@ import asab.storage
 import pymongo
 
 from .adapter import SessionAdapter, rest_get
+from .cache import SessionCache
+from .authz_propagation import AuthzPropagator
+from ..pagination import CreatedAtSort, apply_pagination, next_cursor
 
 from ..events import EventTypes
 
@@ -29,6 +39,16 @@ L = logging.getLogger(__name__)
 class SessionService(asab.Service):
 
 	SessionCollection = "s"
+	SessionTypes = frozenset(["root", "openidconnect", "m2m", "cookie"])
+	# Session fields needed for bulk deletion, session counting and token revocation
+	SubtreeProjection = {
+		SessionAdapter.FN.SessionId: 1,
+		SessionAdapter.FN.Session.Type: 1,
+		SessionAdapter.FN.Session.MaxExpiration: 1,
+		SessionAdapter.FN.OAuth2.ClientId: 1,
+	}
+	# How many times update_sessions() retries sessions changed concurrently
+	UpdateSessionsAttempts = 3
 
 	def __init__(self, app, service_name='seacatauth.SessionService'):
 		super().__init__(app, service_name)
@@ -49,6 +69,10 @@ class SessionService(asab.Service):
 		self.StorageService.AESKey = self.AESKey
 		# Block size is used for determining the size of CBC initialization vector
 		self.AESBlockSize = cryptography.hazmat.primitives.ciphers.algorithms.AES.block_size // 8
+		# Access tokens and cookie IDs are looked up by their keyed digest instead of the encrypted value
+		self.LookupKey = hmac.new(self.AESKey, b"seacatauth:session:lookup", hashlib.sha256).digest()
+		# Until all existing sessions have their lookup digests, fall back to lookup by encrypted value
+		self.LookupDigestMigrated = False
 
 		self.Expiration = datetime.timedelta(
 			seconds=asab.Config.getseconds("seacatauth:session", "expiration")
@@ -73,14 +97,62 @@ class SessionService(asab.Service):
 
 		self.MinimalRefreshInterval = datetime.timedelta(seconds=60)
 
+		# Session extensions are buffered and written in bulk (session ID -> new expiration)
+		self.TouchBuffer = {}
+		self.TouchFlushInterval = asab.Config.getseconds("seacatauth:session", "touch_flush_interval")
+		self.TouchBufferFlushedAt = time.monotonic()
+
+		# Expired sessions are deleted in batches, only one sweep may run at a time
+		self.SweepBatchSize = asab.Config.getint("seacatauth:session", "sweep_batch_size")
+		self.SweepLock = asyncio.Lock()
+
+		# In-process cache for session lookups by ID, access token and cookie ID
+		self.Cache = SessionCache(
+			max_size=asab.Config.getint("seacatauth:session", "cache_size"),
+			ttl=asab.Config.getseconds("seacatauth:session", "cache_ttl"),
+		)
+
+		# Role, role assignment and tenant changes are applied to active sessions in the background
+		self.AuthzPropagator = AuthzPropagator(app, self)
+
 		app.PubSub.subscribe("Application.tick/60!", self._on_tick)
 		app.PubSub.subscribe("Application.run!", self._on_start)
+		app.PubSub.subscribe("Application.tick!", self._on_tick_flush)
 
 		# Metrics
 		self.MetricsService = app.get_service('asab.MetricsService')
 		self.TaskService = app.get_service('asab.TaskService')
 		self.SessionGauge = self.MetricsService.create_gauge("sessions", tags={"help": "Counts active sessions."}, init_values={"sessions": 0})
+		self.SessionTypeGauge = self.MetricsService.create_gauge(
+			"sessions_by_type",
+			tags={"help": "Counts active sessions per session type."},
+			init_values={session_type: 0 for session_type in self.SessionTypes}
+		)
+		self.SessionClientGauge = self.MetricsService.create_gauge(
+			"sessions_by_client",
+			tags={"help": "Counts active client sessions per client ID."},
+			init_values={}
+		)
+		# Session counts are maintained on session creation and deletion by this instance
+		# and recounted when they drift too far from the database estimate
+		# (session type, client ID) -> number of sessions
+		self.SessionCounts = collections.Counter()
+		self.RecountDrift = asab.Config.getfloat("seacatauth:session", "session_count_drift")
+		self.RecountInterval = asab.Config.getseconds("seacatauth:session", "session_recount_interval")
+		self.RecountedAt = -math.inf
+		self.CountedClientIds = set()
+		self.CacheCounter = self.MetricsService.create_counter(
+			"session_cache",
+			tags={"help": "Counts session cache hits and misses."},
+			init_values={"hit": 0, "miss": 0}
+		)
+		self.SweepGauge = self.MetricsService.create_gauge(
+			"session_sweep",
+			tags={"help": "Number of sessions deleted and duration in seconds of the last expired session sweep."},
+			init_values={"deleted": 0, "duration": 0.0}
+		)
 		app.PubSub.subscribe("Application.tick/10!", self._on_tick_metric)
+		app.PubSub.subscribe("Application.tick/60!", self._on_tick_reconcile)
 
 
 	async def initialize(self, app):
@@ -112,39 +184,226 @@ class SessionService(asab.Service):
 		except Exception as e:
 			L.error("Failed to create compound index (cookie ID, client ID): {}".format(e))
 
+		# Access token digest and cookie ID digest
+		for field, digest_field in SessionAdapter.LookupDigestFields.items():
+			try:
+				await collection.create_index(
+					[(digest_field, pymongo.ASCENDING)],
+					unique=True,
+					partialFilterExpression={digest_field: {"$exists": True}}
+				)
+			except Exception as e:
+				L.error("Failed to create index ({} digest): {}".format(field, e))
+
+		# Expiration (for expired session sweep)
+		try:
+			await collection.create_index([(SessionAdapter.FN.Session.Expiration, pymongo.ASCENDING)])
+		except Exception as e:
+			L.error("Failed to create index (expiration): {}".format(e))
+
+		# Parent session ID (for child session lookup)
+		try:
+			await collection.create_index(
+				[(SessionAdapter.FN.Session.ParentSessionId, pymongo.ASCENDING)],
+				partialFilterExpression={
+					SessionAdapter.FN.Session.ParentSessionId: {"$exists": True}}
+			)
+		except Exception as e:
+			L.error("Failed to create index (parent session ID): {}".format(e))
+
+		# Creation time (for cursor-based pagination)
+		try:
+			await collection.create_index(list(CreatedAtSort))
+		except Exception as e:
+			L.error("Failed to create index (creation time): {}".format(e))
+
+		# Credentials ID and tenants (for authz propagation)
+		try:
+			await collection.create_index([(SessionAdapter.FN.Credentials.Id, pymongo.ASCENDING)])
+		except Exception as e:
+			L.error("Failed to create index (credentials ID): {}".format(e))
+		try:
+			await collection.create_index([(SessionAdapter.FN.Authorization.Tenants, pymongo.ASCENDING)])
+		except Exception as e:
+			L.error("Failed to create index (tenants): {}".format(e))
+
+
+	async def finalize(self, app):
+		# Do not lose buffered session extensions
+		await self.flush_touch_buffer()
+
 
 	async def _on_start(self, event_name):
+		self.TaskService.schedule(self.migrate_lookup_digests())
 		await self.delete_expired_sessions()
+		await self.recount_sessions()
 
 
 	async def _on_tick(self, event_name):
 		await self.delete_expired_sessions()
 
 	def _on_tick_metric(self, event_name):
-		self.TaskService.schedule(self._metrics_task())
+		total = 0
+		by_type = collections.Counter({session_type: 0 for session_type in self.SessionTypes})
+		# Clients that have been published before must drop to zero when their last session is deleted
+		by_client = collections.Counter({client_id: 0 for client_id in self.CountedClientIds})
+		for (session_type, client_id), count in self.SessionCounts.items():
+			total += count
+			if session_type in self.SessionTypes:
+				by_type[session_type] += count
+			if client_id is not None:
+				by_client[client_id] += count
+
+		self.SessionGauge.set("sessions", total)
+		for session_type, count in by_type.items():
+			self.SessionTypeGauge.set(session_type, count)
+		for client_id, count in by_client.items():
+			self.SessionClientGauge.set(client_id, count)
+		self.CountedClientIds.update(by_client)
+
+	def _on_tick_reconcile(self, event_name):
+		self.TaskService.schedule(self._reconcile_task())
+
+	async def _reconcile_task(self):
+		"""
+		Compare the maintained session count with the database estimate and recount
+		if it has drifted too far, e.g. because sessions have been created or deleted by another instance.
+		Recounting scans the whole collection, so it runs at most once per recount interval.
+		"""
+		if time.monotonic() - self.RecountedAt < self.RecountInterval:
+			return
+		collection = self.StorageService.Database[self.SessionCollection]
+		estimated = await collection.estimated_document_count()
+		drift = abs(estimated - sum(self.SessionCounts.values()))
+		if drift > self.RecountDrift * estimated:
+			await self.recount_sessions()
 
-	async def _metrics_task(self):
-		session_count = await self.count_sessions()
-		self.SessionGauge.set("sessions", session_count)
+
+	async def recount_sessions(self):
+		"""
+		Recount sessions per session type and client ID in a single aggregation.
+		"""
+		collection = self.StorageService.Database[self.SessionCollection]
+		counts = collections.Counter()
+		async for group in collection.aggregate([
+			{"$group": {
+				"_id": {
+					"t": "${}".format(SessionAdapter.FN.Session.Type),
+					"cl": "${}".format(SessionAdapter.FN.OAuth2.ClientId),
+				},
+				"n": {"$sum": 1},
+			}}
+		]):
+			counts[(group["_id"].get("t"), group["_id"].get("cl"))] = group["n"]
+		self.SessionCounts = counts
+		self.RecountedAt = time.monotonic()
+
+
+	def _count_session(self, session_dict: dict, delta: int):
+		key = (
+			session_dict.get(SessionAdapter.FN.Session.Type),
+			session_dict.get(SessionAdapter.FN.OAuth2.ClientId),
+		)
+		self.SessionCounts[key] += delta
+		if self.SessionCounts[key] <= 0:
+			del self.SessionCounts[key]
 
 
 	async def delete_expired_sessions(self):
-		expired = []
-		async for session in self._iterate_raw(
-			query_filter={SessionAdapter.FN.Session.Expiration: {"$lt": datetime.datetime.now(datetime.timezone.utc)}}
-		):
-			try:
-				if datetime.datetime.now(datetime.timezone.utc) > (
-					session.get(SessionAdapter.FN.Session.Expiration) or session["exp"]  # BACK-COMPAT, delete Dec 2022
-				):
-					expired.append(session["_id"])
-			except KeyError:
-				L.warning("Session is missing expiration. Deleting.", struct_data={"sid": session["_id"]})
-				expired.append(session["_id"])
+		"""
+		Delete expired sessions together with all their descendants in bulk.
+		If another sweep is already running, do nothing.
+		"""
+		if self.SweepLock.locked():
+			L.info("Expired session sweep is already in progress.")
+			return
+
+		async with self.SweepLock:
+			start = time.monotonic()
+			deleted = await self._sweep_expired_sessions()
+			duration = time.monotonic() - start
+
+		self.SweepGauge.set("deleted", deleted)
+		self.SweepGauge.set("duration", duration)
+		if deleted > 0:
+			L.log(asab.LOG_NOTICE, "Expired sessions deleted", struct_data={
+				"count": deleted, "duration": round(duration, 3)})
+
 
-		for sid in expired:
-			# Use the delete method for proper session termination
-			await self.delete(session_id=sid)
+	async def _sweep_expired_sessions(self) -> int:
+		# Buffered extensions must reach the database first, or sessions in active use could be swept
+		await self.flush_touch_buffer()
+
+		collection = self.StorageService.Database[self.SessionCollection]
+		now = datetime.datetime.now(datetime.timezone.utc)
+		deleted = 0
+		recount = False
+		while True:
+			query_filter = {SessionAdapter.FN.Session.Expiration: {"$lt": now}}
+			if len(self.TouchBuffer) > 0:
+				# Sessions extended since the flush (or whose flush failed)
+				query_filter[SessionAdapter.FN.SessionId] = {"$nin": list(self.TouchBuffer)}
+
+			# Fetch a batch of expired sessions
+			expired = []
+			async for session_dict in collection.find(
+				query_filter, projection=self.SubtreeProjection, limit=self.SweepBatchSize
+			):
+				expired.append(session_dict)
+			if len(expired) == 0:
+				break
+
+			# Delete the expired sessions together with their descendants
+			batch_deleted = 0
+			async for session_dicts in self._iterate_session_subtrees(expired):
+				result = await collection.delete_many({"_id": {"$in": [s["_id"] for s in session_dicts]}})
+				if result.deleted_count == len(session_dicts):
+					for session_dict in session_dicts:
+						self.Cache.invalidate(session_dict["_id"])
+						self._count_session(session_dict, -1)
+						self._publish_session_deleted(session_dict)
+				else:
+					# Some of the sessions have been deleted concurrently and their deletion has been published
+					# by whoever deleted them; which of them is unknown, so recount rather than adjust the counts
+					recount = True
+					for session_dict in session_dicts:
+						self.Cache.invalidate(session_dict["_id"])
+				batch_deleted += result.deleted_count
+
+			deleted += batch_deleted
+			L.info("Expired session sweep in progress", struct_data={"deleted": deleted})
+			if batch_deleted == 0:
+				# Nothing could be deleted, do not loop forever
+				L.warning("Failed to delete expired sessions.", struct_data={"count": len(expired)})
+				break
+
+		if recount:
+			await self.recount_sessions()
+		return deleted
+
+
+	async def _iterate_session_subtrees(self, sessions: list):
+		"""
+		Yield bounded batches of sessions from the bottom of the session tree up:
+		all the descendants first, the requested sessions last.
+		The session dicts contain only the fields in SubtreeProjection.
+		"""
+		collection = self.StorageService.Database[self.SessionCollection]
+		levels = [sessions]
+		while True:
+			children = []
+			async for session_dict in collection.find(
+				{SessionAdapter.FN.Session.ParentSessionId: {"$in": [s["_id"] for s in levels[-1]]}},
+				projection=self.SubtreeProjection
+			):
+				children.append(session_dict)
+			if len(children) == 0:
+				break
+			levels.append(children)
+
+		for level in reversed(levels):
+			for i in range(0, len(level), self.SweepBatchSize):
+				yield level[i:i + self.SweepBatchSize]
 
 
 	async def create_session(
@@ -157,7 +416,7 @@ class SessionService(asab.Service):
 		upsertor = self.StorageService.upsertor(self.SessionCollection)
 
 		# Set up required fields
-		if session_type not in frozenset(["root", "openidconnect", "m2m", "cookie"]):
+		if session_type not in self.SessionTypes:
 			L.error("Unsupported session type", struct_data={"type": session_type})
 			return None
 		upsertor.set(SessionAdapter.FN.Session.Type, session_type)
@@ -186,13 +445,22 @@ class SessionService(asab.Service):
 		# Add builder fields
 		if session_builders is None:
 			session_builders = list()
+		client_id = None
 		for session_builder in session_builders:
 			for key, value in session_builder:
+				if key in SessionAdapter.LookupDigestFields and value is not None:
+					upsertor.set(SessionAdapter.LookupDigestFields[key], self.lookup_digest(value))
 				if key in SessionAdapter.SensitiveFields and value is not None:
 					value = SessionAdapter.EncryptedPrefix + self.aes_encrypt(value)
+				elif key == SessionAdapter.FN.OAuth2.ClientId:
+					client_id = value
 				upsertor.set(key, value)
 
 		session_id = await upsertor.execute(event_type=EventTypes.SESSION_CREATED)
+		self._count_session({
+			SessionAdapter.FN.Session.Type: session_type,
+			SessionAdapter.FN.OAuth2.ClientId: client_id,
+		}, 1)
 
 		struct_data = {
 			"sid": session_id,
@@ -201,40 +469,142 @@ class SessionService(asab.Service):
 		if parent_session_id is not None:
 			struct_data["parent_sid"] = parent_session_id
 		L.log(asab.LOG_NOTICE, "Session created", struct_data=struct_data)
-		return await self.get(session_id)
 
+		# Build the session object from the written fields instead of reading it back
+		session_dict = dict(upsertor.ModSet)
+		session_dict[SessionAdapter.FN.SessionId] = session_id
+		session_dict[SessionAdapter.FN.Version] = 1
+		session = SessionAdapter(self, session_dict)
+		self.Cache.put(session)
+		return session
+
+
+	async def update_session(self, session_id: str, session_builders: list, version: int = None):
+		"""
+		Apply session builders to the session in a single database round trip.
+		If version is specified, the update succeeds only if the stored session still has that version,
+		callers that have read the session should pass the version they have read.
 
-	async def update_session(self, session_id: str, session_builders: list):
+		Return the updated session object.
+		"""
 		if isinstance(session_id, str):
 			session_id = bson.ObjectId(session_id)
-		session_dict = await self.StorageService.get(self.SessionCollection, session_id)
 
-		upsertor = self.StorageService.upsertor(
-			self.SessionCollection,
-			obj_id=session_id,
-			version=session_dict['_v'],
+		to_set = {}
+		for session_builder in session_builders:
+			for key, value in session_builder:
+				to_set[key] = value
+		to_set[SessionAdapter.FN.ModifiedAt] = datetime.datetime.now(datetime.timezone.utc)
+
+		query_filter = {SessionAdapter.FN.SessionId: session_id}
+		if version is not None:
+			query_filter[SessionAdapter.FN.Version] = version
+
+		collection = self.StorageService.Database[self.SessionCollection]
+		session_dict = await collection.find_one_and_update(
+			query_filter,
+			{"$set": to_set, "$inc": {SessionAdapter.FN.Version: 1}},
+			return_document=pymongo.ReturnDocument.AFTER,
 		)
+		self.Cache.invalidate(session_id)
+		if session_dict is None:
+			# Session does not exist or has been changed in the meantime
+			raise KeyError("NOT-FOUND")
+		self._publish_session_updated(session_id)
+		await self.send_session_webhook(
+			EventTypes.SESSION_UPDATED, session_id, session_dict[SessionAdapter.FN.Version] - 1, to_set)
+
+		session = SessionAdapter(self, session_dict)
+		self.Cache.put(session)
+		return session
 
+
+	async def update_sessions(self, query_filter: dict, session_builders: list) -> int:
+		"""
+		Apply session builders to all the sessions that match the filter.
+		Every session is updated only if it has not changed since it was read,
+		sessions changed in the meantime are read and updated again.
+
+		Return the number of updated sessions.
+		"""
+		to_set = {}
 		for session_builder in session_builders:
 			for key, value in session_builder:
-				upsertor.set(key, value)
+				to_set[key] = value
 
-		await upsertor.execute(event_type=EventTypes.SESSION_UPDATED)
+		# Skip the sessions that already have the values, including those updated by a previous attempt
+		query_filter = {"$and": [
+			query_filter,
+			{"$or": [{key: {"$ne": value}} for key, value in to_set.items()]},
+		]}
+		to_set[SessionAdapter.FN.ModifiedAt] = datetime.datetime.now(datetime.timezone.utc)
 
-		return await self.get(session_id)
+		collection = self.StorageService.Database[self.SessionCollection]
+		updated = 0
+		for _ in range(self.UpdateSessionsAttempts):
+			versions = {}
+			async for session_dict in collection.find(query_filter, projection={SessionAdapter.FN.Version: 1}):
+				versions[session_dict[SessionAdapter.FN.SessionId]] = session_dict[SessionAdapter.FN.Version]
+			if len(versions) == 0:
+				break
+
+			result = await collection.bulk_write([
+				pymongo.UpdateOne(
+					{SessionAdapter.FN.SessionId: session_id, SessionAdapter.FN.Version: version},
+					{"$set": to_set, "$inc": {SessionAdapter.FN.Version: 1}},
+				)
+				for session_id, version in versions.items()
+			], ordered=False)
+			updated += result.modified_count
+			for session_id, version in versions.items():
+				self.Cache.invalidate(session_id)
+				self._publish_session_updated(session_id)
+				await self.send_session_webhook(EventTypes.SESSION_UPDATED, session_id, version, to_set)
+			if result.modified_count == len(versions):
+				break
+		else:
+			L.warning("Some sessions were not updated because of concurrent changes", struct_data={
+				"updated": updated})
+
+		return updated
+
+
+	async def send_session_webhook(self, event_type: str, session_id, version: int, to_set: dict):
+		"""
+		Send the storage webhook for a session write that bypasses the upsertor, in the format of the upsertor.
+		"""
+		if self.StorageService.WebhookURIs is None:
+			return
+		upsertor = self.StorageService.upsertor(self.SessionCollection, obj_id=session_id, version=version)
+		await upsertor.webhook({
+			"collection": self.SessionCollection,
+			"event_type": event_type,
+			"upsertor": {
+				"id_field_name": SessionAdapter.FN.SessionId,
+				"id": session_id,
+				"_v": int(version),
+				"set": {key: value for key, value in to_set.items() if not key.startswith("__")},
+			},
+		})
 
 
 	async def get_by(self, criteria: dict):
-		# Encrypt sensitive fields
-		query_filter = {}
-		for key, value in criteria.items():
-			if key in SessionAdapter.SensitiveFields:
-				query_filter[key] = SessionAdapter.EncryptedPrefix + self.aes_encrypt(value)
-			else:
-				query_filter[key] = value
+		# Single-field lookups (access token, cookie ID) are served from cache if possible
+		cache_key = None
+		if len(criteria) == 1:
+			cache_key = next(iter(criteria.items()))
+			session = self.Cache.get_by_key(cache_key)
+			if session is not None:
+				self.CacheCounter.add("hit", 1)
+				return session
+			self.CacheCounter.add("miss", 1)
 
 		collection = self.StorageService.Database[self.SessionCollection]
-		session_dict = await collection.find_one(query_filter)
+		session_dict = await collection.find_one(self._build_lookup_filter(criteria))
+		if session_dict is None and not self.LookupDigestMigrated \
+			and any(key in SessionAdapter.LookupDigestFields for key in criteria):
+			# The session may not have its lookup digest yet
+			session_dict = await collection.find_one(self._build_lookup_filter(criteria, use_digest=False))
 		if session_dict is None:
 			raise KeyError("Session not found")
 
@@ -246,12 +616,98 @@ class SessionService(asab.Service):
 			})
 			raise KeyError("Session not found") from e
 
+		if cache_key is not None:
+			self.Cache.put(session, cache_key)
 		return session
 
 
+	async def get_many_by(self, lookups) -> dict:
+		"""
+		Resolve multiple single-field lookups at once.
+
+		Each lookup is a (field, value) tuple where the field is either a lookup field
+		(access token, cookie ID) or the session ID.
+		Cached sessions are served from cache, the rest is fetched with a single query.
+
+		Return a dict mapping the lookups to session objects. Unresolved lookups are omitted.
+		"""
+		result = {}
+		# Query field -> {stored value -> lookup}
+		pending = collections.defaultdict(dict)
+		for field, value in set(lookups):
+			if field == SessionAdapter.FN.SessionId:
+				session = self.Cache.get(value)
+			else:
+				session = self.Cache.get_by_key((field, value))
+			if session is not None:
+				self.CacheCounter.add("hit", 1)
+				result[(field, value)] = session
+				continue
+			self.CacheCounter.add("miss", 1)
+
+			if field in SessionAdapter.LookupDigestFields:
+				pending[SessionAdapter.LookupDigestFields[field]][self.lookup_digest(value)] = (field, value)
+				if not self.LookupDigestMigrated:
+					# The session may not have its lookup digest yet
+					stored_value = self._build_lookup_filter({field: value}, use_digest=False)[field]
+					pending[field][stored_value] = (field, value)
+			else:
+				pending[field][value] = (field, value)
+
+		if len(pending) == 0:
+			return result
+
+		query_filter = {"$or": [
+			{field: {"$in": list(values.keys())}}
+			for field, values in pending.items()
+		]}
+		collection = self.StorageService.Database[self.SessionCollection]
+		async for session_dict in collection.find(query_filter):
+			matched = [
+				values[session_dict[field]]
+				for field, values in pending.items()
+				if session_dict.get(field) in values
+			]
+			try:
+				session = SessionAdapter(self, session_dict)
+			except Exception:
+				L.error("Failed to create SessionAdapter from database object", struct_data={
+					"sid": session_dict.get("_id"),
+				})
+				continue
+			for lookup in matched:
+				result[lookup] = session
+				if lookup[0] == SessionAdapter.FN.SessionId:
+					self.Cache.put(session)
+				else:
+					self.Cache.put(session, lookup)
+
+		return result
+
+
+	def _build_lookup_filter(self, criteria: dict, use_digest: bool = True) -> dict:
+		query_filter = {}
+		for key, value in criteria.items():
+			if use_digest and key in SessionAdapter.LookupDigestFields:
+				query_filter[SessionAdapter.LookupDigestFields[key]] = self.lookup_digest(value)
+			elif key in SessionAdapter.SensitiveFields:
+				# Encrypt sensitive fields
+				query_filter[key] = SessionAdapter.EncryptedPrefix + self.aes_encrypt(value)
+			else:
+				query_filter[key] = value
+		return query_filter
+
+
 	async def get(self, session_id):
 		if isinstance(session_id, str):
 			session_id = bson.ObjectId(session_id)
+
+		session = self.Cache.get(session_id)
+		if session is not None:
+			self.CacheCounter.add("hit", 1)
+			return session
+		self.CacheCounter.add("miss", 1)
+
 		session_dict = await self.StorageService.get(self.SessionCollection, session_id)
 		try:
 			session = SessionAdapter(self, session_dict)
@@ -260,10 +716,11 @@ class SessionService(asab.Service):
 				"sid": session_dict.get("_id"),
 			})
 			raise e
+		self.Cache.put(session)
 		return session
 
 
-	async def _iterate_raw(self, page: int = 0, limit: int = None, query_filter: dict = None):
+	async def _iterate_raw(self, page: int = 0, limit: int = None, query_filter: dict = None, cursor: str = None):
 		"""
 		Yields raw session dicts including ALL the fields.
 		"""
@@ -271,55 +728,97 @@ class SessionService(asab.Service):
 
 		if query_filter is None:
 			query_filter = {}
-		cursor = collection.find(query_filter)
+		query_filter, skip = apply_pagination(query_filter, page, limit, cursor)
+		db_cursor = collection.find(query_filter)
 
-		cursor.sort('_c', -1)
+		db_cursor.sort(list(CreatedAtSort))
+		if skip > 0:
+			db_cursor.skip(skip)
 		if limit is not None:
-			cursor.skip(limit * page)
-			cursor.limit(limit)
+			db_cursor.limit(limit)
 
-		async for session_dict in cursor:
+		async for session_dict in db_cursor:
 			yield session_dict
 
 
-	async def list(self, page: int = 0, limit: int = None, query_filter=None):
+	async def list(self, page: int = 0, limit: int = None, query_filter=None, cursor: str = None):
 		collection = self.StorageService.Database[self.SessionCollection]
 
 		if query_filter is None:
 			query_filter = {}
 
 		sessions = []
-		async for session_dict in self._iterate_raw(page, limit, query_filter):
+		async for session_dict in self._iterate_raw(page, limit, query_filter, cursor):
 			sessions.append(rest_get(session_dict))
 
-		return {
+		result = {
 			'data': sessions,
 			'count': await collection.count_documents(query_filter)
 		}
+		next_page = next_cursor(sessions, limit)
+		if next_page is not None:
+			result["cursor"] = next_page
+		return result
 
 
-	async def recursive_list(self, page: int = 0, limit: int = None, query_filter=None):
+	async def recursive_list(self, page: int = 0, limit: int = None, query_filter=None, cursor: str = None):
 		"""
 		List top-level sessions with all their children sessions inside the "children" attribute
+
+		The page of top-level sessions, their children and the total count are fetched in a single aggregation.
+		With cursor-based pagination, the total count is fetched separately so that the page query
+		can start right at the cursor position.
 		"""
 		collection = self.StorageService.Database[self.SessionCollection]
 
-		if query_filter is None:
-			query_filter = {}
-
 		# Find only top-level sessions (with no parent)
-		query_filter.update({SessionAdapter.FN.Session.ParentSessionId: None})
-
-		cursor = collection.find(query_filter)
+		query_filter = dict(query_filter or {})
+		query_filter[SessionAdapter.FN.Session.ParentSessionId] = None
 
-		cursor.sort('_c', -1)
+		page_filter, skip = apply_pagination(query_filter, page, limit, cursor)
+		page_pipeline = []
+		if skip > 0:
+			page_pipeline.append({"$skip": skip})
 		if limit is not None:
-			cursor.skip(limit * page)
-			cursor.limit(limit)
+			page_pipeline.append({"$limit": limit})
+		page_pipeline.append({"$lookup": {
+			"from": self.SessionCollection,
+			"localField": SessionAdapter.FN.SessionId,
+			"foreignField": SessionAdapter.FN.Session.ParentSessionId,
+			"as": "children",
+		}})
+
+		if cursor is None:
+			pipeline = [
+				{"$match": query_filter},
+				{"$sort": dict(CreatedAtSort)},
+				{"$facet": {
+					"data": page_pipeline,
+					"count": [{"$count": "count"}],
+				}},
+			]
+			result = None
+			async for result in collection.aggregate(pipeline):
+				break
+			if result is None or len(result["count"]) == 0:
+				return {
+					"data": [],
+					"count": 0
+				}
+			session_dicts = result["data"]
+			count = result["count"][0]["count"]
+		else:
+			pipeline = [
+				{"$match": page_filter},
+				{"$sort": dict(CreatedAtSort)},
+				*page_pipeline
+			]
+			session_dicts = [session_dict async for session_dict in collection.aggregate(pipeline)]
+			count = await collection.count_documents(query_filter)
 
 		sessions = []
-		count = await collection.count_documents(query_filter)
-		async for session_dict in self._iterate_raw(page, limit, query_filter):
+		for session_dict in session_dicts:
+			children = session_dict.pop("children")
 			try:
 				session = SessionAdapter(self, session_dict).rest_get()
 			except Exception as e:
@@ -329,17 +828,25 @@ class SessionService(asab.Service):
 				await self.delete(session_dict.get(SessionAdapter.FN.SessionId))
 				continue
 			# Include children sessions
-			children = await self.list(
-				query_filter={SessionAdapter.FN.Session.ParentSessionId: bson.ObjectId(session["_id"])}
-			)
-			if children["count"] > 0:
-				session["children"] = children
+			if len(children) > 0:
+				# Same order as CreatedAtSort, children without creation time last
+				children.sort(key=lambda child: (
+					child.get("_c") is not None, child.get("_c") or 0, child["_id"]
+				), reverse=True)
+				session["children"] = {
+					"data": [rest_get(child) for child in children],
+					"count": len(children),
+				}
 			sessions.append(session)
 
-		return {
+		result = {
 			'data': sessions,
 			'count': count
 		}
+		next_page = next_cursor(sessions, limit)
+		if next_page is not None:
+			result["cursor"] = next_page
+		return result
 
 
 	async def count_sessions(self, query_filter=None):
@@ -355,6 +862,9 @@ class SessionService(asab.Service):
 		"""
 		Extend the expiration of the session group if it hasn't been updated recently.
 
+		The new expiration is not written immediately. It is stored in the extension buffer
+		and written in bulk by the next flush.
+
 		Return the updated session object.
 		"""
 		# Extend parent session
@@ -364,7 +874,12 @@ class SessionService(asab.Service):
 		if datetime.datetime.now(datetime.timezone.utc) < session.Session.ModifiedAt + self.MinimalRefreshInterval:
 			# Session has been extended recently
 			return session
-		if session.Session.Expiration >= session.Session.MaxExpiration:
+
+		current_expiration = max(
+			session.Session.Expiration,
+			self.TouchBuffer.get(session.SessionId, session.Session.Expiration)
+		)
+		if current_expiration >= session.Session.MaxExpiration:
 			# Session expiration is already maxed out
 			return session
 
@@ -377,29 +892,81 @@ class SessionService(asab.Service):
 			return session
 		expires = datetime.datetime.now(datetime.timezone.utc) + expiration
 
-		if expires < session.Session.Expiration:
+		if expires <= current_expiration:
 			# Do not shorten the session!
 			return session
 		if expires > session.Session.MaxExpiration:
 			# Do not cross maximum expiration
 			expires = session.Session.MaxExpiration
 
-		# Update session
-		version = session.Session.Version
-		upsertor = self.StorageService.upsertor(
-			self.SessionCollection,
-			session.SessionId,
-			version=version
+		# Schedule the update
+		self.TouchBuffer[session.SessionId] = expires
+
+		# Return the extended view without reading the session again
+		extended_session = copy.copy(session)
+		extended_session.Session = dataclasses.replace(
+			session.Session,
+			Expiration=expires,
+			ModifiedAt=datetime.datetime.now(datetime.timezone.utc),
 		)
-		upsertor.set(SessionAdapter.FN.Session.Expiration, expires)
+		self.Cache.put(extended_session)
+		return extended_session
+
+
+	async def _on_tick_flush(self, event_name):
+		now = time.monotonic()
+		if now < self.TouchBufferFlushedAt + self.TouchFlushInterval:
+			return
+		self.TouchBufferFlushedAt = now
+		await self.flush_touch_buffer()
+
+
+	async def flush_touch_buffer(self):
+		"""
+		Write all the buffered session extensions to the database in a single bulk request.
+		Expiration is only ever moved forward.
+		"""
+		if len(self.TouchBuffer) == 0:
+			return
+
+		buffer = self.TouchBuffer
+		self.TouchBuffer = {}
+
+		now = datetime.datetime.now(datetime.timezone.utc)
+		requests = [
+			pymongo.UpdateOne(
+				{
+					SessionAdapter.FN.SessionId: session_id,
+					SessionAdapter.FN.Session.Expiration: {"$lt": expires},
+				},
+				{
+					"$max": {
+						SessionAdapter.FN.Session.Expiration: expires,
+						SessionAdapter.FN.ModifiedAt: now,
+					},
+					"$inc": {SessionAdapter.FN.Version: 1},
+				}
+			)
+			for session_id, expires in buffer.items()
+		]
 
+		collection = self.StorageService.Database[self.SessionCollection]
 		try:
-			await upsertor.execute(event_type=EventTypes.SESSION_EXTENDED)
-			L.log(asab.LOG_NOTICE, "Session expiration extended", struct_data={"sid": session.Session.Id, "exp": expires})
-		except KeyError:
-			L.warning("Conflict: Session already extended", struct_data={"sid": session.Session.Id})
+			result = await collection.bulk_write(requests, ordered=False)
+		except Exception as e:
+			L.error("Failed to extend sessions: {}".format(e), struct_data={"count": len(requests)})
+			# Return the failed extensions to the buffer unless they have been superseded
+			for session_id, expires in buffer.items():
+				if self.TouchBuffer.get(session_id, expires) <= expires:
+					self.TouchBuffer[session_id] = expires
+			return
 
-		return await self.get(session.SessionId)
+		# Cached sessions must pick up the new version and modification time
+		for session_id in buffer:
+			self.Cache.invalidate(session_id)
+
+		L.log(asab.LOG_NOTICE, "Session expiration extended", struct_data={
+			"requested": len(requests), "modified": result.modified_count})
 
 
 	async def delete(self, session_id):
@@ -414,10 +981,35 @@ class SessionService(asab.Service):
 			await self.delete(session_dict["_id"])
 
 		# Delete the session itself
-		await self.StorageService.delete(self.SessionCollection, bson.ObjectId(session_id))
+		session_dict = await self.StorageService.Database[self.SessionCollection].find_one_and_delete(
+			{"_id": bson.ObjectId(session_id)},
+			projection=self.SubtreeProjection
+		)
+		if session_dict is None:
+			raise KeyError("NOT-FOUND")
+		self._count_session(session_dict, -1)
+		self.Cache.invalidate(bson.ObjectId(session_id))
+		self.TouchBuffer.pop(bson.ObjectId(session_id), None)
 		L.log(asab.LOG_NOTICE, "Session deleted", struct_data={"sid": session_id})
+		self._publish_session_deleted(session_dict)
+
+
+	def _publish_session_deleted(self, session_dict: dict):
+		"""
+		Notify subscribers (e.g. signed access token revocation) that a session has been terminated.
+		"""
+		self.App.PubSub.publish(
+			"Session.deleted!",
+			session_id=session_dict[SessionAdapter.FN.SessionId],
+			max_expiration=session_dict.get(SessionAdapter.FN.Session.MaxExpiration),
+		)
 
-		# TODO: Publish pubsub message for session deletion
+
+	def _publish_session_updated(self, session_id):
+		"""
+		Notify subscribers (e.g. introspection caches) that session data have changed.
+		"""
+		self.App.PubSub.publish("Session.updated!", session_id=session_id)
 
 
 	async def delete_all_sessions(self):
@@ -434,8 +1026,10 @@ class SessionService(asab.Service):
 		# Delete iteratively so that every session is terminated properly
 		for session_dict in to_delete:
 			try:
-				# TODO: Publish pubsub message for session deletion
 				await self.StorageService.delete(self.SessionCollection, session_dict["_id"])
+				self.Cache.invalidate(session_dict["_id"])
+				self._count_session(session_dict, -1)
+				self._publish_session_deleted(session_dict)
 				deleted += 1
 			except Exception as e:
 				L.error("Cannot delete session", struct_data={
@@ -456,7 +1050,14 @@ class SessionService(asab.Service):
 
 	async def delete_sessions_by_tenant_in_scope(self, tenant):
 		await self._delete_sessions_by_filter(
-			query_filter={"{}.{}".format(SessionAdapter.FN.Authorization.Authz, tenant): {"$exists": True}})
+			query_filter={SessionAdapter.FN.Authorization.Tenants: tenant})
+
+
+	async def remove_tenant_from_sessions(self, tenant):
+		"""
+		Remove a deleted tenant from the authorization of all sessions before the deletion is acknowledged.
+		"""
+		await self.AuthzPropagator.remove_tenant(tenant)
 
 
 	async def inherit_track_id_from_root(self, session: SessionAdapter) -> SessionAdapter:
@@ -476,10 +1077,10 @@ class SessionService(asab.Service):
 				sub_session_builders = [
 					((SessionAdapter.FN.Session.TrackId, uuid.uuid4().bytes),),
 				]
-				await self.update_session(
+				session = await self.update_session(
 					session.SessionId,
-					session_builders=sub_session_builders)
-				session = await self.get(session.SessionId)
+					session_builders=sub_session_builders,
+					version=session.Session.Version)
 		return session
 
 
@@ -497,7 +1098,8 @@ class SessionService(asab.Service):
 			# Also update its root session if there is any
 			root_session_id = dst_session.Session.ParentSessionId
 			session_builders = [((SessionAdapter.FN.Session.TrackId, uuid.uuid4().bytes),)]
-			await self.update_session(dst_session.SessionId, session_builders)
+			dst_session = await self.update_session(
+				dst_session.SessionId, session_builders, version=dst_session.Session.Version)
 			if root_session_id is not None:
 				await self.update_session(root_session_id, session_builders)
 
@@ -523,8 +1125,9 @@ class SessionService(asab.Service):
 			session_builders = [((SessionAdapter.FN.Session.TrackId, src_session.Session.TrackId),)]
 			old_session_group_id = src_session.Session.ParentSessionId or src_session.SessionId
 			await self.delete(old_session_group_id)
-			await self.update_session(dst_session.SessionId, session_builders)
 			await self.update_session(dst_session.Session.ParentSessionId, session_builders)
+			dst_session = await self.update_session(
+				dst_session.SessionId, session_builders, version=dst_session.Session.Version)
 
 		elif src_session.Session.Type != dst_session.Session.Type:
 			# The source and the destination sessions are both anonymous but of a different type (cookie vs token)
@@ -537,20 +1140,24 @@ class SessionService(asab.Service):
 				# Update the root session
 				root_session = await self.get(root_session_id)
 				assert root_session.Session.TrackId is None
-				await self.update_session(root_session_id, session_builders=root_session_builders)
+				await self.update_session(
+					root_session_id, session_builders=root_session_builders, version=root_session.Session.Version)
 			else:
 				# Create a new root session
 				root_session_builders.extend([
 					((SessionAdapter.FN.Credentials.Id, dst_session.Credentials.Id),),
 					((SessionAdapter.FN.Authentication.IsAnonymous, True),),
 				])
-				await self.create_session("root", session_builders=root_session_builders)
+				root_session = await self.create_session("root", session_builders=root_session_builders)
+				root_session_id = root_session.SessionId
 			sub_session_builders = [
 				((SessionAdapter.FN.Session.ParentSessionId, root_session_id),),
 				((SessionAdapter.FN.Session.TrackId, src_session.Session.TrackId),),
 			]
-			await self.update_session(dst_session.SessionId, session_builders=sub_session_builders)
-			await self.update_session(src_session.SessionId, session_builders=sub_session_builders)
+			await self.update_session(
+				src_session.SessionId, session_builders=sub_session_builders, version=src_session.Session.Version)
+			dst_session = await self.update_session(
+				dst_session.SessionId, session_builders=sub_session_builders, version=dst_session.Session.Version)
 
 		else:
 			# The source and the destination sessions are both anonymous and of the same type (cookie or token)
@@ -560,9 +1167,51 @@ class SessionService(asab.Service):
 			session_builders = [((SessionAdapter.FN.Session.TrackId, src_session.Session.TrackId),)]
 			old_session_group_id = src_session.Session.ParentSessionId or src_session.SessionId
 			await self.delete(old_session_group_id)
-			await self.update_session(dst_session.SessionId, session_builders)
+			dst_session = await self.update_session(
+				dst_session.SessionId, session_builders, version=dst_session.Session.Version)
 
-		return await self.get(dst_session.SessionId)
+		return dst_session
+
+
+	def lookup_digest(self, raw_bytes: bytes) -> bytes:
+		"""
+		Keyed digest of a token for indexed session lookup.
+		"""
+		return hmac.new(self.LookupKey, raw_bytes, hashlib.sha256).digest()
+
+
+	async def migrate_lookup_digests(self):
+		"""
+		Add lookup digests to sessions that were created before the digests were introduced.
+		"""
+		collection = self.StorageService.Database[self.SessionCollection]
+		migrated = 0
+		for field, digest_field in SessionAdapter.LookupDigestFields.items():
+			query_filter = {field: {"$exists": True, "$gt": b""}, digest_field: {"$exists": False}}
+			while True:
+				requests = []
+				async for session_dict in collection.find(
+					query_filter, projection={field: 1}, limit=self.SweepBatchSize
+				):
+					value = session_dict[field]
+					if value.startswith(SessionAdapter.EncryptedPrefix):
+						value = self.aes_decrypt(value[len(SessionAdapter.EncryptedPrefix):])
+					requests.append(pymongo.UpdateOne(
+						{SessionAdapter.FN.SessionId: session_dict[SessionAdapter.FN.SessionId]},
+						{"$set": {digest_field: self.lookup_digest(value)}},
+					))
+				if len(requests) == 0:
+					break
+				try:
+					result = await collection.bulk_write(requests, ordered=False)
+				except pymongo.errors.BulkWriteError as e:
+					L.error("Failed to migrate session lookup digests: {}".format(e.details.get("writeErrors")))
+					return
+				migrated += result.modified_count
+
+		self.LookupDigestMigrated = True
+		if migrated > 0:
+			L.log(asab.LOG_NOTICE, "Session lookup digests migrated", struct_data={"count": migrated})
 
 
 	def aes_encrypt(self, raw_bytes: bytes):
@@ -88,6 +88,13 @@ class TenantHandler(object):
 			description: Filter string
 			schema:
 				type: string
+		-	name: c
+			in: query
+			description:
+				Pagination cursor returned in the previous page's response.
+				If present, the page number is ignored.
+			schema:
+				type: string
 		"""
 		if not request.can_access_all_tenants:
 			# List only tenants authorized in the current session
@@ -106,6 +113,8 @@ class TenantHandler(object):
 		if limit is not None:
 			limit = int(limit)
 
+		cursor = request.query.get("c")
+
 		filter = request.query.get("f", "")
 		if len(filter) == 0:
 			filter = None
@@ -115,13 +124,16 @@ class TenantHandler(object):
 		count = await provider.count(filter=filter)
 
 		tenants = []
-		async for tenant in provider.iterate(page, limit, filter):
+		async for tenant in provider.iterate(page, limit, filter, cursor=cursor):
 			tenants.append(tenant)
 
 		result = {
 			"data": tenants,
 			"count": count,
 		}
+		next_page = provider.next_cursor(tenants, limit, filter)
+		if next_page is not None:
+			result["cursor"] = next_page
 
 		return asab.web.rest.json_response(request, data=result)
 
@@ -13,10 +13,18 @@ class TenantsProviderABC(asab.ConfigObject, abc.ABC):
 
 
 	@abc.abstractmethod
-	async def iterate(self, page: int = 10, limit: int = None, filter: str = None):
+	async def iterate(self, page: int = 10, limit: int = None, filter: str = None, cursor: str = None):
 		pass
 
 
+	def next_cursor(self, tenants: list, limit: int = None, filter: str = None) -> Optional[str]:
+		"""
+		Return the pagination cursor of the page following `tenants`.
+		Providers that do not support cursor-based pagination return None.
+		"""
+		return None
+
+
 	@abc.abstractmethod
 	async def count(self, filter: str = None) -> int:
 		pass
@@ -4,8 +4,10 @@ from typing import Optional
 
 import asab.storage.mongodb
 import asab.storage.exceptions
+import pymongo
 
 from .abc import EditableTenantsProviderABC
+from ... import pagination
 
 from ...events import EventTypes
 
@@ -20,6 +22,10 @@ class MongoDBTenantProvider(EditableTenantsProviderABC):
 
 	Type = "mongodb"
 
+	# Sort order of tenant listing: unfiltered and filtered by substring
+	IdSort = (("_id", pymongo.ASCENDING),)
+	MatchSort = (("_match", pymongo.ASCENDING), ("_id", pymongo.ASCENDING))
+
 	ConfigDefaults = {
 		'tenant_collection': 't',
 		'assign_collection': 'ct',
@@ -39,15 +45,17 @@ class MongoDBTenantProvider(EditableTenantsProviderABC):
 		self.AssignCollection = self.Config['assign_collection']
 
 
-	async def iterate(self, page: int = 1, limit: int = None, filter: str = None):
+	async def iterate(self, page: int = 1, limit: int = None, filter: str = None, cursor: str = None):
 		collection = await self.MongoDBStorageService.collection(self.TenantsCollection)
 
 		if filter is None:
-			cursor = collection.find()
-			cursor.sort("_id", 1)
+			query_filter, skip = pagination.apply_pagination({}, page, limit, cursor, sort=self.IdSort)
+			db_cursor = collection.find(query_filter)
+			db_cursor.sort(list(self.IdSort))
+			if skip > 0:
+				db_cursor.skip(skip)
 			if limit is not None:
-				cursor.skip(limit * page)
-				cursor.limit(limit)
+				db_cursor.limit(limit)
 		else:
 			# Fetch tenants that contain `filter` substring
 			# Sort results so that tenants that start with the substring come first
@@ -63,17 +71,26 @@ class MongoDBTenantProvider(EditableTenantsProviderABC):
 				{"$match": {"$expr": {"$gte": ["$_match", 0]}}},
 				# Sort matches so that tenants that start with substring come first
 				# Secondary sort is alphabetical
-				{"$sort": collections.OrderedDict({"_match": 1, "_id": 1})},
+				{"$sort": collections.OrderedDict(self.MatchSort)},
 			]
+			query_filter, skip = pagination.apply_pagination({}, page, limit, cursor, sort=self.MatchSort)
+			if cursor is not None:
+				pipeline.append({"$match": query_filter})
+			if skip > 0:
+				pipeline.append({"$skip": skip})
 			if limit is not None:
-				pipeline.append({"$skip": limit * page})
 				pipeline.append({"$limit": limit})
-			cursor = collection.aggregate(pipeline)
+			db_cursor = collection.aggregate(pipeline)
 
-		async for tenant in cursor:
+		async for tenant in db_cursor:
 			yield tenant
 
 
+	def next_cursor(self, tenants: list, limit: int = None, filter: str = None) -> Optional[str]:
+		sort = self.IdSort if filter is None else self.MatchSort
+		return pagination.next_cursor(tenants, limit, sort=sort)
+
+
 	async def count(self, filter=None) -> int:
 		coll = await self.MongoDBStorageService.collection(self.TenantsCollection)
 
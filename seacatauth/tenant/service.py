@@ -63,8 +63,6 @@ class TenantService(asab.Service):
 
 
 	async def delete_tenant(self, tenant_id: str):
-		session_service = self.App.get_service("seacatauth.SessionService")
-
 		# Unassign and delete tenant roles
 		role_svc = self.App.get_service("seacatauth.RoleService")
 		tenant_roles = (await role_svc.list(tenant=tenant_id, exclude_global=True))["data"]
@@ -85,8 +83,9 @@ class TenantService(asab.Service):
 		# Delete tenant from provider
 		await self.TenantsProvider.delete(tenant_id)
 
-		# Delete sessions that have the tenant in scope
-		await session_service.delete_sessions_by_tenant_in_scope(tenant_id)
+		# Remove the tenant from active sessions
+		session_service = self.App.get_service("seacatauth.SessionService")
+		await session_service.remove_tenant_from_sessions(tenant_id)
 
 
 	def get_provider(self):
@@ -141,7 +140,7 @@ class TenantService(asab.Service):
 					"message": message,
 				}
 			# Check permission
-			if not rbac_svc.has_resource_access(session.Authorization.Authz, tenant, ["seacat:tenant:assign"]):
+			if not rbac_svc.has_resource_access(session.Authorization.CompiledAuthz, tenant, ["seacat:tenant:assign"]):
 				message = "Not authorized for tenant un/assignment"
 				L.error(message, struct_data={
 					"agent_cid": session.Credentials.Id,
@@ -217,6 +216,7 @@ class TenantService(asab.Service):
 			"cid": credentials_id,
 			"tenant": tenant,
 		})
+		self.App.PubSub.publish("Tenant.assigned!", credentials_id=credentials_id, tenant=tenant)
 
 
 	async def unassign_tenant(self, credentials_id: str, tenant: str):
@@ -234,6 +234,7 @@ class TenantService(asab.Service):
 		)
 
 		await self.TenantsProvider.unassign_tenant(credentials_id, tenant)
+		self.App.PubSub.publish("Tenant.unassigned!", credentials_id=credentials_id, tenant=tenant)
 
 
 	def is_enabled(self):
@@ -1,2 +1,12 @@
 from .test_rbac import *
 from .test_oauth_url import *
+from .test_pagination import *
+from .test_session_adapter import *
+from .test_session_cache import *
+from .test_introspection_cache import *
+from .test_token_index import *
+from .test_jwt_keys import *
+from .test_build_authz import *
+from .test_object_registry import *
+from .test_authz_propagation import *
+from .test_session_tree import *
@@ -0,0 +1,61 @@
+"""
+Micro-benchmark of JWT signing and verification with the supported signing key types.
+Verification uses a key set with a retired key, as after a key rotation.
+
+python3 -m test.benchmark_jwt_signing
+"""
+import json
+import time
+import timeit
+
+import jwcrypto.jwk
+import jwcrypto.jwt
+
+from seacatauth.openidconnect.service import SigningAlgorithms, signing_algorithm
+
+
+def _claims():
+	return json.dumps({
+		"iss": "auth.example.com",
+		"sub": "mongodb:default:5f1d6a6d1e1e1e1e1e1e1e1e",
+		"sid": "6523cb6a5f1d6a6d1e1e1e1e",
+		"exp": int(time.time()) + 3600,
+		"iat": int(time.time()),
+		"tenants": ["default", "acme"],
+		"resources": {"*": ["seacat:access"], "acme": ["acme:read", "acme:write"]},
+	})
+
+
+def _sign(key, claims):
+	token = jwcrypto.jwt.JWT(
+		header={"alg": signing_algorithm(key), "typ": "JWT", "kid": key.key_id},
+		claims=claims
+	)
+	token.make_signed_token(key)
+	return token.serialize()
+
+
+def _generate_key(key_type, curve):
+	# Go through PEM so that the key gets its thumbprint as key ID, as when it is loaded from file
+	key = jwcrypto.jwk.JWK.generate(kty=key_type, crv=curve)
+	return jwcrypto.jwk.JWK.from_pem(key.export_to_pem(private_key=True, password=None))
+
+
+def main(number=2000):
+	claims = _claims()
+	retired_key = _generate_key("EC", "P-256")
+	for (key_type, curve), algorithm in SigningAlgorithms.items():
+		key = _generate_key(key_type, curve)
+		key_set = jwcrypto.jwk.JWKSet()
+		key_set.add(retired_key)
+		key_set.add(key)
+		token = _sign(key, claims)
+
+		sign_duration = timeit.timeit(lambda: _sign(key, claims), number=number)
+		verify_duration = timeit.timeit(lambda: jwcrypto.jwt.JWT(jwt=token, key=key_set), number=number)
+		print("{:<8} sign {:9.0f} tokens/s   verify {:9.0f} tokens/s".format(
+			algorithm, number / sign_duration, number / verify_duration))
+
+
+if __name__ == "__main__":
+	main()
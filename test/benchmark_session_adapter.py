@@ -0,0 +1,32 @@
+"""
+Micro-benchmark of session adapter construction for the typical introspection access pattern:
+the session is built from a database object, then its credentials ID and authorization are read.
+
+python3 -m test.benchmark_session_adapter
+"""
+import timeit
+
+from .test_session_adapter import _SessionService, _session_dict
+from seacatauth.session.adapter import SessionAdapter
+
+
+def introspect_pattern(session_svc, session_dict):
+	session = SessionAdapter(session_svc, dict(session_dict))
+	return session.Credentials.Id, session.Authorization.Authz
+
+
+def full_pattern(session_svc, session_dict):
+	session = SessionAdapter(session_svc, dict(session_dict))
+	return session.serialize()
+
+
+def main(number=100000):
+	session_svc = _SessionService()
+	session_dict = _session_dict()
+	for name, fn in (("introspection", introspect_pattern), ("full deserialization", full_pattern)):
+		duration = timeit.timeit(lambda: fn(session_svc, session_dict), number=number)
+		print("{:<24} {:8.2f} us per session".format(name, duration / number * 1e6))
+
+
+if __name__ == "__main__":
+	main()
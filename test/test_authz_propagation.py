@@ -0,0 +1,167 @@
+import asyncio
+import types
+import unittest
+
+import seacatauth  # noqa: F401 (configuration defaults)
+from seacatauth.session.authz_propagation import AuthzPropagator
+
+from .test_introspection_cache import _app
+from .test_object_registry import _AsyncIter
+
+
+def _match(doc, query_filter):
+	"""
+	Evaluate the subset of the MongoDB query language used by the propagator.
+	"""
+	for key, condition in query_filter.items():
+		value = doc.get(key)
+		if not isinstance(condition, dict):
+			condition = {"$eq": condition}
+		for operator, operand in condition.items():
+			if operator == "$exists":
+				matches = (key in doc) == operand
+			elif operator == "$in":
+				matches = value in operand
+			else:
+				matches = operand in value if isinstance(value, list) else value == operand
+				if operator == "$ne":
+					matches = not matches
+			if not matches:
+				return False
+	return True
+
+
+class _SessionCollection:
+	"""
+	Session collection stand-in.
+	"""
+
+	def __init__(self, documents):
+		self.Documents = {doc["_id"]: doc for doc in documents}
+		self.BulkWrites = 0
+
+	def find(self, query_filter, projection=None):
+		return _AsyncIter([dict(doc) for doc in self.Documents.values() if _match(doc, query_filter)])
+
+	async def bulk_write(self, requests, ordered=True):
+		self.BulkWrites += 1
+		modified = 0
+		for request in requests:
+			doc = self.Documents[request._filter["_id"]]
+			if doc["_v"] != request._filter["_v"]:
+				continue
+			doc.update(request._doc["$set"])
+			doc["_v"] += 1
+			modified += 1
+		return types.SimpleNamespace(modified_count=modified)
+
+
+async def _no_webhook(event_type, session_id, version, to_set):
+	pass
+
+
+class AuthzPropagatorTestCase(unittest.TestCase):
+
+	def setUp(self):
+		# The propagator lock needs an event loop on Python < 3.10
+		self.Loop = asyncio.new_event_loop()
+		asyncio.set_event_loop(self.Loop)
+
+		self.Collection = _SessionCollection([
+			{"_id": 1, "_v": 1, "c_id": "alice", "az_az": {"*": [], "acme": ["acme:read"]}, "az_t": ["acme", "globex"]},
+			{"_id": 2, "_v": 1, "c_id": "bob", "az_az": {"*": [], "acme": []}, "az_t": ["acme"]},
+			{"_id": 3, "_v": 1, "c_id": "carol", "az_az": {"*": []}, "az_t": ["globex"]},
+		])
+		self.Updated = []
+		self.Terminated = []
+		self.App = _app()
+
+		async def delete_sessions_by_tenant_in_scope(tenant):
+			self.Terminated.append(tenant)
+
+		session_service = types.SimpleNamespace(
+			StorageService=types.SimpleNamespace(Database={"s": self.Collection}),
+			SessionCollection="s",
+			Cache=types.SimpleNamespace(invalidate=lambda session_id: None),
+			_publish_session_updated=self.Updated.append,
+			send_session_webhook=_no_webhook,
+			delete_sessions_by_tenant_in_scope=delete_sessions_by_tenant_in_scope,
+		)
+		self.Propagator = AuthzPropagator(self.App, session_service)
+		self.Propagator.BatchSize = 1
+
+
+	def tearDown(self):
+		asyncio.set_event_loop(None)
+		self.Loop.close()
+
+
+	def _concurrent_changes(self, changes):
+		"""
+		Change the authz of session 1 between the read and the write of the next bulk requests.
+		"""
+		collection = self.Collection
+		bulk_write = collection.bulk_write
+
+		async def concurrent_bulk_write(requests, ordered=True):
+			if len(changes) > 0:
+				collection.Documents[1]["az_az"] = changes.pop(0)
+				collection.Documents[1]["_v"] += 1
+			return await bulk_write(requests, ordered)
+
+		collection.bulk_write = concurrent_bulk_write
+
+
+	def test_tenant_deleted(self):
+		self.Loop.run_until_complete(self.Propagator.remove_tenant("acme"))
+		self.assertFalse(self.Propagator.is_pending())
+		self.assertEqual(self.Collection.Documents[1]["az_az"], {"*": []})
+		self.assertEqual(self.Collection.Documents[1]["az_t"], ["globex"])
+		self.assertEqual(self.Collection.Documents[2]["az_t"], [])
+		# Sessions are kept, unchanged ones are not written
+		self.assertEqual(self.Collection.Documents[3]["_v"], 1)
+		self.assertEqual(sorted(self.Updated), [1, 2])
+		self.assertEqual(self.Terminated, [])
+		# One bulk request per batch
+		self.assertEqual(self.Collection.BulkWrites, 2)
+
+
+	def test_tenant_deleted_conflict(self):
+		# Retried right away
+		self._concurrent_changes([{"*": ["post:read"], "acme": ["acme:write"]}])
+		self.Loop.run_until_complete(self.Propagator.remove_tenant("acme"))
+		self.assertEqual(self.Collection.Documents[1]["az_az"], {"*": ["post:read"]})
+		self.assertEqual(self.Terminated, [])
+
+		# Sessions that keep changing are terminated
+		self.Collection.Documents[1]["az_t"] = ["acme"]
+		self._concurrent_changes([{"*": [], "acme": ["acme:read"]}] * self.Propagator.TenantRemovalAttempts)
+		self.Loop.run_until_complete(self.Propagator.remove_tenant("acme"))
+		self.assertEqual(self.Terminated, ["acme"])
+
+
+	def test_tenant_assigned(self):
+		self.App.PubSub.publish("Tenant.assigned!", credentials_id="carol", tenant="acme")
+		self.Loop.run_until_complete(self.Propagator.propagate())
+		self.assertEqual(self.Collection.Documents[3]["az_t"], ["globex", "acme"])
+		self.assertEqual(self.Collection.Documents[3]["az_az"], {"*": []})
+
+
+	def test_tenant_unassigned(self):
+		self.App.PubSub.publish("Tenant.unassigned!", credentials_id="alice", tenant="acme")
+		self.assertTrue(self.Propagator.is_pending())
+		self.Loop.run_until_complete(self.Propagator.propagate())
+		self.assertFalse(self.Propagator.is_pending())
+		self.assertEqual(self.Collection.Documents[1]["az_az"], {"*": []})
+		# Sessions of other credentials keep the tenant
+		self.assertEqual(self.Collection.Documents[2]["az_t"], ["acme"])
+
+
+	def test_conflict(self):
+		self._concurrent_changes([{"*": ["post:read"], "acme": ["acme:write"]}])
+		self.App.PubSub.publish("Tenant.unassigned!", credentials_id="alice", tenant="acme")
+		self.Loop.run_until_complete(self.Propagator.propagate())
+		# Retried in the next run
+		self.assertIn(("acme", "alice"), self.Propagator.PendingTenantRemovals)
+		self.Loop.run_until_complete(self.Propagator.propagate())
+		self.assertEqual(self.Collection.Documents[1]["az_az"], {"*": ["post:read"]})
@@ -0,0 +1,101 @@
+import asyncio
+import types
+import unittest
+
+import seacatauth  # noqa: F401 (configuration defaults)
+from seacatauth.authz import build_credentials_authz
+from seacatauth.authz.store import CredentialsAuthzStore
+
+from .test_introspection_cache import _app
+
+
+class _TenantService:
+
+	def is_enabled(self):
+		return True
+
+
+class _RoleService:
+	"""
+	Role service stub that counts the database queries
+	"""
+
+	def __init__(self, app):
+		self.Queries = 0
+		self.Assignments = [
+			("*", "*/reader"),
+			("acme", "acme/admin"),
+			("acme", "acme/deleted"),
+			("globex", "globex/user"),
+		]
+		self.Registry = types.SimpleNamespace(Collection="r", Objects={
+			"*/reader": {"_id": "*/reader", "resources": ["post:read"]},
+			"acme/admin": {"_id": "acme/admin", "resources": ["acme:write", "seacat:tenant:access"]},
+			"globex/user": {"_id": "globex/user", "resources": ["globex:read"]},
+		})
+		self.AuthzStore = CredentialsAuthzStore(app, self)
+
+	async def get_roles_by_credentials_per_tenant(self, credentials_id, tenants=None):
+		self.Queries += 1
+		result = {tenant: [] for tenant in ["*", *(tenants or [])]}
+		for tenant, role in self.Assignments:
+			if tenant in result:
+				result[tenant].append(role)
+		return result
+
+
+class BuildCredentialsAuthzTestCase(unittest.TestCase):
+
+	def setUp(self):
+		self.App = _app()
+		self.RoleService = _RoleService(self.App)
+
+
+	def _build(self, tenants=None):
+		return asyncio.run(build_credentials_authz(_TenantService(), self.RoleService, "cid", tenants))
+
+
+	def test_authz(self):
+		authz = self._build(["acme", "globex", "initech"])
+		self.assertEqual(set(authz["*"]), {"post:read"})
+		self.assertEqual(set(authz["acme"]), {"post:read", "acme:write", "seacat:tenant:access"})
+		self.assertEqual(set(authz["globex"]), {"post:read", "globex:read"})
+		self.assertEqual(set(authz["initech"]), {"post:read"})
+		self.assertEqual(self.RoleService.Queries, 1)
+
+
+	def test_global_only(self):
+		authz = self._build()
+		self.assertEqual(authz, {"*": ["post:read"]})
+		self.assertEqual(self.RoleService.Queries, 1)
+
+
+	def test_materialized(self):
+		self._build(["acme"])
+		authz = self._build(["acme"])
+		self.assertEqual(set(authz["acme"]), {"post:read", "acme:write", "seacat:tenant:access"})
+		self.assertEqual(self.RoleService.Queries, 1)
+
+		# Only the missing tenant is queried
+		self._build(["acme", "globex"])
+		self.assertEqual(self.RoleService.Queries, 2)
+
+
+	def test_role_updated(self):
+		self._build(["acme"])
+		self.RoleService.Registry.Objects["acme/admin"]["resources"] = ["acme:read"]
+		self.App.PubSub.publish("ObjectRegistry.changed!", collection="r", obj_id="acme/admin")
+		authz = self._build(["acme"])
+		self.assertEqual(set(authz["acme"]), {"post:read", "acme:read"})
+		# Recomputed without a query
+		self.assertEqual(self.RoleService.Queries, 1)
+
+
+	def test_role_unassigned(self):
+		self._build(["acme", "globex"])
+		self.RoleService.Assignments.remove(("acme", "acme/admin"))
+		self.RoleService.AuthzStore.invalidate("cid", "acme")
+		authz = self._build(["acme", "globex"])
+		self.assertEqual(set(authz["acme"]), {"post:read"})
+		self.assertEqual(set(authz["globex"]), {"post:read", "globex:read"})
+		self.assertEqual(self.RoleService.Queries, 2)
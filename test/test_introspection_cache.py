@@ -0,0 +1,118 @@
+import asyncio
+import datetime
+import re
+import types
+import unittest
+
+import aiohttp.web
+import aiohttp.test_utils
+
+import seacatauth  # noqa: F401 (configuration defaults)
+from seacatauth.introspection_cache import IntrospectionCache
+
+
+class _PubSub:
+
+	def __init__(self):
+		self.Subscribers = {}
+
+	def subscribe(self, message_type, callback):
+		self.Subscribers.setdefault(message_type, []).append(callback)
+
+	def publish(self, message_type, **kwargs):
+		for callback in self.Subscribers.get(message_type, []):
+			callback(message_type, **kwargs)
+
+
+def _app():
+	cookie_service = types.SimpleNamespace(CookiePattern=re.compile(r"SeaCatSCI=[^;]*;?\s*"))
+	return types.SimpleNamespace(
+		PubSub=_PubSub(),
+		get_service=lambda name: cookie_service,
+	)
+
+
+def _session(session_id, expires_in=3600):
+	return types.SimpleNamespace(
+		SessionId=session_id,
+		Session=types.SimpleNamespace(
+			Expiration=datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=expires_in)
+		)
+	)
+
+
+class IntrospectionCacheTestCase(unittest.TestCase):
+
+	def setUp(self):
+		self.App = _app()
+		self.Cache = IntrospectionCache(self.App)
+		self.Calls = 0
+
+
+	def _request(self, cookie="SeaCatSCI=abc; other=1"):
+		return aiohttp.test_utils.make_mocked_request(
+			"POST", "/cookie/nginx?client_id=app", headers={"Cookie": cookie})
+
+
+	def _introspection(self, session, status=200):
+		async def introspect():
+			self.Calls += 1
+			await asyncio.sleep(0.01)
+			if status == 200:
+				return aiohttp.web.HTTPOk(headers={"Authorization": "Bearer x", "Cookie": "other=1"}), session
+			return aiohttp.web.HTTPForbidden(), session
+		return introspect
+
+
+	def test_coalescing_and_caching(self):
+		session = _session("s1")
+		request = self._request()
+		key = self.Cache.build_key(request, b"abc")
+
+		async def run():
+			responses = await asyncio.gather(*[
+				self.Cache.introspect(request, key, self._introspection(session))
+				for _ in range(10)
+			])
+			responses.append(await self.Cache.introspect(request, key, self._introspection(session)))
+			return responses
+
+		responses = asyncio.run(run())
+		self.assertEqual(self.Calls, 1)
+		for response in responses:
+			self.assertEqual(response.status_code, 200)
+			self.assertEqual(response.headers["Authorization"], "Bearer x")
+			self.assertEqual(response.headers["Cookie"], "other=1")
+			self.assertTrue(response.headers["Cache-Control"].startswith("private, max-age="))
+
+
+	def test_failure_is_not_cached(self):
+		session = _session("s1")
+		request = self._request()
+		key = self.Cache.build_key(request, b"abc")
+
+		async def run():
+			await self.Cache.introspect(request, key, self._introspection(session, status=403))
+			return await self.Cache.introspect(request, key, self._introspection(session, status=403))
+
+		response = asyncio.run(run())
+		self.assertEqual(self.Calls, 2)
+		self.assertEqual(response.headers["Cache-Control"], "no-store")
+
+
+	def test_session_deletion(self):
+		session = _session("s1")
+		request = self._request()
+		key = self.Cache.build_key(request, b"abc")
+		asyncio.run(self.Cache.introspect(request, key, self._introspection(session)))
+		self.App.PubSub.publish("Session.deleted!", session_id="s1", max_expiration=None)
+		self.assertEqual(len(self.Cache.Responses), 0)
+		asyncio.run(self.Cache.introspect(request, key, self._introspection(session)))
+		self.assertEqual(self.Calls, 2)
+
+
+	def test_max_age_bounded_by_session_expiration(self):
+		session = _session("s1", expires_in=5)
+		request = self._request()
+		response = asyncio.run(self.Cache.introspect(request, None, self._introspection(session)))
+		self.assertIn(response.headers["Cache-Control"], ("private, max-age=4", "private, max-age=5"))
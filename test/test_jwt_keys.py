@@ -0,0 +1,92 @@
+import collections
+import json
+import os
+import tempfile
+import time
+import types
+import unittest
+
+import jwcrypto.jwk
+import jwcrypto.jwt
+
+from seacatauth.openidconnect.service import OpenIdConnectService, signing_algorithm, load_retired_keys
+from .benchmark_jwt_signing import _generate_key, _sign
+
+
+class JWTKeysTestCase(unittest.TestCase):
+
+	def test_signing_algorithm(self):
+		self.assertEqual(signing_algorithm(_generate_key("EC", "P-256")), "ES256")
+		self.assertEqual(signing_algorithm(_generate_key("OKP", "Ed25519")), "EdDSA")
+		with self.assertRaises(ValueError):
+			signing_algorithm(jwcrypto.jwk.JWK.generate(kty="RSA", size=2048))
+
+
+	def test_key_rotation(self):
+		"""
+		Tokens signed with the current key as well as with a retired key are verified against the key set
+		"""
+		retired_key = _generate_key("EC", "P-256")
+		current_key = _generate_key("OKP", "Ed25519")
+		key_set = jwcrypto.jwk.JWKSet()
+		key_set.add(retired_key)
+		key_set.add(current_key)
+
+		for key in (retired_key, current_key):
+			token = jwcrypto.jwt.JWT(jwt=_sign(key, json.dumps({"sid": "abc"})), key=key_set)
+			self.assertEqual(json.loads(token.claims)["sid"], "abc")
+			self.assertEqual(token.token.jose_header["kid"], key.key_id)
+
+		with self.assertRaises(jwcrypto.jwt.JWTMissingKey):
+			jwcrypto.jwt.JWT(jwt=_sign(_generate_key("EC", "P-256"), "{}"), key=key_set)
+
+
+	def test_load_retired_keys(self):
+		"""
+		Unreadable retired keys are skipped
+		"""
+		with tempfile.TemporaryDirectory() as directory:
+			valid_path = os.path.join(directory, "retired.pem")
+			with open(valid_path, "wb") as f:
+				f.write(_generate_key("EC", "P-256").export_to_pem(private_key=True, password=None))
+			invalid_path = os.path.join(directory, "invalid.pem")
+			with open(invalid_path, "wb") as f:
+				f.write(b"not a key")
+			missing_path = os.path.join(directory, "missing.pem")
+
+			with self.assertLogs("seacatauth.openidconnect.service", level="ERROR"):
+				keys = load_retired_keys([missing_path, invalid_path, valid_path])
+		self.assertEqual(len(keys), 1)
+		self.assertEqual(signing_algorithm(keys[0]), "ES256")
+
+
+	def test_token_types(self):
+		"""
+		Signed access tokens and ID tokens are not interchangeable
+		"""
+		key = _generate_key("EC", "P-256")
+		oidc_service = OpenIdConnectService.__new__(OpenIdConnectService)
+		oidc_service.JSONDumper = json.dumps
+		oidc_service.KeySet = jwcrypto.jwk.JWKSet()
+		oidc_service.KeySet.add(key)
+		oidc_service.SignedAccessTokens = True
+		oidc_service.RevokedSessions = {}
+		oidc_service.VerifiedJWTCache = collections.OrderedDict()
+		oidc_service.VerifiedJWTCacheSize = 10
+		oidc_service.JWTCacheCounter = types.SimpleNamespace(add=lambda name, value: None)
+
+		claims = {"sid": "abc", "exp": int(time.time()) + 60}
+		id_token = oidc_service.sign_jwt(claims, key)
+		access_token = oidc_service.sign_jwt(claims, key, token_type=OpenIdConnectService.AccessTokenType)
+
+		self.assertEqual(oidc_service.get_session_id_by_jwt(id_token), "abc")
+		self.assertIsNone(oidc_service.get_session_id_by_jwt(access_token))
+		self.assertEqual(oidc_service.get_session_id_by_jwt(access_token, access_token=True), "abc")
+		self.assertIsNone(oidc_service.get_session_id_by_jwt(id_token, access_token=True))
+
+		oidc_service.RevokedSessions["abc"] = time.time() + 60
+		self.assertIsNone(oidc_service.get_session_id_by_jwt(access_token, access_token=True))
+		oidc_service.RevokedSessions.clear()
+
+		oidc_service.SignedAccessTokens = False
+		self.assertIsNone(oidc_service.get_session_id_by_jwt(access_token, access_token=True))
@@ -0,0 +1,109 @@
+import asyncio
+import types
+import unittest
+
+import seacatauth  # noqa: F401 (configuration defaults)
+from seacatauth.authz.registry import ObjectRegistry
+
+from .test_introspection_cache import _app
+
+
+class _AsyncIter:
+
+	def __init__(self, items):
+		self.Items = iter(items)
+
+	def __aiter__(self):
+		return self
+
+	async def __anext__(self):
+		try:
+			return next(self.Items)
+		except StopIteration:
+			raise StopAsyncIteration
+
+
+class _Collection:
+	"""
+	Minimal stand-in for a motor collection.
+	"""
+
+	def __init__(self, documents):
+		self.Documents = {doc["_id"]: doc for doc in documents}
+
+	def find(self, query_filter):
+		return _AsyncIter([dict(doc) for doc in self.Documents.values()])
+
+	async def find_one(self, query_filter):
+		doc = self.Documents.get(query_filter["_id"])
+		return dict(doc) if doc is not None else None
+
+	def aggregate(self, pipeline):
+		if len(self.Documents) == 0:
+			return _AsyncIter([])
+		return _AsyncIter([{
+			"n": len(self.Documents),
+			"v": sum(doc["_v"] for doc in self.Documents.values()),
+			"m": max(doc["_m"] for doc in self.Documents.values()),
+		}])
+
+
+class ObjectRegistryTestCase(unittest.TestCase):
+
+	def setUp(self):
+		self.Collection = _Collection([
+			{"_id": "*/admin", "_v": 1, "_m": 1, "resources": ["authz:superuser"]},
+			{"_id": "*/viewer", "_v": 2, "_m": 2, "resources": ["app:read"]},
+		])
+		storage_service = types.SimpleNamespace(Database={"r": self.Collection})
+		self.Registry = ObjectRegistry(_app(), storage_service, "r")
+		asyncio.run(self.Registry.load())
+
+
+	def test_get(self):
+		self.assertEqual(len(self.Registry), 2)
+		role = self.Registry.get("*/viewer")
+		self.assertEqual(role["resources"], ["app:read"])
+		# Callers get a copy
+		role["resources"].append("app:write")
+		self.assertEqual(self.Registry.get("*/viewer")["resources"], ["app:read"])
+		with self.assertRaises(KeyError):
+			self.Registry.get("*/nonexistent")
+
+
+	def _write(self, obj_id, document=None):
+		"""
+		Write made by this instance
+		"""
+		fingerprint = asyncio.run(self.Registry.get_fingerprint())
+		if document is None:
+			del self.Collection.Documents[obj_id]
+		else:
+			self.Collection.Documents[obj_id] = document
+		asyncio.run(self.Registry.refresh(obj_id, fingerprint))
+
+
+	def test_refresh(self):
+		self._write("*/viewer", {"_id": "*/viewer", "_v": 3, "_m": 3, "resources": ["app:read", "app:write"]})
+		self._write("*/admin")
+		self.assertEqual(self.Registry.get("*/viewer")["resources"], ["app:read", "app:write"])
+		self.assertNotIn("*/admin", self.Registry)
+		# Own writes do not trigger a reload
+		self.assertEqual(self.Registry.Fingerprint, asyncio.run(self.Registry.get_fingerprint()))
+
+
+	def test_refresh_after_foreign_write(self):
+		# Modification by another instance, followed by a write of this instance
+		self.Collection.Documents["*/editor"] = {"_id": "*/editor", "_v": 1, "_m": 3, "resources": []}
+		self._write("*/viewer", {"_id": "*/viewer", "_v": 3, "_m": 4, "resources": ["app:read", "app:write"]})
+		self.assertEqual(self.Registry.get("*/viewer")["resources"], ["app:read", "app:write"])
+		# The foreign write is not absorbed
+		self.assertIn("*/editor", self.Registry)
+
+
+	def test_check(self):
+		# Modification by another instance
+		self.Collection.Documents["*/editor"] = {"_id": "*/editor", "_v": 1, "_m": 3, "resources": []}
+		self.assertNotIn("*/editor", self.Registry)
+		asyncio.run(self.Registry.check())
+		self.assertIn("*/editor", self.Registry)
@@ -0,0 +1,108 @@
+import datetime
+import unittest
+
+import asab.exceptions
+import bson
+import pymongo
+
+from seacatauth.pagination import encode_cursor, decode_cursor, cursor_filter, apply_pagination, next_cursor
+
+
+def _match(doc, query_filter):
+	"""
+	Evaluate the subset of the MongoDB query language produced by cursor_filter.
+	"""
+	if "$or" in query_filter:
+		return any(_match(doc, condition) for condition in query_filter["$or"])
+	for key, condition in query_filter.items():
+		value = doc.get(key)
+		if not isinstance(condition, dict):
+			matches = value == condition
+		elif "$ne" in condition:
+			matches = value != condition["$ne"]
+		elif value is None:
+			# Comparison operators do not match missing and null values
+			matches = False
+		elif "$lt" in condition:
+			matches = value < condition["$lt"]
+		else:
+			matches = value > condition["$gt"]
+		if not matches:
+			return False
+	return True
+
+
+class PaginationTestCase(unittest.TestCase):
+
+	document = {
+		"_id": bson.ObjectId("5f1b2c3d4e5f6a7b8c9d0e1f"),
+		"_c": datetime.datetime(2023, 5, 1, 12, 30, tzinfo=datetime.timezone.utc),
+	}
+
+	def test_cursor_roundtrip(self):
+		cursor = encode_cursor(self.document)
+		self.assertEqual(decode_cursor(cursor), [self.document["_c"], self.document["_id"]])
+
+
+	def test_invalid_cursor(self):
+		with self.assertRaises(asab.exceptions.ValidationError):
+			decode_cursor("not-a-cursor")
+
+
+	def test_cursor_filter(self):
+		cursor = encode_cursor(self.document)
+		self.assertEqual(cursor_filter(cursor), {"$or": [
+			{"_c": {"$lt": self.document["_c"]}},
+			{"_c": None},
+			{"_c": self.document["_c"], "_id": {"$lt": self.document["_id"]}},
+		]})
+
+		sort = (("_id", pymongo.ASCENDING),)
+		cursor = encode_cursor({"_id": "tenant-b"}, sort)
+		self.assertEqual(cursor_filter(cursor, sort), {"$or": [{"_id": {"$gt": "tenant-b"}}]})
+
+
+	def test_missing_sort_key(self):
+		# Documents without "_c" sort last in descending order
+		created = datetime.datetime(2023, 5, 1, tzinfo=datetime.timezone.utc)
+		documents = [
+			{"_id": 6, "_c": created + datetime.timedelta(days=2)},
+			{"_id": 5, "_c": created},
+			{"_id": 4, "_c": created},
+			{"_id": 3},
+			{"_id": 2},
+			{"_id": 1, "_c": None},
+		]
+		cursor = encode_cursor(documents[3])
+		self.assertEqual(cursor_filter(cursor), {"$or": [{"_c": None, "_id": {"$lt": 3}}]})
+
+		listed = []
+		cursor = None
+		while True:
+			query_filter = {} if cursor is None else cursor_filter(cursor)
+			page = [doc for doc in documents if _match(doc, query_filter)][:2]
+			listed.extend(page)
+			cursor = next_cursor(page, limit=2)
+			if cursor is None:
+				break
+		self.assertEqual(listed, documents)
+
+		sort = (("_match", pymongo.ASCENDING), ("_id", pymongo.ASCENDING))
+		cursor = encode_cursor({"_id": "tenant-b"}, sort)
+		self.assertEqual(cursor_filter(cursor, sort), {"$or": [
+			{"_match": {"$ne": None}},
+			{"_match": None, "_id": {"$gt": "tenant-b"}},
+		]})
+
+
+	def test_apply_pagination(self):
+		self.assertEqual(apply_pagination({"a": 1}, page=3, limit=10), ({"a": 1}, 30))
+		query_filter, skip = apply_pagination({"a": 1}, page=3, limit=10, cursor=encode_cursor(self.document))
+		self.assertEqual(skip, 0)
+		self.assertEqual(query_filter["$and"][0], {"a": 1})
+
+
+	def test_next_cursor(self):
+		self.assertIsNone(next_cursor([self.document], limit=2))
+		self.assertIsNone(next_cursor([self.document], limit=None))
+		self.assertEqual(next_cursor([self.document], limit=1), encode_cursor(self.document))
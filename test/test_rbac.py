@@ -1,6 +1,8 @@
+import timeit
 import unittest
 
 from seacatauth.authz import RBACService
+from seacatauth.authz.rbac.compiled import CompiledAuthz, ResourceSet, compile_resources
 from seacatauth.exceptions import TenantNotSpecifiedError
 
 
@@ -256,3 +258,102 @@ class RBACTestCase(unittest.TestCase):
 			["authz:superuser"]
 		)
 		self.assertTrue(access)
+
+
+	def test_compiled_authz(self):
+		"""
+		Check that compiled authz gives the same results as the raw authz dict
+		"""
+		compiled = CompiledAuthz(self.authz_test_data)
+		self.assertEqual(compiled.GlobalResources, frozenset(self.authz_test_data["*"]))
+		self.assertIn("seacat:tenant:access", compiled.AllResources)
+		self.assertEqual(
+			compiled.tenant_resources("first-tenant"),
+			frozenset(self.authz_test_data["*"] + self.authz_test_data["first-tenant"])
+		)
+		self.assertFalse(compiled.IsSuperuser)
+		self.assertFalse(compiled.CanAccessAllTenants)
+		self.assertTrue(CompiledAuthz(self.superuser_authz_test_data).IsSuperuser)
+		self.assertTrue(CompiledAuthz({"*": ["authz:tenant:access"]}).CanAccessAllTenants)
+
+		for authz in (self.authz_test_data, self.notenant_authz_test_data, self.superuser_authz_test_data):
+			compiled = CompiledAuthz(authz)
+			for tenant in ("*", "first-tenant", "second-tenant"):
+				for resources in (["tenant:access"], ["post:edit"], ["seacat:tenant:access"], ["authz:superuser"]):
+					self.assertEqual(
+						RBACService.has_resource_access(compiled, tenant, resources),
+						RBACService.has_resource_access(authz, tenant, resources),
+					)
+
+
+	def test_wildcard_resource_set(self):
+		"""
+		Check hierarchical wildcard matching
+		"""
+		resources = ResourceSet(["myapp:reports:*", "myapp:access", "elk:*"])
+		self.assertIn("myapp:access", resources)
+		self.assertIn("myapp:reports:daily", resources)
+		self.assertIn("myapp:reports:daily:pdf", resources)
+		self.assertIn("elk:kibana:read", resources)
+		# Wildcard does not grant its prefix nor siblings
+		self.assertNotIn("myapp:reports", resources)
+		self.assertNotIn("myapp:reportsx:daily", resources)
+		self.assertNotIn("myapp:edit", resources)
+		self.assertNotIn("elk", resources)
+		# Set union keeps wildcards
+		self.assertIn("myapp:reports:daily", frozenset(["post:read"]) | resources)
+		self.assertIn("myapp:reports:daily", resources | frozenset(["post:read"]))
+
+		# Special resources must be granted explicitly
+		resources = ResourceSet(["authz:*"])
+		self.assertNotIn("authz:superuser", resources)
+		self.assertFalse(CompiledAuthz({"*": ["authz:*"]}).IsSuperuser)
+
+
+	def test_wildcard_resource_access(self):
+		"""
+		Check wildcard grants in tenant, global and soft-check access
+		"""
+		authz = {
+			"*": ["myapp:reports:*"],
+			"first-tenant": ["myapp:reports:*", "myapp:admin:*"],
+		}
+		self.assertTrue(RBACService.has_resource_access(authz, None, ["myapp:reports:daily"]))
+		self.assertFalse(RBACService.has_resource_access(authz, None, ["myapp:admin:users"]))
+		self.assertTrue(RBACService.has_resource_access(
+			authz, "first-tenant", ["myapp:reports:daily", "myapp:admin:users"]))
+		self.assertFalse(RBACService.has_resource_access(authz, "first-tenant", ["myapp:access"]))
+		self.assertTrue(RBACService.has_resource_access(authz, "*", ["myapp:admin:users"]))
+		self.assertFalse(RBACService.has_resource_access(authz, "second-tenant", ["myapp:reports:daily"]))
+		self.assertIn("myapp:admin:users", CompiledAuthz(authz).tenant_resources("first-tenant"))
+
+		# Resources without wildcards stay plain sets
+		self.assertIs(type(compile_resources(["post:read"])), frozenset)
+		self.assertIs(type(compile_resources(["post:read", "myapp:*"])), ResourceSet)
+
+
+def benchmark(number=200000):
+	"""
+	Throughput of resource checks: the plain set-based check versus the wildcard-aware resource set
+	(used only when there are wildcard grants), for growing numbers of granted resources.
+
+	python3 -m test.test_rbac
+	"""
+	for size in (10, 1000, 100000):
+		granted = ["app{}:module:action".format(i) for i in range(size)]
+		plain = frozenset(granted)
+		compiled = ResourceSet(granted + ["reports:daily:*"])
+		checks = [
+			("set, exact hit", plain, "app0:module:action"),
+			("set, miss", plain, "other:module:action"),
+			("trie, exact hit", compiled, "app0:module:action"),
+			("trie, wildcard hit", compiled, "reports:daily:sales:pdf"),
+			("trie, miss", compiled, "other:module:action"),
+		]
+		for name, resources, resource in checks:
+			seconds = timeit.timeit(lambda: resource in resources, number=number)
+			print("{:>6} resources  {:<20} {:>6.2f} M checks/s".format(size, name, number / seconds / 1e6))
+
+
+if __name__ == "__main__":
+	benchmark()
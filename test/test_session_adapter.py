@@ -0,0 +1,78 @@
+import copy
+import dataclasses
+import datetime
+import unittest
+
+from seacatauth.session.adapter import SessionAdapter
+
+
+class _SessionService:
+
+	def __init__(self):
+		self.DecryptCalls = 0
+
+	def aes_decrypt(self, encrypted_bytes):
+		self.DecryptCalls += 1
+		return encrypted_bytes
+
+
+def _session_dict():
+	now = datetime.datetime.now(datetime.timezone.utc)
+	return {
+		"_id": "s1",
+		"_v": 1,
+		"_c": now,
+		"_m": now,
+		"s_t": "openidconnect",
+		"s_exp": now + datetime.timedelta(hours=1),
+		"c_id": "mongodb:default:abc",
+		"c_u": "alice",
+		"az_az": {"*": ["authz:superuser"]},
+		"az_t": ["default"],
+		"oa_at": SessionAdapter.EncryptedPrefix + b"x" * 48,
+		"oa_atd": b"digest",
+		"oa_cl": "client",
+		"xyz": "unknown field",
+	}
+
+
+class SessionAdapterTestCase(unittest.TestCase):
+
+	def test_lazy_decryption(self):
+		session_svc = _SessionService()
+		session = SessionAdapter(session_svc, _session_dict())
+		self.assertEqual(session.Credentials.Id, "mongodb:default:abc")
+		self.assertEqual(session.Authorization.Authz, {"*": ["authz:superuser"]})
+		self.assertEqual(session_svc.DecryptCalls, 0)
+
+		self.assertEqual(session.OAuth2.ClientId, "client")
+		self.assertIsNotNone(session.OAuth2.AccessToken)
+		self.assertEqual(session_svc.DecryptCalls, 1)
+		self.assertIsNone(session.Cookie)
+
+
+	def test_copy_and_replace(self):
+		session_svc = _SessionService()
+		session = SessionAdapter(session_svc, _session_dict())
+		expires = session.Session.Expiration + datetime.timedelta(hours=1)
+		view = copy.copy(session)
+		view.Session = dataclasses.replace(session.Session, Expiration=expires)
+		self.assertEqual(view.Session.Expiration, expires)
+		self.assertNotEqual(session.Session.Expiration, expires)
+		# Copying does not deserialize the lazy sections
+		self.assertEqual(session_svc.DecryptCalls, 0)
+		self.assertEqual(view.SessionId, "s1")
+		self.assertEqual(view.Credentials.Username, "alice")
+		self.assertEqual(view.OAuth2.ClientId, "client")
+		self.assertEqual(session_svc.DecryptCalls, 1)
+		# Both objects load the sections independently
+		self.assertEqual(session.Credentials.Username, "alice")
+		self.assertEqual(session.OAuth2.AccessToken, view.OAuth2.AccessToken)
+		self.assertEqual(session_svc.DecryptCalls, 2)
+
+
+	def test_no_raw_dict(self):
+		session = SessionAdapter(_SessionService(), _session_dict())
+		self.assertFalse(hasattr(session, "__dict__"))
+		session.serialize()
+		self.assertEqual(len(session._Sections), 0)
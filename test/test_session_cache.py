@@ -0,0 +1,59 @@
+import datetime
+import types
+import unittest
+
+from seacatauth.session.cache import SessionCache
+
+
+def _session(session_id, expires_in=3600):
+	return types.SimpleNamespace(
+		SessionId=session_id,
+		Session=types.SimpleNamespace(
+			Expiration=datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=expires_in)
+		)
+	)
+
+
+class SessionCacheTestCase(unittest.TestCase):
+
+	def test_get_and_lookup_key(self):
+		cache = SessionCache(max_size=10, ttl=60)
+		session = _session("s1")
+		cache.put(session, ("oa_at", b"token"))
+		self.assertIs(cache.get("s1"), session)
+		self.assertIs(cache.get_by_key(("oa_at", b"token")), session)
+		self.assertIsNone(cache.get_by_key(("oa_at", b"other")))
+
+
+	def test_invalidate(self):
+		cache = SessionCache(max_size=10, ttl=60)
+		cache.put(_session("s1"), ("ck_sci", b"cookie"))
+		cache.invalidate("s1")
+		self.assertIsNone(cache.get("s1"))
+		self.assertIsNone(cache.get_by_key(("ck_sci", b"cookie")))
+		self.assertEqual(len(cache.Keys), 0)
+
+
+	def test_lru_eviction(self):
+		cache = SessionCache(max_size=2, ttl=60)
+		cache.put(_session("s1"), ("k", 1))
+		cache.put(_session("s2"), ("k", 2))
+		# Touch s1 so that s2 becomes the least recently used
+		cache.get("s1")
+		cache.put(_session("s3"), ("k", 3))
+		self.assertIsNotNone(cache.get("s1"))
+		self.assertIsNone(cache.get("s2"))
+		self.assertIsNone(cache.get_by_key(("k", 2)))
+		self.assertIsNotNone(cache.get("s3"))
+
+
+	def test_expired_session_not_cached(self):
+		cache = SessionCache(max_size=10, ttl=60)
+		cache.put(_session("s1", expires_in=-1))
+		self.assertIsNone(cache.get("s1"))
+
+
+	def test_disabled(self):
+		cache = SessionCache(max_size=0, ttl=60)
+		cache.put(_session("s1"))
+		self.assertIsNone(cache.get("s1"))
@@ -0,0 +1,156 @@
+import asyncio
+import datetime
+import types
+import unittest
+
+from seacatauth.session.service import SessionService
+
+from .test_object_registry import _AsyncIter
+from .test_pagination import _match
+
+
+def _sort_key(doc):
+	# CreatedAtSort order: missing creation time sorts lowest
+	return doc.get("_c") is not None, doc.get("_c") or 0, doc["_id"]
+
+
+def _matches(doc, query_filter):
+	if "$and" in query_filter:
+		return all(_matches(doc, condition) for condition in query_filter["$and"])
+	return _match(doc, query_filter)
+
+
+class _SessionCollection:
+	"""
+	Session collection stand-in that evaluates the recursive listing aggregation.
+	"""
+
+	def __init__(self, documents):
+		self.Documents = documents
+
+	def aggregate(self, pipeline):
+		return _AsyncIter(self._run(pipeline, self.Documents))
+
+	def _run(self, pipeline, docs):
+		for stage in pipeline:
+			(operator, argument), = stage.items()
+			if operator == "$match":
+				docs = [doc for doc in docs if _matches(doc, argument)]
+			elif operator == "$sort":
+				docs = sorted(docs, key=_sort_key, reverse=True)
+			elif operator == "$skip":
+				docs = docs[argument:]
+			elif operator == "$limit":
+				docs = docs[:argument]
+			elif operator == "$count":
+				docs = [{argument: len(docs)}] if len(docs) > 0 else []
+			elif operator == "$lookup":
+				docs = [
+					dict(doc, **{argument["as"]: [
+						dict(child) for child in self.Documents
+						if child.get(argument["foreignField"]) == doc[argument["localField"]]
+					]})
+					for doc in docs
+				]
+			elif operator == "$facet":
+				docs = [{name: self._run(facet, docs) for name, facet in argument.items()}]
+			else:
+				raise NotImplementedError(operator)
+		return docs
+
+	async def count_documents(self, query_filter):
+		return len([doc for doc in self.Documents if _matches(doc, query_filter)])
+
+
+class RecursiveListTestCase(unittest.TestCase):
+
+	def setUp(self):
+		self.Loop = asyncio.new_event_loop()
+		created = datetime.datetime(2023, 5, 1, tzinfo=datetime.timezone.utc)
+		documents = []
+		for i in range(5):
+			documents.append({
+				"_id": "root{}".format(i), "_v": 1, "_c": created + datetime.timedelta(minutes=i), "_m": created,
+				"s_t": "root", "c_id": "mongodb:default:{}".format(i % 2),
+			})
+		for parent, child, minutes in [(4, "a", 1), (4, "b", 2), (1, "c", 3)]:
+			documents.append({
+				"_id": "child-{}".format(child), "_v": 1, "_c": created + datetime.timedelta(minutes=minutes),
+				"_m": created, "s_t": "openidconnect", "s_pid": "root{}".format(parent),
+			})
+		# Legacy child without creation time
+		documents.append({"_id": "child-d", "_v": 1, "_m": created, "s_t": "openidconnect", "s_pid": "root4"})
+		self.Documents = documents
+
+		self.SessionService = SessionService.__new__(SessionService)
+		self.SessionService.StorageService = types.SimpleNamespace(Database={"s": _SessionCollection(documents)})
+		self.SessionService.SessionCollection = "s"
+
+
+	def tearDown(self):
+		self.Loop.close()
+
+
+	def _two_queries(self, page, limit, query_filter=None):
+		"""
+		The result of the former implementation: one query for the page of top-level sessions
+		and the total count, one query for the children of each listed session.
+		"""
+		query_filter = dict(query_filter or {}, s_pid=None)
+		roots = sorted((doc for doc in self.Documents if _match(doc, query_filter)), key=_sort_key, reverse=True)
+		result = []
+		for root in roots[limit * page:limit * (page + 1)]:
+			children = sorted(
+				(doc for doc in self.Documents if doc.get("s_pid") == root["_id"]), key=_sort_key, reverse=True)
+			result.append((root["_id"], [child["_id"] for child in children]))
+		return result, len(roots)
+
+
+	def _ids(self, result):
+		return [
+			(session["_id"], [child["_id"] for child in session.get("children", {}).get("data", [])])
+			for session in result["data"]
+		]
+
+
+	def test_pages(self):
+		for page in range(3):
+			result = self.Loop.run_until_complete(self.SessionService.recursive_list(page=page, limit=2))
+			expected, count = self._two_queries(page, 2)
+			self.assertEqual(self._ids(result), expected)
+			self.assertEqual(result["count"], count)
+			for session in result["data"]:
+				if "children" in session:
+					self.assertEqual(session["children"]["count"], len(session["children"]["data"]))
+
+		self.assertEqual(self._ids(result), [("root0", [])])
+		first_page = self.Loop.run_until_complete(self.SessionService.recursive_list(page=0, limit=2))
+		self.assertEqual(self._ids(first_page)[0], ("root4", ["child-b", "child-a", "child-d"]))
+
+
+	def test_filter(self):
+		query_filter = {"c_id": "mongodb:default:1"}
+		result = self.Loop.run_until_complete(
+			self.SessionService.recursive_list(page=0, limit=10, query_filter=query_filter))
+		expected, count = self._two_queries(0, 10, query_filter)
+		self.assertEqual(self._ids(result), expected)
+		self.assertEqual(result["count"], count)
+
+		result = self.Loop.run_until_complete(
+			self.SessionService.recursive_list(page=0, limit=10, query_filter={"c_id": "nobody"}))
+		self.assertEqual(result, {"data": [], "count": 0})
+
+
+	def test_cursor(self):
+		listed = []
+		cursor = None
+		for page in range(3):
+			result = self.Loop.run_until_complete(self.SessionService.recursive_list(limit=2, cursor=cursor))
+			expected, count = self._two_queries(page, 2)
+			self.assertEqual(self._ids(result), expected)
+			self.assertEqual(result["count"], count)
+			listed.extend(self._ids(result))
+			cursor = result.get("cursor")
+			if cursor is None:
+				break
+		self.assertEqual(len(listed), 5)
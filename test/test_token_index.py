@@ -0,0 +1,60 @@
+import time
+import unittest
+
+import seacatauth  # noqa: F401 (configuration defaults)
+from seacatauth.openidconnect.token_index import ActiveTokenIndex
+
+from .test_introspection_cache import _PubSub
+
+
+class _App:
+
+	def __init__(self):
+		self.PubSub = _PubSub()
+
+
+class ActiveTokenIndexTestCase(unittest.TestCase):
+
+	def setUp(self):
+		self.App = _App()
+		self.Index = ActiveTokenIndex(self.App)
+
+
+	def _response(self, expires_in=3600):
+		return {"active": True, "sub": "htpasswd:id:john", "exp": int(time.time()) + expires_in}
+
+
+	def test_get_and_put(self):
+		digest = self.Index.digest("token-1")
+		self.assertIsNone(self.Index.get(digest))
+		response = self._response()
+		self.Index.put(digest, "s1", response)
+		self.assertIs(self.Index.get(digest), response)
+		self.assertIsNone(self.Index.get(self.Index.digest("token-2")))
+
+
+	def test_expired_token(self):
+		digest = self.Index.digest("token-1")
+		self.Index.put(digest, "s1", self._response(expires_in=-1))
+		self.assertIsNone(self.Index.get(digest))
+		self.assertEqual(len(self.Index), 0)
+
+
+	def test_session_events(self):
+		for message_type in ("Session.updated!", "Session.deleted!"):
+			self.Index.put(self.Index.digest("token-1"), "s1", self._response())
+			self.Index.put(self.Index.digest("token-2"), "s1", self._response())
+			self.Index.put(self.Index.digest("token-3"), "s2", self._response())
+			self.App.PubSub.publish(message_type, session_id="s1")
+			self.assertEqual(len(self.Index), 1)
+			self.assertIsNotNone(self.Index.get(self.Index.digest("token-3")))
+			self.assertNotIn("s1", self.Index.SessionTokens)
+
+
+	def test_eviction(self):
+		self.Index.MaxSize = 2
+		for i in range(3):
+			self.Index.put(self.Index.digest("token-{}".format(i)), "s{}".format(i), self._response())
+		self.assertEqual(len(self.Index), 2)
+		self.assertIsNone(self.Index.get(self.Index.digest("token-0")))
+		self.assertNotIn("s0", self.Index.SessionTokens)